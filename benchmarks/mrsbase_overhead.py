@@ -0,0 +1,52 @@
+"""
+Benchmark for the overhead of the MRSBase ndarray subclass on small FIDs,
+comparing common operations on an MRSData with the same operations on a
+plain ndarray, and timing spectral registration which repeats such
+operations inside its residual function.
+
+    PYTHONPATH=. python benchmarks/mrsbase_overhead.py
+"""
+import timeit
+
+import numpy
+
+import suspect
+
+NUM_POINTS = 256
+NUMBER = 20000
+
+
+def _time(func, number=NUMBER):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main():
+    rng = numpy.random.default_rng(0)
+    array = rng.standard_normal(NUM_POINTS) + 1j * rng.standard_normal(NUM_POINTS)
+    data = suspect.MRSData(array, 5e-4, 123.0, te=30, transform=numpy.eye(4), metadata={"name": "test"})
+
+    operations = [
+        ("slice", lambda x: x[10:100]),
+        ("multiply", lambda x: x * 2.0),
+        ("subtract", lambda x: x - x),
+        ("abs", lambda x: numpy.abs(x)),
+    ]
+    print("{} point FID, per operation times".format(NUM_POINTS))
+    print("{:24s}{:>12s}{:>12s}{:>12s}".format("", "ndarray", "MRSData", "overhead"))
+    for name, operation in operations:
+        array_time = _time(lambda: operation(array))
+        data_time = _time(lambda: operation(data))
+        print("{:24s}{:>9.2f} us{:>9.2f} us{:>9.2f} us".format(name, array_time * 1e6, data_time * 1e6,
+                                                             (data_time - array_time) * 1e6))
+    inherit_time = _time(lambda: data.inherit(array))
+    print("{:24s}{:>12s}{:>9.2f} us".format("inherit", "", inherit_time * 1e6))
+
+    t = data.time_axis()
+    moving = data.inherit(array * numpy.exp(2j * numpy.pi * 3.0 * t + 0.2j))
+    registration_time = _time(lambda: suspect.processing.frequency_correction.spectral_registration(moving, data),
+                              number=20)
+    print("{:24s}{:>12s}{:>9.2f} ms".format("spectral_registration", "", registration_time * 1e3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark for loading Philips SDAT files, comparing the vectorised VAX float
+decoding with the original pure Python loop over each float.
+
+Writes a synthetic 64 dynamic, 2048 point SDAT/SPAR pair to a temporary
+folder and times load_sdat on it, and the two decoders on its raw bytes.
+
+    PYTHONPATH=. python benchmarks/philips_sdat.py
+"""
+import os
+import tempfile
+import timeit
+
+import numpy
+
+import suspect
+
+NUM_DYNAMICS = 64
+NUM_SAMPLES = 2048
+
+
+def _python_vax_to_ieee_single_float(data):
+    # the per float decoding previously used by suspect.io.philips
+    f = []
+    for i in range(len(data) // 4):
+        byte2, byte1, byte4, byte3 = data[i * 4:i * 4 + 4]
+        sign = (byte1 & 0x80) >> 7
+        expon = ((byte1 & 0x7f) << 1) + ((byte2 & 0x80) >> 7)
+        fract = ((byte2 & 0x7f) << 16) + (byte3 << 8) + byte4
+        if 0 < expon:
+            f.append((-1.0 if sign else 1.0) * (0.5 + (fract / 16777216.0)) * pow(2.0, expon - 128.0))
+        else:
+            f.append(0)
+    return f
+
+
+def _python_load_floats(data):
+    floats = _python_vax_to_ieee_single_float(data)
+    data_iter = iter(floats)
+    return numpy.fromiter((complex(r, -i) for r, i in zip(data_iter, data_iter)), "complex64")
+
+
+def _write_sdat(folder):
+    rng = numpy.random.default_rng(0)
+    values = rng.standard_normal(NUM_DYNAMICS * NUM_SAMPLES * 2).astype("<f4") * 4
+    sdat_filename = os.path.join(folder, "bench.SDAT")
+    with open(sdat_filename, "wb") as fout:
+        fout.write(values.view("<u2").reshape(-1, 2)[:, ::-1].tobytes())
+    with open(os.path.join(folder, "bench.SPAR"), "w") as fout:
+        fout.write("samples : {}\nrows : {}\nsample_frequency : 2000\n"
+                   "synthesizer_frequency : 127769903\necho_time : 30.0\nrepetition_time : 2000\n"
+                   "lr_size : 20.0\nap_size : 20.0\ncc_size : 20.0\n"
+                   "lr_off_center : 0.0\nap_off_center : 0.0\ncc_off_center : 0.0\n"
+                   "lr_angulation : 0.0\nap_angulation : 0.0\ncc_angulation : 0.0\n".format(NUM_SAMPLES,
+                                                                                           NUM_DYNAMICS))
+    return sdat_filename
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        sdat_filename = _write_sdat(folder)
+        with open(sdat_filename, "rb") as fin:
+            raw_bytes = fin.read()
+
+        python_time = min(timeit.repeat(lambda: _python_load_floats(raw_bytes), number=1, repeat=3))
+        numpy_time = min(timeit.repeat(
+            lambda: suspect.io.philips._vax_to_ieee_single_float(raw_bytes).view(numpy.complex64).conjugate(),
+            number=10, repeat=3)) / 10
+        load_time = min(timeit.repeat(lambda: suspect.io.load_sdat(sdat_filename), number=10, repeat=3)) / 10
+
+        numpy.testing.assert_array_equal(
+            _python_load_floats(raw_bytes),
+            suspect.io.load_sdat(sdat_filename).reshape(-1))
+
+    print("{} dynamics x {} points".format(NUM_DYNAMICS, NUM_SAMPLES))
+    print("python decoding: {:8.2f} ms".format(python_time * 1e3))
+    print("numpy decoding:  {:8.2f} ms ({:.0f}x faster)".format(numpy_time * 1e3, python_time / numpy_time))
+    print("load_sdat:       {:8.2f} ms".format(load_time * 1e3))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,3 +9,4 @@ from . import image
 from . import viz
 from ._version import __version__
 from .core import adjust_phase, adjust_frequency
+from ._dtype import set_default_dtype, get_default_dtype
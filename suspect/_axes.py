@@ -0,0 +1,57 @@
+import functools
+
+import numpy
+
+
+# the axes depend only on a few acquisition parameters, and are requested
+# over and over again e.g. inside the residual functions of optimizers, so
+# they are cached and shared between all data with the same parameters. to
+# allow this the cached arrays are read-only.
+
+@functools.lru_cache(maxsize=32)
+def time_axis(np, dt):
+    """
+    The sample times in seconds of an FID with np points and dwell time dt.
+
+    Returns
+    -------
+    numpy.ndarray
+        Read-only array of the sample times.
+    """
+    axis = numpy.arange(0.0, dt * np, dt)
+    axis.flags.writeable = False
+    return axis
+
+
+@functools.lru_cache(maxsize=32)
+def frequency_axis(np, sw):
+    """
+    The frequencies in Hertz of a spectrum with np points and spectral width
+    sw, ranging from -sw/2 to sw/2.
+
+    Returns
+    -------
+    numpy.ndarray
+        Read-only array of the frequencies.
+    """
+    axis = numpy.linspace(-sw / 2, sw / 2, np, endpoint=False)
+    axis.flags.writeable = False
+    return axis
+
+
+@functools.lru_cache(maxsize=32)
+def frequency_axis_ppm(np, sw, f0, ppm0):
+    """
+    The frequencies in PPM of a spectrum with np points, spectral width sw,
+    scanner frequency f0 in MHz and ppm0 at the centre of the spectrum.
+
+    Returns
+    -------
+    numpy.ndarray
+        Read-only array of the frequencies.
+    """
+    axis = numpy.linspace(ppm0 + sw / 2 / f0,
+                          ppm0 - sw / 2 / f0,
+                          np, endpoint=False)
+    axis.flags.writeable = False
+    return axis
@@ -0,0 +1,71 @@
+import numpy
+
+# the complex dtype which MRS data is kept in, or None to follow the usual
+# numpy type promotion (which mostly gives complex128)
+_default_dtype = None
+
+
+def set_default_dtype(dtype):
+    """
+    Sets the complex dtype used for MRS data throughout suspect.
+
+    With a default dtype set, complex data is converted to it when an
+    MRSData or MRSSpectrum is created, loaders such as load_twix produce it
+    directly, and processing (e.g. FFTs, phase and frequency adjustments,
+    channel combination and frequency correction) returns it rather than
+    promoting to complex128. Internal calculations which need the accuracy,
+    such as phase angles, covariances and optimizer residuals, are still
+    done in double precision.
+
+    Setting the default to complex64 halves the memory needed for large
+    datasets, and the raw data from the scanner is usually only single
+    precision to start with.
+
+    Parameters
+    ----------
+    dtype : numpy.dtype or None
+        A complex dtype, e.g. "complex64", or None to restore the default
+        behaviour of following numpy's type promotion.
+
+    Returns
+    -------
+    numpy.dtype or None
+        The previous default dtype.
+    """
+    global _default_dtype
+    if dtype is not None:
+        dtype = numpy.dtype(dtype)
+        if dtype.kind != "c":
+            raise ValueError("The default dtype must be complex, not {}".format(dtype))
+    previous_dtype = _default_dtype
+    _default_dtype = dtype
+    return previous_dtype
+
+
+def get_default_dtype():
+    """
+    Returns the complex dtype set by set_default_dtype, or None if no default
+    has been set.
+
+    Returns
+    -------
+    numpy.dtype or None
+    """
+    return _default_dtype
+
+
+def _complex_dtype(dtype=None):
+    # the dtype for a loader to produce: the one requested, otherwise the
+    # default dtype, otherwise complex128
+    if dtype is not None:
+        return numpy.dtype(dtype)
+    if _default_dtype is not None:
+        return _default_dtype
+    return numpy.dtype(numpy.complex128)
+
+
+def _apply_default_dtype(array):
+    # converts complex data to the default dtype, if one is set
+    if _default_dtype is not None and array.dtype.kind == "c" and array.dtype != _default_dtype:
+        return array.astype(_default_dtype)
+    return array
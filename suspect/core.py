@@ -6,14 +6,17 @@ def adjust_phase(data, zero_phase, first_phase=0, fixed_frequency=0):
     ----------
     data : MRSSpectrum
         The MRSSpectrum object to be phased
-    zero_phase : scalar
+    zero_phase : scalar or array_like
         The change to the zero order phase, in radians
-    first_phase : scalar, optional
+    first_phase : scalar or array_like, optional
         The change to the first order phase, in radians per Hz
-    fixed_frequency : scalar, optional
+    fixed_frequency : scalar or array_like, optional
         The frequency, in Hz, which is unchanged by the first order
         phase shift
 
+    Arrays of values apply a different phase to each spectrum, and broadcast
+    against the leading (non-spectral) dimensions of the data.
+
     Returns
     -------
     out : MRSSpectrum
@@ -28,8 +31,10 @@ def adjust_frequency(data, frequency_shift):
 
     Parameters
     ----------
-    frequency_shift: float
-        The amount to shift the frequency, in Hertz.
+    frequency_shift: float or array_like
+        The amount to shift the frequency, in Hertz. An array applies a
+        different shift to each spectrum, and broadcasts against the leading
+        (non-spectral) dimensions of the data.
 
     Returns
     -------
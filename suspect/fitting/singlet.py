@@ -5,6 +5,7 @@ import functools
 import operator
 
 import suspect.basis
+from suspect import _axes
 
 
 # this is the underlying function for the GaussianPeak model class
@@ -18,12 +19,8 @@ def phase_shift(in_data, phase0, phase1, spectral_width, num_points):
     # Update:
     # Since lmfit updates does not preserve suspect's MRS objects, we
     # do phase adjustment and spectrum & FID conversion here
-    spectrum = np.fft.fftshift(np.fft.fft(in_data, axis=-1), axes=-1)
     tmp_data = np.ones_like(in_data)
-    phase_ramp = np.linspace(-spectral_width / 2,
-                             spectral_width / 2,
-                             int(np.round(num_points)),
-                             endpoint=False)
+    phase_ramp = _axes.frequency_axis(int(np.round(num_points)), spectral_width)
     fixed_frequency = 0
     phase_shift = phase0 + phase1 * (fixed_frequency + phase_ramp)
     phased_spectrum = tmp_data * np.exp(1j * phase_shift)
@@ -145,8 +142,8 @@ class Model:
                                           params=params,
                                           in_data=data,
                                           time_axis=data.time_axis(),
-                                          spectral_width=data.spectrum().sw,
-                                          num_points=data.spectrum().np,
+                                          spectral_width=data.sw,
+                                          num_points=data.np,
                                           weights=weights)
         return result
 
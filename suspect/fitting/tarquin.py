@@ -1,10 +1,7 @@
 from ..io import tarquin
 
-import os
-import subprocess
 
-
-def process(data, wref=None, aq_factor=None, options={}):
+def process(data, wref=None, aq_factor=None, options={}, tarquin_path="tarquin"):
     """
     Runs the Tarquin basis set fitting program to determine metabolite
     concentrations.
@@ -19,34 +16,51 @@ def process(data, wref=None, aq_factor=None, options={}):
         Absolute quantification factor.
     options : dict
         Set of Tarquin parameters to override.
+    tarquin_path : str
+        The Tarquin executable to run.
 
     Returns
     -------
     dict
         Output from running Tarquin on the data
     """
-    tarquin.save_dpt("/tmp/temp.dpt", data)
-    if wref is not None:
-        tarquin.save_dpt("/tmp/wref.dpt", wref)
-        options["input_w"] = "/tmp/wref.dpt"
+    return tarquin.process(data, wref, _tarquin_options(aq_factor, options), tarquin_path)
+
+
+def process_many(data, wrefs=None, aq_factor=None, options={}, workers=None, tarquin_path="tarquin"):
+    """
+    Runs the Tarquin basis set fitting program on a batch of datasets, with
+    several Tarquin processes at once, returning an iterator over the
+    results as each fit finishes. See suspect.io.tarquin.process_many for
+    details.
+
+    Parameters
+    ----------
+    data : iterable of MRSData
+        The water suppressed FID data to be fitted.
+    wrefs : iterable of MRSData
+        Optional water reference data for each dataset.
+    aq_factor : float
+        Absolute quantification factor.
+    options : dict
+        Set of Tarquin parameters to override.
+    workers : int
+        The maximum number of Tarquin processes to run at once.
+    tarquin_path : str
+        The Tarquin executable to run.
+
+    Returns
+    -------
+    iterator of tuple
+        The index of each dataset and the output from running Tarquin on
+        it, or the exception raised if the fit failed.
+    """
+    return tarquin.process_many(data, wrefs, _tarquin_options(aq_factor, options), workers, tarquin_path)
+
+
+def _tarquin_options(aq_factor, options):
+    options = dict(options)
     if aq_factor is not None:
         options["w_conc"] = 1
         options["w_att"] = aq_factor
-    option_string = ""
-    for key, value in options.items():
-        option_string += " --{} {}".format(key, value)
-    result = subprocess.run("tarquin --input {} --format dpt --output_txt {} --output_fit {}{}".format(
-        "/tmp/temp.dpt", "/tmp/output.txt", "/tmp/fit.txt", option_string
-    ), shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding="UTF-8")
-    if result.returncode != 0:
-        raise Exception("Error doing quantification with TARQUIN: {}".format(result.stderr))
-    # with open("/tmp/output.txt") as fin:
-    #    result = fin.read()
-    if os.path.isfile("/tmp/output.txt"):
-        result = tarquin.read_output("/tmp/output.txt")
-    else:
-        raise FileNotFoundError("Could not find TARQUIN output file at /tmp/output.txt")
-    metabolite_names, fit_data = tarquin.read_fit_file("/tmp/fit.txt")
-    fit_results = tarquin._extract_fit_data(data, metabolite_names, fit_data)
-    result["plots"] = fit_results
-    return result
\ No newline at end of file
+    return options
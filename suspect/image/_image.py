@@ -1,5 +1,7 @@
 import suspect
 
+import collections
+import concurrent.futures
 import nibabel
 import numpy
 import os
@@ -7,15 +9,110 @@ import pydicom
 import pydicom.errors
 
 
-def load_dicom_volume(filename):
+# the header elements needed to group the files in a folder into series and
+# to sort the slices of each series, read without the pixel data
+_SLICE_HEADER_TAGS = ["SeriesInstanceUID", "ImagePositionPatient", "ImageOrientationPatient", "Rows", "Columns"]
+
+# series indexes from index_dicom_folder, keyed by (folder, file extension),
+# each mapping file names to the (modification time, size) of the file and
+# its slice header. only the most recently used folders are kept
+_SERIES_INDEX_CACHE_SIZE = 8
+_series_index_cache = collections.OrderedDict()
+
+
+def _read_slice_header(path):
+    """
+    Worker function for index_dicom_folder. Reads just the header elements
+    needed to assemble volumes from a file, returning None if the file is not
+    a DICOM image.
+    """
+    try:
+        ds = pydicom.dcmread(path, stop_before_pixels=True, specific_tags=_SLICE_HEADER_TAGS)
+    except pydicom.errors.InvalidDicomError:
+        return None
+    if "SeriesInstanceUID" not in ds or "ImagePositionPatient" not in ds:
+        return None
+    return {"SeriesInstanceUID": str(ds.SeriesInstanceUID),
+            "ImagePositionPatient": [float(v) for v in ds.ImagePositionPatient],
+            "ImageOrientationPatient": [float(v) for v in ds.get("ImageOrientationPatient", [])],
+            "Rows": ds.get("Rows"),
+            "Columns": ds.get("Columns")}
+
+
+def index_dicom_folder(folder, file_ext="", workers=1, use_cache=True):
+    """
+    Reads the headers of all the DICOM files in a folder, without decoding
+    any pixel data, so that the files can be grouped into series.
+
+    The indexes of the most recently used folders are cached, and on later
+    calls only files which have been added or modified since are read again.
+
+    Parameters
+    ----------
+    folder : str
+        The folder to index.
+    file_ext : str, optional
+        Only files whose names end with this extension are read.
+    workers : int or None, optional
+        The number of worker processes used to read the headers, or None for
+        the number of CPUs. The default of 1 reads the headers one after
+        another in this process. Note that on platforms which start worker
+        processes by spawning (Windows and macOS), a script using more than
+        one worker needs the usual ``if __name__ == "__main__":`` guard.
+    use_cache : bool, optional
+        Whether to reuse and update the cached index for the folder.
+
+    Returns
+    -------
+    dict
+        Maps each DICOM file name in the folder to a dict of its
+        SeriesInstanceUID, ImagePositionPatient, ImageOrientationPatient, Rows
+        and Columns. Files which are not DICOM images are left out.
+    """
+    cache_key = (os.path.abspath(folder), file_ext)
+    cached = _series_index_cache.pop(cache_key, {}) if use_cache else {}
+
+    file_stats = {}
+    for entry in os.scandir(folder):
+        if entry.name.endswith(file_ext) and entry.is_file():
+            stat = entry.stat()
+            file_stats[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+    index = {name: cached[name] for name, file_stat in file_stats.items()
+             if name in cached and cached[name][0] == file_stat}
+    names = [name for name in file_stats if name not in index]
+    paths = [os.path.join(folder, name) for name in names]
+    if workers == 1 or len(paths) <= 1:
+        headers = map(_read_slice_header, paths)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            headers = list(executor.map(_read_slice_header, paths, chunksize=max(1, len(paths) // 64)))
+    for name, header in zip(names, headers):
+        index[name] = (file_stats[name], header)
+
+    if use_cache:
+        _series_index_cache[cache_key] = index
+        while len(_series_index_cache) > _SERIES_INDEX_CACHE_SIZE:
+            _series_index_cache.popitem(last=False)
+    return {name: header for name, (_, header) in index.items() if header is not None}
+
+
+def load_dicom_volume(filename, workers=1):
     """ Creates a 3D volume from all the slices in a folder and extracts useful
     information from a supplied image. The function will attempt to read all
     files in the folder which have the same extension as the supplied filename
     and combine all slices with a matching SeriesInstanceUID.
 
+    The slices are found from a header only pass over the folder by
+    index_dicom_folder, so only the pixel data of the chosen series is ever
+    decoded.
+
     Parameters
     ----------
     filename : DICOM file
+    workers : int or None, optional
+        The number of processes used to read the headers in the folder, by
+        default 1, see index_dicom_folder.
 
     Returns
     -------
@@ -24,12 +121,10 @@ def load_dicom_volume(filename):
 
     """
     _, file_ext = os.path.splitext(filename)
-    # load the supplied file and get the UID of the series
-    ds = pydicom.dcmread(filename)
+    # load the header of the supplied file and get the UID of the series
+    ds = pydicom.dcmread(filename, stop_before_pixels=True)
     seriesUID = ds.SeriesInstanceUID
-
-    # get the position of the image
-    position = numpy.array(list(map(float, ds.ImagePositionPatient)))
+    slice_shape = (ds.Rows, ds.Columns)
 
     # get the direction normal to the plane of the image
     row_vector = numpy.array(ds.ImageOrientationPatient[:3])
@@ -40,38 +135,36 @@ def load_dicom_volume(filename):
     def normal_distance(coords):
         return numpy.dot(normal_vector, coords)
 
-    # create a dictionary to hold the slices as we load them
-    slices = {normal_distance(position): ds.pixel_array}
-
-    # extract the path to the folder of the file so we can look for others from the same series
-    folder, _ = os.path.split(filename)
-    for name in os.listdir(folder):
-        if name.endswith(file_ext): # name.lower().endswith(".ima") or name.lower().endswith(".dcm"):
-            new_dicom_name = os.path.join(folder, name)
-            try:
-                new_ds = pydicom.dcmread(new_dicom_name)
-            except pydicom.errors.InvalidDicomError as e:
-                continue
-
-            # check that the series UID matches
-            if new_ds.SeriesInstanceUID == seriesUID:
-                if new_ds.pixel_array.shape != ds.pixel_array.shape:
-                    continue
-                new_position = list(map(float, new_ds.ImagePositionPatient))
-                slices[normal_distance(new_position)] = new_ds.pixel_array
-
-                # we set the overall position of the volume with the position
-                # of the lowest slice
-                if normal_distance(new_position) < normal_distance(position):
-                    position = new_position
-
-    # that is all the slices in the folder, assemble them into a 3d volume
-    voxel_array = numpy.zeros((len(slices),
-                               ds.pixel_array.shape[0],
-                               ds.pixel_array.shape[1]), dtype=ds.pixel_array.dtype)
+    # the supplied file comes first, so that any other slice at the same
+    # position replaces it
+    folder, name = os.path.split(filename)
+    position = list(map(float, ds.ImagePositionPatient))
+    slices = {normal_distance(position): name}
+
+    # look for other slices from the same series in the folder
+    index = index_dicom_folder(folder or os.curdir, file_ext, workers)
+    for new_name, header in index.items():
+        if header["SeriesInstanceUID"] != seriesUID:
+            continue
+        if (header["Rows"], header["Columns"]) != slice_shape:
+            continue
+        new_position = header["ImagePositionPatient"]
+        slices[normal_distance(new_position)] = new_name
+
+        # we set the overall position of the volume with the position
+        # of the lowest slice
+        if normal_distance(new_position) < normal_distance(position):
+            position = new_position
+
+    # that is all the slices in the folder, decode them straight into a 3d
+    # volume, in order along the normal
     sorted_slice_positions = sorted(slices.keys())
+    voxel_array = None
     for i, slice_position in enumerate(sorted_slice_positions):
-        voxel_array[i] = slices[slice_position]
+        pixel_array = pydicom.dcmread(os.path.join(folder, slices[slice_position])).pixel_array
+        if voxel_array is None:
+            voxel_array = numpy.empty((len(slices),) + pixel_array.shape, dtype=pixel_array.dtype)
+        voxel_array[i] = pixel_array
 
     # the voxel spacing is a combination of PixelSpacing and slice separation
     voxel_spacing = list(map(float, ds.PixelSpacing))
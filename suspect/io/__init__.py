@@ -6,3 +6,4 @@ from suspect.io.ge import load_pfile
 from . import tarquin, lcmodel, felix
 from .dicom import load_dicom
 from .bruker import load_svs_bruker
+from .batch import load_many
@@ -1,11 +1,76 @@
+from suspect import MRSData
 import numpy as np
 
 
+def complex_array_from_buffer(buffer, dtype="<f4", length=-1, shape=None, chirality=1, complex_dtype="complex64"):
+    """
+    Converts a buffer of interleaved real, imaginary pairs into a numpy.ndarray
+    of complex values.
+
+    Where possible (native float pairs of the same precision as the output,
+    with a chirality of 1) the result is a view of the buffer without any
+    copying, otherwise the values are converted with a single copy into a new
+    array. A view of an immutable buffer such as bytes is read-only, so
+    loaders should pass a bytearray (or a writable array) instead.
+
+    Parameters
+    ----------
+    buffer : bytes-like or ndarray
+        The interleaved values, either as raw bytes or as an array.
+    dtype : numpy.dtype
+        The type of the values in the buffer, e.g. "<f4" for little endian
+        single precision floats or ">i4" for big endian 32 bit integers. Not
+        used if the buffer is already an ndarray.
+    length : int
+        The number of complex points to read. The default is -1, which means
+        all the data is read.
+    shape : array-like
+        Shape to convert the final array to. The array will be squeezed
+        after reshaping to remove any dimensions of length 1.
+    chirality : int
+        Either 1, or -1 if the data is stored as the complex conjugate of our
+        convention.
+    complex_dtype : numpy.dtype
+        The dtype of the output, complex64 by default.
+
+    Returns
+    -------
+    out : ndarray
+        The output array
+    """
+    if isinstance(buffer, np.ndarray):
+        values = buffer.reshape(-1)
+    else:
+        values = np.frombuffer(buffer, dtype=dtype)
+    if length >= 0:
+        values = values[:2 * length]
+    # any unpaired value at the end is dropped
+    values = values[:len(values) // 2 * 2]
+
+    complex_dtype = np.dtype(complex_dtype)
+    if (chirality == 1 and values.dtype.kind == "f" and values.dtype.isnative
+            and 2 * values.dtype.itemsize == complex_dtype.itemsize and values.flags.c_contiguous):
+        complex_array = values.view(complex_dtype)
+    else:
+        complex_array = np.empty(len(values) // 2, dtype=complex_dtype)
+        complex_array.real = values[0::2]
+        complex_array.imag = values[1::2]
+        if chirality != 1:
+            complex_array.imag *= chirality
+
+    if shape is not None:
+        complex_array = np.reshape(complex_array, shape).squeeze()
+    return complex_array
+
+
 def complex_array_from_iter(data_iter, length=-1, shape=None, chirality=1):
     """
     Converts an iterable over a series of real, imaginary pairs into
     a numpy.ndarray of complex64.
 
+    Readers should prefer complex_array_from_buffer, which avoids creating a
+    Python object for each value.
+
     Parameters
     ----------
     data_iter : iter
@@ -22,8 +87,128 @@ def complex_array_from_iter(data_iter, length=-1, shape=None, chirality=1):
     out : ndarray
         The output array
     """
-    complex_iter = (complex(r, chirality * i) for r, i in zip(data_iter, data_iter))
-    complex_array = np.fromiter(complex_iter, "complex64", length)
-    if shape is not None:
-        complex_array = np.reshape(complex_array, shape).squeeze()
-    return complex_array
+    values = np.fromiter(data_iter, np.float64, -1 if length < 0 else 2 * length)
+    return complex_array_from_buffer(values, length=length, shape=shape, chirality=chirality)
+
+
+def write_complex_text(fout, data, line_format, encoding=None, chunk_size=65536):
+    """
+    Writes complex data to a text file, with one point per line, formatting
+    many lines at a time rather than calling format for each point.
+
+    Parameters
+    ----------
+    fout : file
+        The file to write to, opened in text mode or, if an encoding is
+        given, in binary mode.
+    data : array-like
+        The complex data, written in C order.
+    line_format : str
+        printf style format for one line, taking the real and imaginary
+        parts, e.g. "%8.8e %8.8e\\n".
+    encoding : str, optional
+        If given, each block of text is encoded before it is written.
+    chunk_size : int
+        The number of lines to format at a time.
+    """
+    # interleaved real and imaginary parts as Python floats
+    values = np.asarray(data, dtype=np.complex128).reshape(-1).view(np.float64)
+    for start in range(0, len(values), 2 * chunk_size):
+        chunk = values[start:start + 2 * chunk_size]
+        text = (line_format * (len(chunk) // 2)) % tuple(chunk.tolist())
+        fout.write(text.encode(encoding) if encoding is not None else text)
+
+
+class LazyMRSData(object):
+    """
+    Deferred MRS data, as returned by the loaders when called with lazy=True.
+
+    The header parameters (dt, f0, te, tr, ppm0, transform and metadata) and
+    the shape of the data are available straight away, while the data itself
+    is only read and decoded the first time it is needed, by load() or by
+    indexing or converting the object to an array.
+
+    Parameters
+    ----------
+    read_data : callable
+        Function which reads the data and returns it as an ndarray.
+    shape : tuple
+        The shape of the data which read_data will return.
+    dtype : numpy.dtype
+        The dtype of the data which read_data will return.
+    parameters : dict
+        The keyword arguments for MRSData, apart from the data itself.
+    """
+    def __init__(self, read_data, shape, dtype, parameters):
+        self._read_data = read_data
+        self._data = None
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.dt = parameters["dt"]
+        self.f0 = parameters["f0"]
+        self.te = parameters.get("te", 30)
+        self.tr = parameters.get("tr", -1)
+        self.ppm0 = parameters.get("ppm0", 4.7)
+        self.transform = parameters.get("transform")
+        self.metadata = parameters.get("metadata")
+        self._parameters = parameters
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def np(self):
+        return self.shape[-1]
+
+    @property
+    def is_loaded(self):
+        return self._data is not None
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.load(), dtype=dtype)
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def load(self):
+        """
+        Reads the data, if it has not been read already.
+
+        Returns
+        -------
+        suspect.MRSData
+            The same data as would be returned by the loader with lazy=False.
+        """
+        if self._data is None:
+            self._data = MRSData(self._read_data(), **self._parameters)
+        return self._data
+
+
+def mrs_data(read_data, shape, parameters, lazy=False, dtype="complex64"):
+    """
+    Creates the MRSData, or the LazyMRSData if lazy is True, for a loader.
+
+    Parameters
+    ----------
+    read_data : callable
+        Function which reads the data and returns it as an ndarray.
+    shape : sequence of int
+        The shape of the data before any size 1 dimensions are squeezed out.
+    parameters : dict
+        The keyword arguments for MRSData, apart from the data itself.
+    lazy : bool
+        Whether to defer calling read_data until the data is used.
+    dtype : numpy.dtype
+        The dtype of the data which read_data will return.
+
+    Returns
+    -------
+    MRSData or LazyMRSData
+    """
+    if lazy:
+        return LazyMRSData(read_data, [n for n in shape if n != 1], dtype, parameters)
+    return MRSData(read_data(), **parameters)
@@ -0,0 +1,140 @@
+import concurrent.futures
+import os
+import struct
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy
+import pydicom
+
+from .rda import load_rda
+from .twix import load_twix
+from .siemens import load_siemens_dicom
+from .dicom import load_dicom
+
+
+def _load_any_dicom(filename):
+    # Siemens DICOM files need the CSA headers decoding, anything else is
+    # treated as standard DICOM MRS
+    dataset = pydicom.dcmread(filename, stop_before_pixels=True, specific_tags=["Manufacturer"])
+    if "SIEMENS" in str(dataset.get("Manufacturer", "")).upper():
+        return load_siemens_dicom(filename)
+    return load_dicom(filename)
+
+
+def get_loader(filename):
+    """
+    Chooses the loader function for a file from the signature at the start
+    of the file.
+
+    RDA files begin with a fixed header line, DICOM files have "DICM" after
+    a 128 byte preamble and TWIX VD files start with a zero followed by the
+    number of measurements. TWIX VB files have no signature and are
+    recognised by their .dat extension.
+
+    Parameters
+    ----------
+    filename : str
+        The path of the file to load
+
+    Returns
+    -------
+    callable
+        The function to load the file, taking the filename as its argument.
+    """
+    with open(filename, "rb") as fin:
+        signature = fin.read(132)
+    if signature.startswith(b">>> Begin of header <<<"):
+        return load_rda
+    if signature[128:132] == b"DICM":
+        return _load_any_dicom
+    if len(signature) >= 8:
+        first_uint, second_uint = struct.unpack("II", signature[:8])
+        if first_uint == 0 and second_uint <= 64:
+            return load_twix
+    if os.fspath(filename).lower().endswith(".dat"):
+        return load_twix
+    raise ValueError("Unrecognised file format for {}".format(filename))
+
+
+def _load_to_shared_memory(filename):
+    """
+    Worker function for load_many. Loads the file and copies the data into a
+    new shared memory block, returning the name of the block along with
+    everything needed to rebuild the MRSData object.
+    """
+    data = get_loader(filename)(filename)
+    array = numpy.ascontiguousarray(data)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    try:
+        numpy.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    shm.close()
+    # the MRS specific parameters have to be sent back alongside the array
+    # data to rebuild an MRSData object in the calling process
+    return shm.name, array.shape, array.dtype.str, type(data), data._parameters
+
+
+def _from_shared_memory(name, shape, dtype, data_type, parameters):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        array = numpy.ndarray(shape, dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    data = array.view(data_type)
+    data._parameters = parameters
+    return data
+
+
+def load_many(paths, workers=None):
+    """
+    Load a batch of MRS files in parallel, using a pool of worker processes.
+
+    The loader for each file is chosen by get_loader, so TWIX, RDA and
+    DICOM (both Siemens and standard MRS) files can be mixed in the same
+    batch. The loaded data is passed back from the workers in shared memory
+    rather than being pickled through a pipe, and errors are reported per
+    file: if a file cannot be loaded, the exception raised is returned in
+    its place and the rest of the batch carries on.
+
+    Parameters
+    ----------
+    paths : sequence of str
+        The paths of the files to load.
+    workers : int, optional
+        The number of worker processes, by default the number of CPUs. With
+        workers=1 the files are loaded one after another in this process.
+
+    Returns
+    -------
+    list
+        The loaded MRSData for each path, in the same order as paths, or the
+        exception raised when loading that path.
+    """
+    paths = list(paths)
+    results = [None] * len(paths)
+
+    if workers == 1:
+        for i, path in enumerate(paths):
+            try:
+                results[i] = get_loader(path)(path)
+            except Exception as e:
+                results[i] = e
+        return results
+
+    # start the resource tracker before the workers so that they share it,
+    # otherwise each worker reports the blocks it created as leaked when it
+    # exits, even though they are unlinked here
+    resource_tracker.ensure_running()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_load_to_shared_memory, path): i for i, path in enumerate(paths)}
+        for future in concurrent.futures.as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = _from_shared_memory(*future.result())
+            except Exception as e:
+                results[i] = e
+    return results
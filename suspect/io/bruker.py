@@ -1,9 +1,8 @@
 from suspect import MRSData
-from ._common import complex_array_from_iter
+from ._common import complex_array_from_buffer
 
 import os
 import re
-import struct
 
 
 def load_svs_bruker(fid_filename, acqp_filename=None, method_filename=None):
@@ -60,8 +59,6 @@ def load_svs_bruker(fid_filename, acqp_filename=None, method_filename=None):
     with open(fid_filename, 'rb') as fin:
         fid_bytes = fin.read()
     # bruker data is stored as real/imaginary int 32 pairs
-    num_ints = len(fid_bytes) // 4
-    fid_ints = struct.unpack("{0}i".format(num_ints), fid_bytes)
-    data = complex_array_from_iter(iter(fid_ints), num_ints // 2, chirality=-1)
+    data = complex_array_from_buffer(fid_bytes[:len(fid_bytes) // 4 * 4], "<i4", chirality=-1)
 
     return MRSData(data[digitiser_delay:], dt, f0)
@@ -1,13 +1,16 @@
-from suspect import MRSData
 import numpy as np
 
-from ._common import complex_array_from_iter
+from ._common import complex_array_from_buffer, mrs_data
 
 import pydicom
 import pydicom.tag
 
+# with lazy loading, element values larger than this are not read from the file
+# until they are accessed, this includes the spectroscopy data
+DEFER_SIZE = "4 KB"
 
-def load_dicom(filename):
+
+def load_dicom(filename, lazy=False):
     """
     Load a file in the DICOM Magnetic Resonance Spectroscopy format
     (SOP 1.2.840.10008.5.1.4.1.1.4.2)
@@ -16,13 +19,20 @@ def load_dicom(filename):
     ----------
     filename : str
         The name of the file to load
+    lazy : bool, optional
+        If True, only the header is read and a LazyMRSData is returned, the
+        spectroscopy data is read from the file when it is first used.
 
     Returns
     -------
-    MRSData
+    MRSData or LazyMRSData
         The loaded data from the file
     """
-    dataset = pydicom.dcmread(filename)
+    dataset = pydicom.dcmread(filename, defer_size=DEFER_SIZE if lazy else None)
+    return _load_dicom_dataset(dataset, lazy)
+
+
+def _load_dicom_dataset(dataset, lazy=False):
 
     # format for metadata dictionary elements:
     #   {'key': [[dicom_tag], required], ...}
@@ -54,21 +64,24 @@ def load_dicom(filename):
     data_shape = [parameters['frames'], parameters['rows'], parameters['cols'], parameters['num_second_spectral'],
                   parameters['num_points']]
 
-    # versions of pydicom >2.0.0 require explicit conversion from bytestring to list
-    if type(dataset[0x5600, 0x0020].value) == bytes:
-        data_iter = iter(np.frombuffer(dataset[0x5600, 0x0020].value, dtype=np.float32))
+    def read_data():
+        # versions of pydicom >2.0.0 give the data as bytes rather than a list
+        if type(dataset[0x5600, 0x0020].value) == bytes:
+            data_buffer = dataset[0x5600, 0x0020].value
 
-    elif type(dataset[0x5600, 0x0020].value) == list:
-        data_iter = iter(dataset[0x5600, 0x0020].value)
+        elif type(dataset[0x5600, 0x0020].value) == list:
+            data_buffer = np.array(dataset[0x5600, 0x0020].value, dtype=np.float32)
 
-    else:
-        raise TypeError("Unknown data type for dataset[0x5600, 0x0020].value")
+        else:
+            raise TypeError("Unknown data type for dataset[0x5600, 0x0020].value")
 
-    data = complex_array_from_iter(data_iter, shape=data_shape, chirality=-1)
+        return complex_array_from_buffer(data_buffer, "<f4", shape=data_shape, chirality=-1)
 
-    return MRSData(data,
-                   parameters['dt'],
-                   parameters['f0'],
-                   te=parameters['te'],
-                   tr=parameters['tr'],
-                   ppm0=parameters['ppm0'])
+    return mrs_data(read_data,
+                    data_shape,
+                    {"dt": parameters['dt'],
+                     "f0": parameters['f0'],
+                     "te": parameters['te'],
+                     "tr": parameters['tr'],
+                     "ppm0": parameters['ppm0']},
+                    lazy)
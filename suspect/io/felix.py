@@ -1,3 +1,4 @@
+import numpy
 import struct
 
 # this is what we have been able to deduce about the Felix file header
@@ -82,10 +83,10 @@ def save_mat(filename, data):
 
         fout.write(header_bytes)
 
-        # write each fid of the COSY line by line
-        for fid in data:
-            # start with the number of data words in the FID
-            fout.write(struct.pack("<I", len(fid) * 2))
-            # write out each point, real then imaginary
-            for point in fid:
-                fout.write(struct.pack("<ff", point.real, point.imag))
+        # each fid of the COSY is the number of data words in the FID,
+        # followed by each point as a single precision real then imaginary
+        fid_length = data.shape[1]
+        fids = numpy.empty(data.shape[0], dtype=[("words", "<u4"), ("points", "<c8", (fid_length,))])
+        fids["words"] = fid_length * 2
+        fids["points"] = data
+        fout.write(fids.tobytes())
@@ -1,9 +1,12 @@
+import hashlib
 import numpy
 import os
-import itertools
 import parsley
+import pickle
 import warnings
 
+from ._common import complex_array_from_buffer, write_complex_text
+
 basis_grammar = r"""
 namelist = '$' name:n pairs:p ws -> (n, dict(p))
 pairs = (pair:first (pair)*:rest -> [first] + rest) | -> []
@@ -40,8 +43,7 @@ def save_raw(filename, data, seq='PRESS'):
         else:
             warnings.warn("Saving LCModel data without a transform, using default voxel volume of 1ml")
         fout.write(" $END\n")
-        for point in numpy.nditer(data, order='C'):
-            fout.write("  {0: 4.6e}  {1: 4.6e}\n".format(float(point.real), float(point.imag)))
+        write_complex_text(fout, data, "  % 4.6e  % 4.6e\n")
 
 
 def write_all_files(filename, data, wref_data=None, params=None, filbas="/home/spectre/.lcmodel/basis-sets/provencher/press_te30_3t_gsh_v3.basis"):
@@ -146,23 +148,27 @@ def write_all_files(filename, data, wref_data=None, params=None, filbas="/home/s
     if wref_data is not None:
         base_params["FILH2O"] = "{}".format(base_params["FILH2O"])
 
+    # the control file is the same for every slice, so build it only once
+    control_lines = [" $LCMODL",
+                     " OWNER = ''",
+                     " KEY = 123456789",
+                     " DELTAT = {}".format(data.dt),
+                     " HZPPPM = {}".format(data.f0),
+                     " NUNFIL = {}".format(data.np)]
+    for key, value in base_params.items():
+        if isinstance(value, str):
+            value = "'{0}'".format(value)
+        elif isinstance(value, bool):
+            value = 'T' if value else 'F'
+        control_lines.append(" {0} = {1}".format(key, value))
+    control_lines.append(" $END\n")
+    control_text = "\n".join(control_lines)
+
     for slice_index in range(shape[2]):
         control_filename = "{0}_sl{1}.CONTROL".format(file_root, slice_index)
         control_filepath = os.path.join(folder, control_filename)
         with open(control_filepath, 'wt') as fout:
-            fout.write(" $LCMODL\n")
-            fout.write(" OWNER = ''\n")
-            fout.write(" KEY = 123456789\n")
-            fout.write(" DELTAT = {}\n".format(data.dt))
-            fout.write(" HZPPPM = {}\n".format(data.f0))
-            fout.write(" NUNFIL = {}\n".format(data.np))
-            for key, value in base_params.items():
-                if isinstance(value, str):
-                    value = "'{0}'".format(value)
-                elif isinstance(value, bool):
-                    value = 'T' if value else 'F'
-                fout.write(" {0} = {1}\n".format(key, value))
-            fout.write(" $END\n")
+            fout.write(control_text)
 
 
 def read_coord(filename):
@@ -227,12 +233,9 @@ def read_coord(filename):
     number_of_point_lines = int((num_ppm_points + 9) / 10)
 
     def read_points(starting_line):
-        points = []
-        # we can use map to convert the 10 string numbers on each line to a
-        # list of floats, then extend the current list with the new one
-        for line_number in range(starting_line, starting_line + number_of_point_lines):
-            points.extend(map(float, coord_lines[line_number].split()))
-        return points
+        # convert all the lines of the block to floats in one go
+        block = "".join(coord_lines[starting_line:starting_line + number_of_point_lines])
+        return list(map(float, block.split()))
 
     ppm_points = read_points(ppm_axis_info_line + 1)
 
@@ -270,45 +273,106 @@ def read_coord(filename):
     }
 
 
-def read_basis(filename):
-    with open(filename) as fin:
-        basis_set = {"SPECTRA": {}}
-        data = fin.read().lstrip()
-        # does the data start with a namelist
-        while data.startswith("$"):
-            # where does the namelist end
-            namelist_data, _, data = data.partition("$END")
-            data = data.lstrip()
-            namelist = parser(namelist_data).namelist()
-
-            if namelist[0].upper() == "SEQPAR":
-                basis_set["SEQPAR"] = namelist[1]
-
-            elif namelist[0].upper() == "BASIS1":
-                basis_set["BASIS1"] = namelist[1]
-                # find out the number of points in each spectrum
-                np = namelist[1]["NDATAB"]
-                # 3 complex points per line, how many lines
-                num_lines = ((np - 1) // 3) + 1
-
-            elif namelist[0].upper() == "BASIS":
-                metabolite_name = namelist[1]["METABO"]
-                basis_set["SPECTRA"][metabolite_name] = namelist[1]
-                # after each BASIS namelist come the actual data points
-                points = []
-                for line in itertools.islice(data.splitlines(), num_lines):
-                    points.extend(map(float, line.split()))
-
-                points = iter(points)
-
-                complex_points = (complex(r, i) for r, i in zip(points, points))
-                complex_data = numpy.fromiter(complex_points, "complex64", np)
-                basis_set["SPECTRA"][metabolite_name]["data"] = complex_data
-                # find start of next namelist
-                start = data.find("$")
-                data = data[start:]
-
-        return basis_set
+def read_basis(filename, cache_dir=None):
+    """
+    Reads an LCModel .basis file.
+
+    The file is split into its namelists and data blocks in a single pass,
+    and only the namelists which are returned (SEQPAR, BASIS1 and BASIS) are
+    parsed. Each block of data points is converted to numbers in one go.
+
+    Parameters
+    ----------
+    filename : str
+        The path of the basis file.
+    cache_dir : str, optional
+        A folder in which to cache the parsed basis set, keyed on a hash of
+        the file contents. If a basis set with the same contents has already
+        been read, it is loaded from the cache instead of being parsed again.
+        The cache files are pickles, so only folders which are not writable
+        by others should be used.
+
+    Returns
+    -------
+    dict
+        The SEQPAR and BASIS1 namelists, and a SPECTRA dict which maps each
+        metabolite name to its BASIS namelist, with the spectrum added under
+        "data".
+    """
+    with open(filename, "rb") as fin:
+        raw_data = fin.read()
+
+    if cache_dir is None:
+        return _parse_basis(raw_data.decode("latin-1"))
+
+    cache_filename = os.path.join(cache_dir, hashlib.sha1(raw_data).hexdigest() + ".pickle")
+    if os.path.isfile(cache_filename):
+        return _load_basis_cache(cache_filename)
+    basis_set = _parse_basis(raw_data.decode("latin-1"))
+    os.makedirs(cache_dir, exist_ok=True)
+    _save_basis_cache(cache_filename, basis_set)
+    return basis_set
+
+
+def _parse_basis(data):
+    basis_set = {"SPECTRA": {}}
+    # the file is a sequence of namelists, each starting with $NAME and
+    # ending with $END, and each BASIS namelist is followed by its data
+    position = len(data) - len(data.lstrip())
+    while data.startswith("$", position):
+        # where does the namelist end
+        namelist_end = data.find("$END", position)
+        if namelist_end < 0:
+            namelist_end = len(data)
+        namelist_data = data[position:namelist_end]
+        namelist_name = namelist_data[1:].split(None, 1)[0].upper()
+        position = namelist_end + 4
+        # find start of next namelist
+        next_position = data.find("$", position)
+        if next_position < 0:
+            next_position = len(data)
+
+        # the other namelists (e.g. NMUSED) are large and we don't use them,
+        # so they are skipped without parsing
+        if namelist_name == "SEQPAR":
+            basis_set["SEQPAR"] = parser(namelist_data).namelist()[1]
+
+        elif namelist_name == "BASIS1":
+            basis_set["BASIS1"] = parser(namelist_data).namelist()[1]
+            # find out the number of points in each spectrum
+            np = basis_set["BASIS1"]["NDATAB"]
+
+        elif namelist_name == "BASIS":
+            namelist = parser(namelist_data).namelist()[1]
+            metabolite_name = namelist["METABO"]
+            basis_set["SPECTRA"][metabolite_name] = namelist
+            # after each BASIS namelist come the actual data points
+            points = numpy.array(data[position:next_position].split()[:2 * np], dtype=numpy.float64)
+            if len(points) < 2 * np:
+                raise ValueError("Basis spectrum {} has only {} of {} points".format(metabolite_name,
+                                                                                    len(points) // 2,
+                                                                                    np))
+            namelist["data"] = complex_array_from_buffer(points)
+
+        position = next_position
+
+    return basis_set
+
+
+def _save_basis_cache(filename, basis_set):
+    # the basis set is pickled as it is, so that loading it gives back
+    # exactly the same namelist values and arrays as parsing the file.
+    # write to a temporary file first, so that a partly written cache file
+    # is never read by another process
+    temp_filename = "{}.{}.tmp".format(filename, os.getpid())
+    with open(temp_filename, "wb") as fout:
+        pickle.dump(basis_set, fout, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_filename, filename)
+
+
+def _load_basis_cache(filename):
+    with open(filename, "rb") as fin:
+        return pickle.load(fin)
 
 
 def save_basis(filename, basis):
@@ -1,4 +1,5 @@
 from suspect import MRSData, rotation_matrix, transformation_matrix
+from ._common import complex_array_from_buffer
 
 import os
 import numpy
@@ -58,10 +59,10 @@ def load_sdat(sdat_filename, spar_filename=None, spar_encoding=None):
     with open(sdat_filename, 'rb') as fin:
         raw_bytes = fin.read()
 
+    # the floats are in real, imaginary pairs, and the data is stored as the
+    # complex conjugate of our convention
     floats = _vax_to_ieee_single_float(raw_bytes)
-    data_iter = iter(floats)
-    complex_iter = (complex(r, -i) for r, i in zip(data_iter, data_iter))
-    raw_data = numpy.fromiter(complex_iter, "complex64")
+    raw_data = complex_array_from_buffer(floats, chirality=-1)
     raw_data = numpy.reshape(raw_data, (parameter_dict["rows"], parameter_dict["samples"])).squeeze()
 
     # calculate transformation matrix
@@ -97,7 +98,7 @@ def load_sdat(sdat_filename, spar_filename=None, spar_encoding=None):
 
 
 def _vax_to_ieee_single_float(data):
-    """Converts a float in Vax format to IEEE format.
+    """Converts floats in Vax format to IEEE format.
 
     Data should be a single string of chars that have been read in from
     a binary file. These will be processed 4 at a time into float values.
@@ -115,41 +116,30 @@ def _vax_to_ieee_single_float(data):
     bits :      1        2      9      10                               32
     bytes :     byte2           byte1               byte4         byte3
 
+    Read as a pair of little endian 16 bit words, swapping the two words
+    gives the same bit layout as an IEEE single float. The value of the VAX
+    float is (0.5 + F / 2^24) * 2^(E - 128) compared to IEEE's
+    (1 + F / 2^23) * 2^(E - 127), so we only need to subtract 2 from the
+    exponent, which is done on the whole array at once.
+
     Returns
     -------
-    f : array
-        Contains floats in IEEE format
+    f : numpy.ndarray
+        Contains floats in IEEE format, as float32
 
     """
-    f = []
-    nfloat = int(len(data) / 4)
-    for i in range(nfloat):
-
-        byte2 = data[0 + i*4]
-        byte1 = data[1 + i*4]
-        byte4 = data[2 + i*4]
-        byte3 = data[3 + i*4]
-
-        # hex 0x80 = binary mask 10000000
-        # hex 0x7f = binary mask 01111111
-
-        sign = (byte1 & 0x80) >> 7
-        expon = ((byte1 & 0x7f) << 1) + ((byte2 & 0x80) >> 7)
-        fract = ((byte2 & 0x7f) << 16) + (byte3 << 8) + byte4
-
-        if sign == 0:
-            sign_mult = 1.0
-        else:
-            sign_mult = -1.0
-
-        if 0 < expon:
-            # note 16777216.0 == 2^24
-            val = sign_mult * (0.5 + (fract/16777216.0)) * pow(2.0, expon - 128.0)
-            f.append(val)
-        elif expon == 0 and sign == 0:
-            f.append(0)
-        else:
-            f.append(0)
-            # may want to raise an exception here ...
+    words = numpy.frombuffer(data, dtype="<u2", count=len(data) // 4 * 2).reshape(-1, 2)
+    ieee_bits = (words[:, 0].astype(numpy.uint32) << 16) | words[:, 1]
+    exponent = (ieee_bits >> 23) & 0xff
+
+    f = (ieee_bits - numpy.uint32(2 << 23)).view(numpy.float32)
+
+    # exponents of 2 or less can't be shifted without underflowing, they are
+    # only expected for zero but any others are scaled as floating point
+    small = exponent <= 2
+    if numpy.any(small):
+        f[small] = ieee_bits[small].view(numpy.float32).astype(numpy.float64) * 0.25
+        # a zero exponent means zero (or a reserved operand) in VAX
+        f[exponent == 0] = 0
 
     return f
@@ -1,7 +1,8 @@
 from suspect import MRSData, transformation_matrix
+from ._common import complex_array_from_buffer
 
 import numpy
-import struct
+import os
 import re
 
 # The RDA format consists of a large number of key value pairs followed by raw
@@ -33,7 +34,28 @@ rda_types = {
 }
 
 
-def load_rda(filename):
+def load_rda(filename, dtype="complex64", mmap=False):
+    """
+    Load a Siemens .rda file.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file to load.
+    dtype : numpy.dtype, optional
+        The dtype of the loaded data. The file stores complex128 values, by
+        default these are converted to complex64.
+    mmap : bool, optional
+        If True, the data is memory mapped from the file rather than read into
+        memory. Together with dtype="complex128" this means that only the
+        parts of the data which are actually used are read from disk. The map
+        is copy-on-write, changes to the data are never saved to the file.
+
+    Returns
+    -------
+    MRSData
+        The loaded data.
+    """
     header_dict = {}
     with open(filename, 'rb') as fin:
         header_line = fin.readline().strip()
@@ -84,23 +106,27 @@ def load_rda(filename):
                             header_dict[key][index[0]].append(0)
                         header_dict[key][index[0]][index[1]] = value
             header_line = fin.readline().strip().decode('windows-1252')
-        # now we can read the data
-        data = fin.read()
 
-    # the shape of the data in slice, column, row, time format
-    data_shape = header_dict["CSIMatrixSize"][::-1]
-    data_shape.append(header_dict["VectorSize"])
-    data_shape = numpy.array(data_shape)
-    data_size = numpy.prod(data_shape) * 16  # each data point is a complex double, 16 bytes
-    if data_size != len(data):
-        raise ValueError("Error reading file {}: expected {} bytes of data, got {}".format(filename, data_size, len(data)))
+        # the shape of the data in slice, column, row, time format
+        data_shape = header_dict["CSIMatrixSize"][::-1]
+        data_shape.append(header_dict["VectorSize"])
+        data_shape = tuple(int(n) for n in data_shape)
+        # each data point is a complex double, 16 bytes
+        data_offset = fin.tell()
+        data_size = int(numpy.prod(data_shape)) * 16
+        file_data_size = os.fstat(fin.fileno()).st_size - data_offset
+        if data_size != file_data_size:
+            raise ValueError("Error reading file {}: expected {} bytes of data, got {}".format(filename, data_size, file_data_size))
 
-    # unpack the data into complex numbers
-    data_as_floats = struct.unpack("<{}d".format(numpy.prod(data_shape) * 2), data)
-    float_iter = iter(data_as_floats)
-    complex_iter = (complex(r, i) for r, i in zip(float_iter, float_iter))
-    complex_data = numpy.fromiter(complex_iter, "complex64", int(numpy.prod(data_shape)))
-    complex_data = numpy.reshape(complex_data, data_shape).squeeze()
+        # the data is stored as little endian (real, imaginary) double pairs,
+        # so it can be used directly without unpacking
+        num_values = 2 * int(numpy.prod(data_shape))
+        if mmap:
+            values = numpy.memmap(filename, dtype="<f8", mode="c", offset=data_offset, shape=(num_values,))
+        else:
+            values = numpy.empty(num_values, dtype="<f8")
+            fin.readinto(values)
+    complex_data = complex_array_from_buffer(values, shape=data_shape, complex_dtype=dtype)
 
     # some .rda files have a misnamed field, correct this here
     if "VOIReadoutFOV" not in header_dict:
@@ -5,9 +5,9 @@ import re
 import struct
 import warnings
 
-from suspect import MRSData, transformation_matrix, rotation_matrix
-from ._common import complex_array_from_iter
-from .dicom import load_dicom
+from suspect import transformation_matrix, rotation_matrix
+from ._common import complex_array_from_buffer, mrs_data
+from .dicom import DEFER_SIZE, _load_dicom_dataset
 from .twix import calculate_orientation
 
 CSA1 = 0
@@ -39,64 +39,93 @@ ima_types = {
 }
 
 
-def read_csa_header(csa_header_bytes):
+# the conversion for the items of each known tag in the CSA header
+_ima_converters = dict([(name, float) for name in ima_types["floats"]] +
+                       [(name, int) for name in ima_types["integers"]] +
+                       [(name, str) for name in ima_types["strings"]])
+
+# the CSA header tags used by _load_siemens_dicom_nonxa
+_nonxa_csa_tags = ["SpectroscopyAcquisitionOut-of-planePhaseSteps", "Rows", "Columns", "DataPointColumns",
+                   "VoiInPlaneRotation", "VoiOrientation", "PixelSpacing", "SliceThickness", "VoiPosition",
+                   "VoiReadoutFoV", "VoiPhaseFoV", "VoiThickness", "RealDwellTime", "ImagingFrequency",
+                   "EchoTime", "RepetitionTime"]
+
+
+def read_csa_header(csa_header_bytes, tags=None):
+    """
+    Reads a Siemens CSA header into a dictionary.
+
+    Parameters
+    ----------
+    csa_header_bytes : bytes
+        The contents of the CSA header DICOM element.
+    tags : collection of str, optional
+        The names of the tags to decode, by default all of them. The items of
+        any other tags are skipped over without being decoded.
+
+    Returns
+    -------
+    dict
+        The decoded items of each tag, converted according to ima_types. Tags
+        with a single item map directly to that item, otherwise to a list.
+    """
+    # work on a memoryview so that slicing the header never copies it
+    csa_header_bytes = memoryview(csa_header_bytes).cast("B")
+    header_length = len(csa_header_bytes)
+    if tags is not None:
+        tags = set(tags)
     # two possibilities exist here, either this is a CSA2 format beginning with an SV10 string, or a CSA1 format which
     # doesn't. in CSA2 after the "SV10" are four junk bytes, then the number of tags in a uint32 and a delimiter uint32
     # containing the value 77. in CSA1 there is just the number of tags and the delimiter. after that the two formats
     # contain the same structure for each tag, but the definition of the size of the items in each tag is different
     # between the two versions
-    if csa_header_bytes[:4] == "SV10".encode('latin-1'):
-        num_tags, delimiter = struct.unpack("<II", csa_header_bytes[8:16])
+    if csa_header_bytes[:4] == b"SV10":
+        num_tags, delimiter = struct.unpack_from("<II", csa_header_bytes, 8)
         header_offset = 16
         header_format = CSA2
     else:
-        num_tags, delimiter = struct.unpack("<II", csa_header_bytes[:8])
+        num_tags, delimiter = struct.unpack_from("<II", csa_header_bytes, 0)
         header_offset = 8
         header_format = CSA1
     # now we can iteratively read the tags and the items inside them
     csa_header = {}
     for i in range(num_tags):
-        name, vm, vr, syngo_dt, nitems, delimiter = struct.unpack("<64si4siii",
-                                                                  csa_header_bytes[header_offset:(header_offset + 84)])
+        name, vm, vr, syngo_dt, nitems, delimiter = struct.unpack_from("<64si4siii", csa_header_bytes, header_offset)
         header_offset += 84
         # the name of the tag is 64 bytes long, but the string we want is null-terminated inside, so extract the
         # real name by taking only bytes up until the first 0x00
-        name = name.decode('latin-1')
-        name = name.split("\x00", 1)[0]
+        name = name.split(b"\x00", 1)[0].decode('latin-1')
+        decode = tags is None or name in tags
         # read all the items inside this tag
         item_list = []
         for j in range(nitems):
-            sizes = struct.unpack("<4L", csa_header_bytes[header_offset:(header_offset + 16)])
+            sizes = struct.unpack_from("<4L", csa_header_bytes, header_offset)
             header_offset += 16
             if header_format == CSA2:
                 item_length = sizes[1]
-                if (header_offset + item_length) > len(csa_header_bytes):
-                    item_length = len(csa_header_bytes) - header_offset
+                if (header_offset + item_length) > header_length:
+                    item_length = header_length - header_offset
             elif header_format == CSA1:
                 item_length = sizes[0]
-            item, = struct.unpack("<%ds" % item_length,
-                                  csa_header_bytes[header_offset:(header_offset + item_length)])
-            item = item.decode('latin-1')
-            item = item.split("\x00", 1)[0]
-            if item_length > 0:
-                if name in ima_types["floats"]:
-                    item = float(item)
-                elif name in ima_types["integers"]:
-                    item = int(item)
-                elif name in ima_types["strings"]:
-                    pass
+            if decode and item_length > 0:
+                item = bytes(csa_header_bytes[header_offset:(header_offset + item_length)])
+                item = item.split(b"\x00", 1)[0].decode('latin-1')
+                if name in _ima_converters:
+                    item = _ima_converters[name](item)
                 else:
                     warnings.warn("Unhandled name {0} with vr {1} and value {2}".format(name, vr, item))
                 item_list.append(item)
             header_offset += item_length
             header_offset += (4 - (item_length % 4)) % 4  # move the offset to the next 4 byte boundary
+        if not decode:
+            continue
         if len(item_list) == 1:
             item_list = item_list[0]
         csa_header[name] = item_list
     return csa_header
 
 
-def load_siemens_dicom(filename):
+def load_siemens_dicom(filename, lazy=False):
     """Imports a file in the Siemens .IMA format for non-XA version and .dcm for XA 
     version.
 
@@ -104,42 +133,65 @@ def load_siemens_dicom(filename):
     ----------
     filename : str
         The name of the file to import
+    lazy : bool, optional
+        If True, only the header is read and a LazyMRSData is returned, the
+        spectroscopy data is read from the file when it is first used. Note
+        that for XA files the in-plane rotation has to be found in the
+        measurement protocol, and reading that already reads the whole file,
+        so for those lazy only defers decoding the data.
 
     """
-    # Start by reading in the DICOM file completely.
+    # Start by reading in the DICOM file completely, or everything but the
+    # large elements if lazy.
     with open(filename, "rb") as f:
-        dataset = pydicom.dcmread(f)
+        dataset = pydicom.dcmread(f, defer_size=DEFER_SIZE if lazy else None)
         software_version = dataset[0x0018, 0x1020].value
         if "XA" in software_version:
             f.seek(0)
+            # this pass picks up the measurement protocol, which is needed
+            # for the orientation. it covers the whole file including the
+            # data, and cannot use defer_size because deferred elements are
+            # read back using the filename of a FileDataset, so XA files are
+            # always read completely here even when lazy
             other_ds = pydicom.filereader.read_dataset(f, True, True)
-            return _load_siemens_dicom_xa(dataset, other_ds)
+            return _load_siemens_dicom_xa(dataset, other_ds, lazy)
         else:
-            return _load_siemens_dicom_nonxa(dataset)
+            return _load_siemens_dicom_nonxa(dataset, lazy)
+
 
-def _load_siemens_dicom_nonxa(dataset):
+def _private_block(dataset, group, creator):
+    # the private creator elements are (gggg, 0010) to (gggg, 00ff), only
+    # these are checked so that none of the other elements in the group have
+    # to be decoded by pydicom
+    block = 0
+    for tag in dataset.keys():
+        if tag.group == group and 0x10 <= tag.element <= 0xff and dataset[tag].value == creator:
+            block = tag.element
+    return block
+
+
+def _load_siemens_dicom_nonxa(dataset, lazy=False):
     """Imports a file in the Siemens .IMA format for older/non-XA version.
 
     Parameters
     ----------
     dataset : pydicom.dataset.FileDataset
         Loaded DICOM dataset object
+    lazy : bool, optional
+        If True, returns a LazyMRSData which only reads the data when used.
 
     """
     # the .IMA format is a DICOM standard, unfortunately most of the information is contained inside a private and very
     # complicated header with its own data storage format, we have to get that information out along with the data
     # now loop through the available element in group (0029) to work out the element 
     # number of the csa header
-    header_index = 0
-    for e in dataset.group_dataset(0x0029).iterall():
-        if e.value == "SIEMENS CSA HEADER":
-            header_index = e.tag.element
+    header_index = _private_block(dataset, 0x0029, "SIEMENS CSA HEADER")
     # check that we have found the header
     if header_index == 0:
         raise KeyError("Could not find header index")
     # now we know which tag contains the CSA image header info: (0029, xx10)
     csa_header_bytes = dataset[0x0029, 0x0100 * header_index + 0x0010].value
-    csa_header = read_csa_header(csa_header_bytes)
+    csa_header = read_csa_header(csa_header_bytes, _nonxa_csa_tags)
     # for key, value in csa_header.items():
     #    print("%s : %s" % (str(key), str(value)))
     # we can also get the series header info: (0029, xx20), but this seems to be mostly pretty boring
@@ -153,39 +205,40 @@ def _load_siemens_dicom_nonxa(dataset):
 
     # now loop through the available element in group (7fe1) to work out the element
     # number of the data index
-    data_index = 0
-    for e in dataset.group_dataset(0x7fe1).iterall():
-        if e.value == "SIEMENS CSA NON-IMAGE":
-            data_index = e.tag.element
+    data_index = _private_block(dataset, 0x7fe1, "SIEMENS CSA NON-IMAGE")
     # check that we have found the data
     if data_index == 0:
         raise KeyError("Could not find data index")
-    # extract the actual data bytes
-    csa_data_bytes = dataset[0x7fe1, 0x0100 * data_index + 0x0010].value
-    # the data is stored as a list of 4 byte floats in (real, imaginary) pairs
-    data_floats = struct.unpack("<%df" % (len(csa_data_bytes) / 4), csa_data_bytes)
-
-    # a bug report (#143) has been submitted that for at least one .IMA dataset
-    # created with an old Siemens VB17 WIP, the data_shape worked out above
-    # does not match the actual size of the data because the
-    # Out-of-planePhaseSteps value is not the number of slices. Assuming this
-    # is a rare situation that is unlikely to happen often, the simple solution
-    # is simply to check the size matches here, and if not then use the size
-    # of data available as the shape
-    available_points = len(data_floats) // 2
-    if numpy.prod(data_shape) != available_points:
-        data_shape = (available_points,)
-        warnings.warn("The calculated data shape for this file {} does not "
-                      "match the size of data contained in the file {}. "
-                      "Therefore the returned data shape from this function "
-                      "will simply be ({},), any reshaping must be done by "
-                      "the user. If you need help with this or believe this "
-                      "has occured in error, please raise an issue at"
-                      "https://github.com/openmrslab/suspect/issues.")
-
-    complex_data = complex_array_from_iter(iter(data_floats),
-                                           length=len(data_floats) // 2,
-                                           shape=data_shape)
+
+    def read_data():
+        # extract the actual data bytes
+        csa_data_bytes = dataset[0x7fe1, 0x0100 * data_index + 0x0010].value
+        # the data is stored as a list of 4 byte floats in (real, imaginary)
+        # pairs, which is exactly complex64. the bytes from pydicom are
+        # immutable, so they are copied once into a bytearray to give
+        # writable data which can still be viewed as complex64 directly
+        complex_data = complex_array_from_buffer(bytearray(csa_data_bytes), "<f4")
+
+        # a bug report (#143) has been submitted that for at least one .IMA dataset
+        # created with an old Siemens VB17 WIP, the data_shape worked out above
+        # does not match the actual size of the data because the
+        # Out-of-planePhaseSteps value is not the number of slices. Assuming this
+        # is a rare situation that is unlikely to happen often, the simple solution
+        # is simply to check the size matches here, and if not then use the size
+        # of data available as the shape
+        available_points = len(complex_data)
+        shape = data_shape
+        if numpy.prod(shape) != available_points:
+            shape = (available_points,)
+            warnings.warn("The calculated data shape for this file {} does not "
+                          "match the size of data contained in the file {}. "
+                          "Therefore the returned data shape from this function "
+                          "will simply be ({},), any reshaping must be done by "
+                          "the user. If you need help with this or believe this "
+                          "has occured in error, please raise an issue at"
+                          "https://github.com/openmrslab/suspect/issues.")
+
+        return complex_data.reshape(shape).squeeze()
 
     in_plane_rot = csa_header["VoiInPlaneRotation"]
     x_vector = numpy.array([-1, 0, 0])
@@ -210,16 +263,18 @@ def _load_siemens_dicom_nonxa(dataset):
         "voi_size": voi_size
     }
 
-    return MRSData(complex_data,
-                   csa_header["RealDwellTime"] * 1e-9,
-                   csa_header["ImagingFrequency"],
-                   te=csa_header["EchoTime"],
-                   tr=csa_header["RepetitionTime"],
-                   transform=transform,
-                   metadata=metadata)
+    return mrs_data(read_data,
+                    data_shape,
+                    {"dt": csa_header["RealDwellTime"] * 1e-9,
+                     "f0": csa_header["ImagingFrequency"],
+                     "te": csa_header["EchoTime"],
+                     "tr": csa_header["RepetitionTime"],
+                     "transform": transform,
+                     "metadata": metadata},
+                    lazy)
 
 
-def _load_siemens_dicom_xa(dataset, other_ds):
+def _load_siemens_dicom_xa(dataset, other_ds, lazy=False):
     """Imports a file in the Siemens .IMA format for XA version.
 
     Parameters
@@ -228,11 +283,13 @@ def _load_siemens_dicom_xa(dataset, other_ds):
         Loaded DICOM dataset object
     other_ds : pydicom.dataset.FileDataset
         Other dataset that contains meas headers 
+    lazy : bool, optional
+        If True, returns a LazyMRSData which only reads the data when used.
 
     """
     # Newer XA version uses combination of DICOM Magnetic Resonance Spectroscopy format (SOP 1.2.840.10008.5.1.4.1.1.4.2)
     # and a new Siemens-specific DICOM tags for some metadata (not CSA header anymore)
-    mrsdata = load_dicom(dataset.filename)
+    mrsdata = _load_dicom_dataset(dataset, lazy)
 
     possible_inner_tags = [
         {
@@ -312,12 +369,14 @@ def _load_siemens_dicom_xa(dataset, other_ds):
                                       column_vector,
                                       pos_vector,
                                       voi_size)
-    return MRSData(numpy.array(mrsdata),
-                   dt,
-                   mrsdata.f0,
-                   te=te,
-                   tr=tr,
-                   transform=transform)
+    return mrs_data(lambda: numpy.array(mrsdata),
+                    mrsdata.shape,
+                    {"dt": dt,
+                     "f0": mrsdata.f0,
+                     "te": te,
+                     "tr": tr,
+                     "transform": transform},
+                    lazy)
 
 # def anonymize_siemens_dicom(filename, anonymized_filename):
 # TODO: anonymize dicom
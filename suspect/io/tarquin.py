@@ -1,10 +1,14 @@
 from suspect import MRSSpectrum
 
+import concurrent.futures
 import subprocess
 import parse
 import re
 import numpy as np
 import os
+import tempfile
+
+from ._common import write_complex_text
 
 
 def save_dpt(filename, data):
@@ -18,8 +22,7 @@ def save_dpt(filename, data):
         fout.write("PPM_reference\t{0:8.8e}\n".format(data.ppm0).encode())
         fout.write("Echo_time\t{0:8.8e}\n".format(data.te * 1e-3).encode())
         fout.write("Real_FID\tImag_FID\t\n".encode())
-        for x in data:
-            fout.write("{0.real:8.8e} {0.imag:8.8e}\n".format(x).encode())
+        write_complex_text(fout, data, "%8.8e %8.8e\n", encoding="ascii")
 
 
 def read_output(filename):
@@ -143,26 +146,124 @@ def _extract_fit_data(ref_data, metabolite_names, combined_data):
     }
 
 
-def process(data, wref=None, options={}):
-    save_dpt("/tmp/temp.dpt", data)
+def _run_tarquin(data, wref, options, working_dir, tarquin_path):
+    """
+    Runs Tarquin on the data, with all the input and output files kept in
+    working_dir, and reads the results.
+    """
+    options = dict(options)
+    input_filename = os.path.join(working_dir, "temp.dpt")
+    output_filename = os.path.join(working_dir, "output.txt")
+    fit_filename = os.path.join(working_dir, "fit.txt")
+    save_dpt(input_filename, data)
     if wref is not None:
-        save_dpt("/tmp/wref.dpt", wref)
-        options["input_w"] = "/tmp/wref.dpt"
-    option_string = ""
+        options["input_w"] = os.path.join(working_dir, "wref.dpt")
+        save_dpt(options["input_w"], wref)
+    args = [tarquin_path,
+            "--input", input_filename,
+            "--format", "dpt",
+            "--output_txt", output_filename,
+            "--output_fit", fit_filename]
     for key, value in options.items():
-        option_string += " --{} {}".format(key, value)
-    result = subprocess.run("tarquin --input {} --format dpt --output_txt {} --output_fit {}{}".format(
-        "/tmp/temp.dpt", "/tmp/output.txt", "/tmp/fit.txt", option_string
-    ), shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding="UTF-8")
+        args.extend(["--{}".format(key), str(value)])
+    result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding="UTF-8")
     if result.returncode != 0:
         raise Exception("Error doing quantification with TARQUIN: {}".format(result.stderr))
-    # with open("/tmp/output.txt") as fin:
-    #    result = fin.read()
-    if os.path.isfile("/tmp/output.txt"):
-        result = read_output("/tmp/output.txt")
+    if os.path.isfile(output_filename):
+        result = read_output(output_filename)
     else:
-        raise FileNotFoundError("Could not find TARQUIN output file at /tmp/output.txt")
-    metabolite_names, fit_data = read_fit_file("/tmp/fit.txt")
+        raise FileNotFoundError("Could not find TARQUIN output file at {}".format(output_filename))
+    metabolite_names, fit_data = read_fit_file(fit_filename)
     fit_results = _extract_fit_data(data, metabolite_names, fit_data)
     result["plots"] = fit_results
     return result
+
+
+def process(data, wref=None, options={}, tarquin_path="tarquin"):
+    """
+    Runs the Tarquin basis set fitting program on the data.
+
+    The input and output files are kept in a new temporary directory, so
+    that several fits can be run at the same time.
+
+    Parameters
+    ----------
+    data : MRSData
+        The water suppressed FID data to be fitted.
+    wref : MRSData
+        Optional water reference file for concentration scaling.
+    options : dict
+        Set of Tarquin parameters to override.
+    tarquin_path : str
+        The Tarquin executable to run.
+
+    Returns
+    -------
+    dict
+        Output from running Tarquin on the data
+    """
+    with tempfile.TemporaryDirectory(prefix="suspect_tarquin_") as working_dir:
+        return _run_tarquin(data, wref, options, working_dir, tarquin_path)
+
+
+def process_many(data, wrefs=None, options={}, workers=None, tarquin_path="tarquin"):
+    """
+    Runs Tarquin on a batch of datasets, several at a time, returning an
+    iterator over the results as each fit finishes.
+
+    Each fit gets its own temporary directory and Tarquin process, so the
+    number of fits running at once is set by workers. The results are
+    yielded in the order the fits finish, not the order of the input, along
+    with the index of the dataset. If a fit fails, the exception it raised
+    is yielded in place of its result and the rest of the batch carries on.
+    The arguments are checked when process_many is called, and the fits
+    start when the iteration begins.
+
+    Parameters
+    ----------
+    data : iterable of MRSData
+        The water suppressed FID data to be fitted, e.g. a list of datasets.
+        Iterating over an array only goes along its first axis, so to fit
+        every voxel of a CSI grid pass data.reshape(-1, data.np), the indices
+        are then those of the flattened voxels.
+    wrefs : iterable of MRSData, optional
+        Water reference data for each of the datasets.
+    options : dict
+        Set of Tarquin parameters to override, used for all the datasets.
+    workers : int, optional
+        The maximum number of Tarquin processes to run at once, by default
+        the number of CPUs.
+    tarquin_path : str
+        The Tarquin executable to run.
+
+    Returns
+    -------
+    iterator of (int, dict or Exception)
+        The index of each dataset in data, with the output from running
+        Tarquin on it, as from process, or the exception raised when fitting
+        it.
+    """
+    data = list(data)
+    wrefs = [None] * len(data) if wrefs is None else list(wrefs)
+    if len(wrefs) != len(data):
+        raise ValueError("Got {} water references for {} datasets".format(len(wrefs), len(data)))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1, got {}".format(workers))
+
+    return _process_many(data, wrefs, dict(options), workers, tarquin_path)
+
+
+def _process_many(data, wrefs, options, workers, tarquin_path):
+    # the generator behind process_many, which has already checked the
+    # arguments. the work is done in the Tarquin processes, so threads are
+    # enough to keep several of them running at once
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process, d, w, options, tarquin_path): i
+                   for i, (d, w) in enumerate(zip(data, wrefs))}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
@@ -1,5 +1,6 @@
 from contextlib import contextmanager
 from suspect import MRSData, transformation_matrix, rotation_matrix
+from suspect._dtype import _complex_dtype
 
 import struct
 import numpy
@@ -7,21 +8,148 @@ import numpy
 import re
 import io
 import os
+import hashlib
+import shutil
+import time
 
 # This file largely relies on information from Siemens regarding the structure
 # of the TWIX file formats. Most of the parameters that are read use the same
 # names as those apparently used internally at Siemens. The purpose of some of
 # these parameters is not currently clear but we break them out anyway.
 
+# the measurement data header (mdh) at the start of each scan, described as
+# numpy structured dtypes so that headers can be read straight from the raw
+# bytes. in vb files the header is repeated for each channel, in vd files each
+# channel has its own shorter 32 byte header which follows this one
+VB_SCAN_HEADER = numpy.dtype([("dma_length", "<u4"),
+                              ("meas_uid", "<u4"),
+                              ("scan_counter", "<u4"),
+                              ("time_stamp", "<u4"),
+                              ("pmu_time_stamp", "<u4"),
+                              ("eval_info_mask", "<u8"),
+                              ("num_samples", "<u2"),
+                              ("num_channels", "<u2"),
+                              ("loop_counters", "<u2", (14,)),
+                              ("cut_off_data", "<u4"),
+                              ("kspace_centre_column", "<u2"),
+                              ("coil_select", "<u2"),
+                              ("readout_offcentre", "<u4"),
+                              ("time_since_rf", "<u4"),
+                              ("kspace_centre_line_num", "<u2"),
+                              ("kspace_centre_partition_num", "<u2"),
+                              ("ice_program_params", "<u2", (4,)),
+                              ("free_params", "<u2", (4,)),
+                              ("slice_position", "<f4", (7,)),
+                              ("channel_id", "<u2"),
+                              ("ptab_pos_neg", "<i2")])
+
+VD_SCAN_HEADER = numpy.dtype([("dma_length", "<u4"),
+                              ("meas_uid", "<u4"),
+                              ("scan_counter", "<u4"),
+                              ("time_stamp", "<u4"),
+                              ("pmu_time_stamp", "<u4"),
+                              ("system_type", "<u2"),
+                              ("ptab_pos_delay", "<u2"),
+                              ("ptab_pos_x", "<u4"),
+                              ("ptab_pos_y", "<u4"),
+                              ("ptab_pos_z", "<u4"),
+                              ("reserved", "<u4"),
+                              ("eval_info_mask", "<u8"),
+                              ("num_samples", "<u2"),
+                              ("num_channels", "<u2"),
+                              ("loop_counters", "<u2", (14,)),
+                              ("cut_off_data", "<u4"),
+                              ("kspace_centre_column", "<u2"),
+                              ("coil_select", "<u2"),
+                              ("readout_offcentre", "<u4"),
+                              ("time_since_rf", "<u4"),
+                              ("kspace_centre_line_num", "<u2"),
+                              ("kspace_centre_partition_num", "<u2"),
+                              ("slice_position", "<f4", (7,)),
+                              ("ice_program_params", "<u2", (24,)),
+                              ("reserved_params", "<u2", (4,)),
+                              ("application_counter", "<u2"),
+                              ("application_mask", "<u2"),
+                              ("crc", "<u4")])
+
+# the size of the per channel header in vb and vd files
+VB_CHANNEL_HEADER_SIZE = 128
+VD_CHANNEL_HEADER_SIZE = 32
+
+# eval_info_mask flags for the end of the acquisition, and for scans which
+# contain auxiliary data (rt_feedback, hp_feedback, sync_data,
+# phase_correction and noise_adj_scan) rather than MRS data
+ACQ_END_MASK = 1
+AUXILIARY_SCAN_MASK = (1 << 1) | (1 << 2) | (1 << 5) | (1 << 21) | (1 << 25)
+
+# the auxiliary scans which can be collected by TwixBuilder, in order of
+# precedence when a scan has more than one flag set. sync_data scans do not
+# contain channel data, so are always skipped
+AUXILIARY_SCAN_TYPES = [("noise_adj", 1 << 25),
+                        ("phase_correction", 1 << 21),
+                        ("rt_feedback", 1 << 1),
+                        ("hp_feedback", 1 << 2)]
+
+# compact summary of the scan headers, common to vb and vd files, as returned
+# by scan_table
+SCAN_TABLE = numpy.dtype([("offset", "<u8"),
+                          ("eval_info_mask", "<u8"),
+                          ("scan_counter", "<u4"),
+                          ("time_stamp", "<u4"),
+                          ("num_samples", "<u2"),
+                          ("num_channels", "<u2"),
+                          ("loop_counters", "<u2", (14,)),
+                          ("fid_start", "<u2")])
+
+# the per scan parameters which are kept in the metadata of the loaded data
+# as metadata["scan_info"], one entry for each scan in the order acquired. vb
+# files only have 4 ice_program_params, the remainder are left as zero
+SCAN_INFO = numpy.dtype([("scan_counter", "<u4"),
+                         ("time_stamp", "<u4"),
+                         ("pmu_time_stamp", "<u4"),
+                         ("eval_info_mask", "<u8"),
+                         ("loop_counters", "<u2", (14,)),
+                         ("slice_position", "<f4", (7,)),
+                         ("ice_program_params", "<u2", (24,))])
+
 
 class TwixBuilder(object):
-    def __init__(self):
+    """
+    Collects the header and scans read from a TWIX file and assembles them
+    into an MRSData object.
+
+    Parameters
+    ----------
+    dtype : numpy.dtype, optional
+        The dtype of the output data, by default the one set with
+        suspect.set_default_dtype, or complex128 if none has been set.
+        complex64 halves the memory required, the raw data is only stored in
+        single precision.
+    preallocate : bool, optional
+        If True (the default) the loaders make a first pass over the scan
+        headers to find the loop counter extents and call set_loop_shape, so
+        that each scan is written directly into the output array.
+    auxiliary : bool, optional
+        If True, the loaders also decode the auxiliary scans listed in
+        AUXILIARY_SCAN_TYPES (noise adjustment, phase correction and
+        feedback scans) and pass them to add_auxiliary_scan, instead of
+        skipping over them.
+    """
+    def __init__(self, dtype=None, preallocate=True, auxiliary=False):
         self.header_params = None
         self.dt = None
         self.np = None
         self.num_channels = None
+        self.dtype = _complex_dtype(dtype)
+        self.preallocate = preallocate
+        self.loop_shape = None
+        self.num_scans = 0
+        self.data_array = None
         self.data = []
         self.loop_counters = []
+        self.scan_info = []
+        self.auxiliary = auxiliary
+        self.auxiliary_scans = {}
 
     def set_header_string(self, header_string):
         self.header_params = parse_twix_header(header_string)
@@ -40,23 +168,20 @@ class TwixBuilder(object):
             if self.num_channels != num_channels:
                 raise ValueError("TwixBuilder num_channels already set to {}, now being changed to {}".format(self.num_channels, num_channels))
 
-    def add_scan(self, loop_counters, scan_data):
-        self.loop_counters.append(loop_counters)
-        self.data.append(scan_data)
+    def wrap_data(self, data):
+        """
+        Creates an MRSData object from an array of data, using the parameters
+        from the TWIX header.
 
-    def build_mrsdata(self):
-        loop_counter_array = numpy.array(self.loop_counters)
-        data_shape = 1 + numpy.max(loop_counter_array, axis=0)
-        data_shape = numpy.append(data_shape, (self.num_channels, self.np))
-        data = numpy.zeros(data_shape, dtype='complex')
-        for i, loop_counter in enumerate(loop_counter_array):
-            # have to break out the loop_counter parameters individually, the second line should work but doesn't
-            data[loop_counter[0], loop_counter[1], loop_counter[2], loop_counter[3], loop_counter[4], loop_counter[5], loop_counter[6], loop_counter[7], loop_counter[8], loop_counter[9], loop_counter[10], loop_counter[11], loop_counter[12], loop_counter[13]] = self.data[i]
-            # data[loop_counter] = self.data[i]
-
-        # get rid of all the size 1 dimensions
-        data = data.squeeze()
+        Parameters
+        ----------
+        data : numpy.ndarray
+            The data to wrap.
 
+        Returns
+        -------
+        suspect.MRSData
+        """
         metadata = {
             "patient_name": self.header_params["patient_name"],
             "patient_id": self.header_params["patient_id"],
@@ -64,15 +189,207 @@ class TwixBuilder(object):
             "exam_date": self.header_params["exam_date"],
             "exam_time": self.header_params["exam_time"],
         }
-        mrs_data = MRSData(data,
-                           self.header_params["dt"],
-                           self.header_params["f0"],
-                           te=self.header_params["te"],
-                           tr=self.header_params["tr"],
-                           metadata=metadata,
-                           transform=self.header_params["transform"])
+        if len(self.scan_info):
+            metadata["scan_info"] = self.scan_info
+        if self.auxiliary_scans:
+            metadata["auxiliary_scans"] = self.auxiliary_scans
+        return MRSData(data,
+                       self.header_params["dt"],
+                       self.header_params["f0"],
+                       te=self.header_params["te"],
+                       tr=self.header_params["tr"],
+                       metadata=metadata,
+                       transform=self.header_params["transform"])
+
+    def set_loop_shape(self, loop_shape):
+        """
+        Declares the number of values taken by each of the 14 loop counters,
+        so that the output array can be allocated when the first scan is
+        added and every scan written straight into its place.
+
+        Parameters
+        ----------
+        loop_shape : sequence of int
+            The maximum of each loop counter over all the scans, plus one.
+        """
+        self.loop_shape = tuple(int(n) for n in loop_shape)
+
+    def add_scan(self, loop_counters, scan_data, scan_info=None):
+        """
+        Adds the data from a single scan.
+
+        Parameters
+        ----------
+        loop_counters : sequence of int
+            The 14 loop counters of the scan, giving its position in the
+            output array.
+        scan_data : numpy.ndarray
+            The data for each channel, shape (num_channels, np).
+        scan_info : tuple, optional
+            The scan parameters described by SCAN_INFO, which are collected
+            into metadata["scan_info"] of the output.
+        """
+        self.num_scans += 1
+        if scan_info is not None:
+            self.scan_info.append(scan_info)
+        if self.loop_shape is None:
+            # without knowing the final shape we have to hold on to the scans
+            self.loop_counters.append(loop_counters)
+            self.data.append(scan_data)
+            return
+        if self.data_array is None:
+            self.data_array = numpy.zeros(self.loop_shape + (self.num_channels, self.np), dtype=self.dtype)
+        self.data_array[tuple(loop_counters)] = scan_data
+
+    def add_auxiliary_scan(self, scan_type, scan_data):
+        """
+        Adds the data from an auxiliary scan, such as a noise adjustment
+        scan. The scans of each type are stacked in the order they were added
+        into metadata["auxiliary_scans"][scan_type] of the output.
+
+        Parameters
+        ----------
+        scan_type : str
+            One of the names in AUXILIARY_SCAN_TYPES.
+        scan_data : numpy.ndarray
+            All the samples for each channel, shape (num_channels, num_samples).
+        """
+        self.auxiliary_scans.setdefault(scan_type, []).append(scan_data)
+
+    def build_mrsdata(self):
+        if self.data_array is not None:
+            data = self.data_array
+        else:
+            loop_counter_array = numpy.array(self.loop_counters)
+            data_shape = 1 + numpy.max(loop_counter_array, axis=0)
+            data_shape = numpy.append(data_shape, (self.num_channels, self.np))
+            data = numpy.zeros(data_shape, dtype=self.dtype)
+            for loop_counter, scan_data in zip(self.loop_counters, self.data):
+                data[tuple(loop_counter)] = scan_data
+        self.scan_info = numpy.array(self.scan_info, dtype=SCAN_INFO)
+        self.auxiliary_scans = {scan_type: numpy.stack(scans) for scan_type, scans in self.auxiliary_scans.items()}
+
+        # get rid of all the size 1 dimensions
+        return self.wrap_data(data.squeeze())
+
 
-        return mrs_data
+class LazyTwixData(object):
+    """
+    Deferred view of the MRS data in a TWIX file, as returned by
+    load_twix(..., lazy=True).
+
+    Only the scan headers are read when the file is opened, the data itself is
+    decoded from a numpy.memmap of the file when the object is indexed. It has
+    the same shape as the MRSData which would be returned by load_twix, and
+    indexing it with integers and slices returns the corresponding MRSData,
+    with only the selected scans and channels read from disk.
+    """
+    def __init__(self, builder, buffer, sample_offsets, num_samples, fid_starts,
+                 lookup, channel_header_size):
+        self._builder = builder
+        self._buffer = buffer
+        self._sample_offsets = sample_offsets
+        self._num_samples = num_samples
+        self._fid_starts = fid_starts
+        self._lookup = lookup
+        self._channel_header_size = channel_header_size
+        self._full_shape = lookup.shape + (builder.num_channels, builder.np)
+        # as with build_mrsdata, all the size 1 dimensions are squeezed out
+        self._axes = [i for i, n in enumerate(self._full_shape) if n != 1]
+
+    @property
+    def shape(self):
+        return tuple(self._full_shape[i] for i in self._axes)
+
+    @property
+    def ndim(self):
+        return len(self._axes)
+
+    @property
+    def dtype(self):
+        return self._builder.dtype
+
+    @property
+    def np(self):
+        return self._builder.np
+
+    @property
+    def dt(self):
+        return self._builder.header_params["dt"]
+
+    @property
+    def f0(self):
+        return self._builder.header_params["f0"]
+
+    @property
+    def te(self):
+        return self._builder.header_params["te"]
+
+    @property
+    def tr(self):
+        return self._builder.header_params["tr"]
+
+    @property
+    def transform(self):
+        return self._builder.header_params["transform"]
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        return numpy.asarray(self.load(), dtype=dtype)
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        ellipses = [i for i, axis_key in enumerate(key) if axis_key is Ellipsis]
+        if ellipses:
+            ellipsis_index = ellipses[0]
+            key = key[:ellipsis_index] \
+                + (slice(None),) * (self.ndim - len(key) + 1) \
+                + key[ellipsis_index + 1:]
+        if len(key) > self.ndim:
+            raise IndexError("too many indices for LazyTwixData of dimension {}".format(self.ndim))
+        key = key + (slice(None),) * (self.ndim - len(key))
+
+        # convert the key on the squeezed shape to one on the full shape
+        full_key = [0] * len(self._full_shape)
+        for axis, axis_key in zip(self._axes, key):
+            if not isinstance(axis_key, (slice, int, numpy.integer)):
+                raise TypeError("LazyTwixData can only be indexed with integers and slices")
+            full_key[axis] = axis_key
+        scans = numpy.asarray(self._lookup[tuple(full_key[:-2])])
+        channels = numpy.arange(self._builder.num_channels)[full_key[-2]]
+        points = numpy.arange(self.np)[full_key[-1]]
+
+        data = numpy.zeros(scans.shape + channels.shape + points.shape, dtype=self.dtype)
+        for index in numpy.ndindex(scans.shape):
+            scan = scans[index]
+            # any scans which were not acquired are left as zeros
+            if scan < 0:
+                continue
+            num_samples = self._num_samples[scan]
+            samples = _channel_samples(self._buffer,
+                                       self._builder.num_channels,
+                                       num_samples,
+                                       self._sample_offsets[scan],
+                                       self._channel_header_size + num_samples * 8)
+            numpy.conjugate(samples[channels][..., self._fid_starts[scan] + points], out=data[index + (Ellipsis,)])
+
+        if data.ndim == 0:
+            return data[()]
+        return self._builder.wrap_data(data)
+
+    def load(self):
+        """
+        Decodes all the data in the file.
+
+        Returns
+        -------
+        suspect.MRSData
+            The same data as would be returned by load_twix with lazy=False.
+        """
+        return self[...]
 
 
 def calculate_orientation(normal):
@@ -130,19 +447,191 @@ def get_meta_regex(regex_list, header_string, convert=1, default=None):
     raise KeyError("Regex list not found in header string. {}".format(regex_list))
 
 
+# a single pass over the header finds every ASCCONV style "key = value" line
+# and every XProtocol <Param...> with a simple (not nested) value
+_ASCCONV_LINE = re.compile(r"^[ \t]*([A-Za-z_][\w.\[\]]*)[ \t]*=[ \t]*(.*?)\s*$", re.MULTILINE)
+_XPROTOCOL_PARAM = re.compile(r"<(Param\w*)\.\"([^\"]*)\">\s*\{([^{}]*)\}")
+# attributes such as <Precision> 16 or <Unit> "[mm]" which precede the value
+_XPROTOCOL_ATTRIBUTE = re.compile(r"<\w+>\s*(?:\"[^\"]*\"|\S+)")
+_ASCCONV_NUMBER = re.compile(r"-?[\d\[]*\.?\d*")
+
+
+class TwixHeader(object):
+    """
+    Index of the parameters in a TWIX header string.
+
+    The header is scanned once when the object is created, after which
+    parameters can be looked up by name without searching the header again.
+
+    Attributes
+    ----------
+    header_string : str
+        The full header string.
+    ascconv : dict
+        Maps each ASCCONV key (e.g. "alTE[0]") to the list of its raw values,
+        in the order they appear in the header.
+    xprotocol : dict
+        Maps each XProtocol parameter name (e.g. "PatientID") to the list of
+        its raw values, in the order they appear in the header. Parameters
+        whose values contain nested parameters (e.g. ParamMap) are not
+        included, use map_value to access those.
+    xprotocol_types : dict
+        The same values as xprotocol, but keyed on the parameter type and
+        name, e.g. ("ParamString", "PatientID"), for when the same name is
+        used by parameters of different types.
+    """
+    def __init__(self, header_string):
+        self.header_string = header_string
+        self.ascconv = {}
+        for block in _ascconv_blocks(header_string):
+            for key, value in _ASCCONV_LINE.findall(block):
+                self.ascconv.setdefault(key, []).append(value)
+        self.xprotocol = {}
+        self.xprotocol_types = {}
+        for param_type, name, value in _XPROTOCOL_PARAM.findall(header_string):
+            self.xprotocol.setdefault(name, []).append(value)
+            self.xprotocol_types.setdefault((param_type, name), []).append(value)
+
+    def has_xprotocol(self, name, param_type=None):
+        """
+        Returns whether the header contains an XProtocol parameter with this
+        name, and if param_type is given (e.g. "ParamDouble"), of that type.
+        """
+        if param_type is None:
+            return name in self.xprotocol
+        return (param_type, name) in self.xprotocol_types
+
+    def xprotocol_values(self, name, param_type=None):
+        """
+        Returns the values of an XProtocol parameter, with any attributes
+        like <Precision> removed, e.g. '"Siemens"' or '1.0'. A parameter
+        without a value gives the empty string. If param_type is given, only
+        parameters of that type are included.
+        """
+        if param_type is None:
+            values = self.xprotocol.get(name, [])
+        else:
+            values = self.xprotocol_types.get((param_type, name), [])
+        return [_XPROTOCOL_ATTRIBUTE.sub("", value).strip() for value in values]
+
+    def ascconv_number(self, key, first=False):
+        """
+        Returns the numeric value of an ASCCONV parameter, or None if the key
+        is not present or has no numeric value.
+        """
+        if key not in self.ascconv:
+            return None
+        values = self.ascconv[key]
+        match = _ASCCONV_NUMBER.match(values[0] if first else values[-1])
+        return _to_float(match.group())
+
+    def xprotocol_number(self, name, param_type=None):
+        """
+        Returns the numeric value of the last occurrence of an XProtocol
+        parameter, or None if the name is not present or has no value.
+        """
+        values = self.xprotocol_values(name, param_type)
+        return _to_float(values[-1]) if values else None
+
+    def xprotocol_string(self, name, first=True, param_type="ParamString"):
+        """
+        Returns the first (or last) non-empty value of an XProtocol string
+        parameter, without the enclosing quotes, or None if there is none.
+        """
+        values = [value[1:-1] for value in self.xprotocol_values(name, param_type)
+                  if len(value) > 2 and value[0] == value[-1] == "\""]
+        if not values:
+            return None
+        return values[0] if first else values[-1]
+
+    def map_value(self, *path, param_type="ParamDouble"):
+        """
+        Returns the value of a parameter of type param_type nested inside
+        ParamMaps, e.g. map_value("sVoI", "sPosition", "dSag"), or None if it
+        is not found.
+        """
+        position = 0
+        for name in path[:-1]:
+            position = self.header_string.find("<ParamMap.\"{}\">".format(name), position)
+            if position < 0:
+                return None
+        match = re.compile(r"<{}\.\"{}\">\s*\{{([^{{}}]*)\}}".format(param_type, re.escape(path[-1]))).search(
+            self.header_string, position)
+        if match is None:
+            return None
+        return _XPROTOCOL_ATTRIBUTE.sub("", match.group(1)).strip()
+
+
+def _ascconv_blocks(header_string):
+    # the ASCCONV parameters are normally in blocks between begin and end
+    # markers, only those parts of the header need to be searched
+    blocks = []
+    end = 0
+    while True:
+        start = header_string.find("### ASCCONV BEGIN", end)
+        if start < 0:
+            break
+        end = header_string.find("### ASCCONV END", start)
+        if end < 0:
+            end = len(header_string)
+        blocks.append(header_string[start:end])
+    return blocks if blocks else [header_string]
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _find_parameter(header, sources, convert=1, default=None):
+    """
+    Returns the value from the first of the sources which is present in the
+    header, multiplied by convert, or default if that parameter has no value.
+    Each source is a tuple of ("ascconv", key), ("xprotocol", param_type,
+    name) or ("map", *path), the last for ParamDouble values in ParamMaps.
+    """
+    for source, *names in sources:
+        if source == "ascconv":
+            if names[0] not in header.ascconv:
+                continue
+            value = header.ascconv_number(names[0])
+        elif source == "xprotocol":
+            param_type, name = names
+            if not header.has_xprotocol(name, param_type):
+                continue
+            value = header.xprotocol_number(name, param_type)
+        else:
+            value = header.map_value(*names)
+            if value is None:
+                continue
+            value = _to_float(value)
+        return default if value is None else value * convert
+    raise KeyError("Parameters not found in header string. {}".format(sources))
+
+
+def _voi_sources(ascconv_key, xprotocol_names, map_path):
+    return [("ascconv", ascconv_key)] \
+        + [("xprotocol", "ParamDouble", name) for name in xprotocol_names] \
+        + [("map",) + map_path]
+
+
 def parse_twix_header(header_string):
+    header = TwixHeader(header_string)
+
     # get the name of the protocol being acquired
-    protocol_name_matches = [
-        r"tProtocolName\s*=\s*\"(.*)\"\s*"
-    ]
-    protocol_name = get_meta_regex(protocol_name_matches, header_string)
+    if "tProtocolName" not in header.ascconv:
+        raise KeyError("tProtocolName not found in header string")
+    protocol_name = header.ascconv["tProtocolName"][-1]
+    if len(protocol_name) >= 2 and protocol_name[0] == protocol_name[-1] == "\"":
+        protocol_name = protocol_name[1:-1]
     # get information about the subject being scanned
-    patient_id_string = re.search(r"<ParamString.\"PatientID\">\s*{\s*\".+\"\s*}\n", header_string).group()
-    patient_id = patient_id_string.split("\"")[3]
-    patient_name = re.escape(re.search(r"(<ParamString.\"PatientName\">\s*{\s*\")(.+)(\"\s*}\n)", header_string).group(2))
-    patient_birthday = re.search(r"(<ParamString.\"PatientBirthDay\">\s*{\s*\")(.+)(\"\s*}\n)", header_string).group(2)
+    patient_id = header.xprotocol_string("PatientID")
+    patient_name = re.escape(header.xprotocol_string("PatientName"))
+    patient_birthday = header.xprotocol_string("PatientBirthDay")
     # get the FrameOfReference to get the date and time of the scan
-    frame_of_reference = re.search(r"(<ParamString.\"FrameOfReference\">\s*{\s*)(\".+\")(\s*}\n)", header_string).group(2)
+    frame_of_reference = "\"{}\"".format(header.xprotocol_string("FrameOfReference"))
     if re.match("x*", frame_of_reference):
         exam_date = "x" * 6
         exam_time = "x" * 6
@@ -151,123 +640,68 @@ def parse_twix_header(header_string):
         exam_date = exam_date_time[2:8]
         exam_time = exam_date_time[8:14]
 
-    software_version_matches = [
-        r"<ParamString.\"tMeasuredBaselineString\">\s*{\s*(\".+\")\s*}\n",
-        r"<ParamString.\"tBaselineString\">\s*{\s*(\".+\")\s*}\n",
-        r"<ParamString.\"SoftwareVersions\">\s*{\s*(\".+\")\s*}\n"
-    ]
-    software_version = get_meta_regex(software_version_matches, header_string)
+    for name in ("tMeasuredBaselineString", "tBaselineString", "SoftwareVersions"):
+        if header.xprotocol_string(name) is not None:
+            software_version = "\"{}\"".format(header.xprotocol_string(name, first=False))
+            break
+    else:
+        raise KeyError("Software version not found in header string")
 
-    manufacturer = re.search(r"<ParamString.\"Manufacturer\">\s*{\s*(\".+\")\s*}\n", header_string).group(1)
-    manufacturers_model_name = re.search(r"<ParamString.\"ManufacturersModelName\">\s*{\s*(\".+\")\s*}\n", header_string).group(1)
-    sequence_name = re.search(r"<ParamString.\"tSequenceFileName\">\s*{\s*(\".+\")\s*}\n", header_string).group(1)
+    manufacturer = "\"{}\"".format(header.xprotocol_string("Manufacturer"))
+    manufacturers_model_name = "\"{}\"".format(header.xprotocol_string("ManufacturersModelName"))
+    sequence_name = "\"{}\"".format(header.xprotocol_string("tSequenceFileName"))
 
     # get the scan parameters
-    frequency_matches = [
-        r"sTXSPEC\.asNucleusInfo\[0\]\.lFrequency\s*=\s*([[0-9]*[.]?[0-9]*]{0,})\s*",
-        r"<ParamLong.\"Frequency\">  { (\d*)  }",
-        r"<ParamDouble.\"MainFrequency\">  { (.+)}\n"
-    ]
-    frequency = get_meta_regex(frequency_matches, header_string, convert=1e-6)
-
-    dwell_time_matches = [
-        r"sRXSPEC\.alDwellTime\[0\]\s*=\s*([[0-9]*[.]?[0-9]*]{0,})\s*",
-        r"<ParamLong.\"DwellTimeSig\">  { (\d*)  }",
-        r"<ParamDouble.\"DwellTime\">  { (.+)}",
-    ]
-    dwell_time = get_meta_regex(dwell_time_matches, header_string, convert=1e-9)
+    frequency = _find_parameter(header, [("ascconv", "sTXSPEC.asNucleusInfo[0].lFrequency"),
+                                         ("xprotocol", "ParamLong", "Frequency"),
+                                         ("xprotocol", "ParamDouble", "MainFrequency")], convert=1e-6)
+    dwell_time = _find_parameter(header, [("ascconv", "sRXSPEC.alDwellTime[0]"),
+                                          ("xprotocol", "ParamLong", "DwellTimeSig"),
+                                          ("xprotocol", "ParamDouble", "DwellTime")], convert=1e-9)
 
     # get TE
     # TE is stored in us, we would prefer to use ms
-    te = float(re.search(r"(alTE\[0\]\s*=\s*)(\d+)", header_string).group(2)) / 1000
+    if "alTE[0]" not in header.ascconv or "alTR[0]" not in header.ascconv:
+        raise KeyError("TE or TR not found in header string")
+    te = header.ascconv_number("alTE[0]", first=True) / 1000
     # get TR
-    tr = float(re.search(r"(alTR\[0\]\s*=\s*)(\d+)", header_string).group(2)) / 1000
+    tr = header.ascconv_number("alTR[0]", first=True) / 1000
 
     # get voxel size
-    ro_fov_matches = [
-        r"sSpecPara\.sVoI\.dReadoutFOV\s*=\s*(-?[[0-9]*[.]?[0-9]*]{0,})\s*",
-        r"<ParamDouble.\"VoI_RoFOV\">  { <Precision> \d+(  -?[0-9\.]+)?  }",
-        r"<ParamDouble\.\"VoI_RoFOV\">\s*{\s*(-?[0-9\.]+)?\s*}"
-    ]
-    pe_fov_matches = [
-        r"sSpecPara\.sVoI\.dPhaseFOV\s*=\s*(-?[[0-9]*[.]?[0-9]*]{0,})\s*",
-        r"<ParamDouble.\"VoI_PeFOV\">  { <Precision> \d+(  -?[0-9\.]+)?  }",
-        r"<ParamDouble\.\"VoI_PeFOV\">\s*{\s*(-?[0-9\.]+)?\s*}"
-    ]
-    slice_thickness_matches = [
-        r"sSpecPara\.sVoI\.dThickness\s*=\s*(-?[[0-9]*[.]?[0-9]*]{0,})\s*",
-        r"<ParamDouble.\"VoI_SliceThickness\">  { <Precision> \d+(  -?[0-9\.]+)?  }",
-        r"<ParamDouble\.\"VoI_SliceThickness\">\s*{\s*(-?[0-9\.]+)?\s*}"
-    ]
-    ro_fov = get_meta_regex(ro_fov_matches, header_string, default=0)
-    pe_fov = get_meta_regex(pe_fov_matches, header_string, default=0)
-    slice_thickness = get_meta_regex(slice_thickness_matches, header_string, default=0)
+    ro_fov = _find_parameter(header, _voi_sources("sSpecPara.sVoI.dReadoutFOV",
+                                                  ["VoI_RoFOV"],
+                                                  ("sVoI", "dReadoutFOV")), default=0)
+    pe_fov = _find_parameter(header, _voi_sources("sSpecPara.sVoI.dPhaseFOV",
+                                                  ["VoI_PeFOV"],
+                                                  ("sVoI", "dPhaseFOV")), default=0)
+    slice_thickness = _find_parameter(header, _voi_sources("sSpecPara.sVoI.dThickness",
+                                                           ["VoI_SliceThickness"],
+                                                           ("sVoI", "dThickness")), default=0)
 
     # get position information
-    pos_sag_matches = [
-        r"sSpecPara\.sVoI\.sPosition\.dSag\s*=\s*(-?[[0-9]*[.]?[0-9]*]{0,})\s*",
-        r"<ParamDouble\.\"VoI_Position_Sag\">  { <Precision> \d+(  -?[0-9\.]+)?  }",
-        r"<ParamDouble\.\"VoiPositionSag\">\s*{\s*(-?[0-9\.]+)?\s*}",
-        r"<ParamDouble\.\"VoI_Position_Sag\">\s*{\s*(-?[0-9\.]+)?\s*}",
-        r"<ParamDouble\.\"VoiPositionSag\">  { <Precision> \d+ (-?[0-9\.]+)? }",
-        r"<ParamMap\.\"sVoI\">[\s\S]*?<ParamMap\.\"sPosition\">[\s\S]*?<ParamDouble\.\"dSag\">{ (-?[0-9\.]+)?\s?}"
-    ]
-    pos_cor_matches = [
-        r"sSpecPara\.sVoI\.sPosition\.dCor\s*=\s*(-?[[0-9]*[.]?[0-9]*]{0,})\s*",
-        r"<ParamDouble\.\"VoI_Position_Cor\">  { <Precision> \d+(  -?[0-9\.]+)?  }",
-        r"<ParamDouble\.\"VoiPositionCor\">\s*{\s*(-?[0-9\.]+)?\s*}",
-        r"<ParamDouble\.\"VoI_Position_Cor\">\s*{\s*(-?[0-9\.]+)?\s*}",
-        r"<ParamDouble\.\"VoiPositionCor\">  { <Precision> \d+ (-?[0-9\.]+)? }",
-        r"<ParamMap\.\"sVoI\">[\s\S]*?<ParamMap\.\"sPosition\">[\s\S]*?<ParamDouble\.\"dCor\">{ (-?[0-9\.]+)?\s?}"
-    ]
-    pos_tra_matches = [
-        r"sSpecPara\.sVoI\.sPosition\.dTra\s*=\s*(-?[[0-9]*[.]?[0-9]*]{0,})\s*",
-        r"<ParamDouble\.\"VoI_Position_Tra\">  { <Precision> \d+(  -?[0-9\.]+)?  }",
-        r"<ParamDouble\.\"VoiPositionTra\">\s*{\s*(-?[0-9\.]+)?\s*}",
-        r"<ParamDouble\.\"VoI_Position_Tra\">\s*{\s*(-?[0-9\.]+)?\s*}",
-        r"<ParamDouble\.\"VoiPositionTra\">  { <Precision> \d+ (-?[0-9\.]+)? }",
-        r"<ParamMap\.\"sVoI\">[\s\S]*?<ParamMap\.\"sPosition\">[\s\S]*?<ParamDouble\.\"dTra\">{ (-?[0-9\.]+)?\s?}"
-    ]
-    pos_sag = get_meta_regex(pos_sag_matches, header_string, default=0)
-    pos_cor = get_meta_regex(pos_cor_matches, header_string, default=0)
-    pos_tra = get_meta_regex(pos_tra_matches, header_string, default=0)
+    pos_sag = _find_parameter(header, _voi_sources("sSpecPara.sVoI.sPosition.dSag",
+                                                   ["VoI_Position_Sag", "VoiPositionSag"],
+                                                   ("sVoI", "sPosition", "dSag")), default=0)
+    pos_cor = _find_parameter(header, _voi_sources("sSpecPara.sVoI.sPosition.dCor",
+                                                   ["VoI_Position_Cor", "VoiPositionCor"],
+                                                   ("sVoI", "sPosition", "dCor")), default=0)
+    pos_tra = _find_parameter(header, _voi_sources("sSpecPara.sVoI.sPosition.dTra",
+                                                   ["VoI_Position_Tra", "VoiPositionTra"],
+                                                   ("sVoI", "sPosition", "dTra")), default=0)
 
     # get orientation information
-    in_plane_rot_matches = [
-        r"<ParamDouble\.\"VoI_InPlaneRotAngle\">  { <Precision> \d+(  -?[0-9\.]+)?  }",
-        r"<ParamDouble\.\"VoiInPlaneRot\">  { <Precision> \d+(  -?[0-9\.]+)?  }",
-        r"<ParamDouble\.\"VoiInPlaneRot\">\s*{\s*(-?[0-9\.]+)?\s*}",
-        r"<ParamDouble\.\"VoI_InPlaneRotAngle\">\s*{\s*(-?[0-9\.]+)?\s*}",
-        r"<ParamDouble\.\"dInPlaneRot\">\s*{\s*(-?[0-9\.]+)?\s*}"
-    ]
-    normal_sag_matches = [
-        r"sSpecPara\.sVoI\.sNormal\.dSag\s*=\s*(-?[[0-9]*[.]?[0-9]*]{0,})\s*$",
-        r"<ParamDouble\.\"VoI_Normal_Sag\">  { <Precision> \d+(  -?[0-9\.]+)?  }",
-        r"<ParamDouble\.\"VoiNormalSag\">  { <Precision> \d+(  -?[0-9\.]+)?  }",
-        r"<ParamDouble\.\"VoiNormalSag\">\s*{\s*(-?[0-9\.]+)?\s*}",
-        r"<ParamDouble\.\"VoI_Normal_Sag\">\s*{\s*(-?[0-9\.]+)?\s*}",
-        r"<ParamMap\.\"sVoI\">[\s\S]*?<ParamMap\.\"sNormal\">[\s\S]*?<ParamDouble\.\"dSag\">{ (-?[0-9\.]+)?\s?}"
-    ]
-    normal_cor_matches = [
-        r"sSpecPara\.sVoI\.sNormal\.dCor\s*=\s*(-?[[0-9]*[.]?[0-9]*]{0,})\s*$",
-        r"<ParamDouble\.\"VoI_Normal_Cor\">  { <Precision> \d+(  -?[0-9\.]+)?  }",
-        r"<ParamDouble\.\"VoiNormalCor\">  { <Precision> \d+(  -?[0-9\.]+)?  }",
-        r"<ParamDouble\.\"VoiNormalCor\">\s*{\s*(-?[0-9\.]+)?\s*}",
-        r"<ParamDouble\.\"VoI_Normal_Cor\">\s*{\s*(-?[0-9\.]+)?\s*}",
-        r"<ParamMap\.\"sVoI\">[\s\S]*?<ParamMap\.\"sNormal\">[\s\S]*?<ParamDouble\.\"dCor\">{ (-?[0-9\.]+)?\s?}"
-    ]
-    normal_tra_matches = [
-        r"sSpecPara\.sVoI\.sNormal\.dTra\s*=\s*(-?[[0-9]*[.]?[0-9]*]{0,})\s*$",
-        r"<ParamDouble\.\"VoI_Normal_Tra\">  { <Precision> \d+(  -?[0-9\.]+)?  }",
-        r"<ParamDouble\.\"VoiNormalTra\">  { <Precision> \d+(  -?[0-9\.]+)?  }",
-        r"<ParamDouble\.\"VoiNormalTra\">\s*{\s*(-?[0-9\.]+)?\s*}",
-        r"<ParamDouble\.\"VoI_Normal_Tra\">\s*{\s*(-?[0-9\.]+)?\s*}",
-        r"<ParamMap\.\"sVoI\">[\s\S]*?<ParamMap\.\"sNormal\">[\s\S]*?<ParamDouble\.\"dTra\">{ (-?[0-9\.]+)?\s?}"
-    ]
-    in_plane_rot = get_meta_regex(in_plane_rot_matches, header_string, default=0)
-    normal_sag = get_meta_regex(normal_sag_matches, header_string, default=0)
-    normal_cor = get_meta_regex(normal_cor_matches, header_string, default=0)
-    normal_tra = get_meta_regex(normal_tra_matches, header_string, default=0)
+    in_plane_rot = _find_parameter(header, [("xprotocol", "ParamDouble", "VoI_InPlaneRotAngle"),
+                                            ("xprotocol", "ParamDouble", "VoiInPlaneRot"),
+                                            ("xprotocol", "ParamDouble", "dInPlaneRot")], default=0)
+    normal_sag = _find_parameter(header, _voi_sources("sSpecPara.sVoI.sNormal.dSag",
+                                                      ["VoI_Normal_Sag", "VoiNormalSag"],
+                                                      ("sVoI", "sNormal", "dSag")), default=0)
+    normal_cor = _find_parameter(header, _voi_sources("sSpecPara.sVoI.sNormal.dCor",
+                                                      ["VoI_Normal_Cor", "VoiNormalCor"],
+                                                      ("sVoI", "sNormal", "dCor")), default=0)
+    normal_tra = _find_parameter(header, _voi_sources("sSpecPara.sVoI.sNormal.dTra",
+                                                      ["VoI_Normal_Tra", "VoiNormalTra"],
+                                                      ("sVoI", "sNormal", "dTra")), default=0)
 
     # the orientation is stored in a somewhat strange way - a normal vector and
     # a rotation angle. to get the row vector, we first use Gram-Schmidt to
@@ -305,21 +739,146 @@ def parse_twix_header(header_string):
             "sequence_name": sequence_name,
             "software_version": software_version,
             "manufacturer": manufacturer,
-            "manufacturers_model_name": manufacturers_model_name
+            "manufacturers_model_name": manufacturers_model_name,
+            "header": header
             }
 
 
-def load_twix_vb(fin, builder):
+def _channel_samples(raw_data, num_channels, num_samples, header_size, channel_stride):
+    """
+    Creates a strided complex64 view of the samples of each channel of a scan,
+    without copying or converting any data.
+    """
+    return numpy.ndarray((num_channels, num_samples),
+                         dtype="<c8",
+                         buffer=raw_data,
+                         offset=header_size,
+                         strides=(channel_stride, 8))
+
+
+def _decode_channel_data(raw_data, num_channels, num_samples, header_size, channel_stride, fid_start, np,
+                         dtype='complex'):
+    """
+    Decodes the sample data for all the channels of a single scan.
+
+    The samples of each channel are stored as interleaved little-endian
+    float32 real and imaginary pairs, preceded by a channel header. Rather than
+    unpacking every float individually, a strided complex64 view is created
+    over the raw bytes and conjugated directly into the output array.
+
+    Parameters
+    ----------
+    raw_data : bytes
+        The raw bytes for all the channels of the scan.
+    num_channels : int
+        The number of channels in the scan.
+    num_samples : int
+        The number of complex samples acquired for each channel.
+    header_size : int
+        The number of bytes from the start of each channel block to the first
+        sample.
+    channel_stride : int
+        The number of bytes from the start of one channel block to the next.
+    fid_start : int
+        The index of the first sample of the FID, after any dummy points.
+    np : int
+        The number of points in the FID.
+    dtype : numpy.dtype, optional
+        The dtype of the returned array.
+
+    Returns
+    -------
+    numpy.ndarray
+        Complex array of shape (num_channels, np).
+    """
+    samples = _channel_samples(raw_data, num_channels, num_samples, header_size, channel_stride)
+    scan_data = numpy.empty((num_channels, np), dtype=dtype)
+    # siemens store the data with the opposite chirality to our convention
+    numpy.conjugate(samples[:, fid_start:(fid_start + np)], out=scan_data)
+    return scan_data
+
+
+def _auxiliary_scan_type(eval_info_mask):
+    for scan_type, mask in AUXILIARY_SCAN_TYPES:
+        if eval_info_mask & mask:
+            return scan_type
+    return None
+
+
+def _scan_loop_shape(fin, position, scan_header):
+    """
+    Finds the extent of the loop counters of the MRS data scans with a pass
+    over the scan headers, without reading any of the scan data. The file
+    pointer is returned to the original position afterwards.
+
+    Parameters
+    ----------
+    fin : file-like
+        The TWIX file.
+    position : int
+        The position in the file of the first scan.
+    scan_header : numpy.dtype
+        The dtype of the scan headers, VB_SCAN_HEADER or VD_SCAN_HEADER.
+
+    Returns
+    -------
+    numpy.ndarray
+        The maximum of each of the 14 loop counters, plus one.
+    """
+    mask_offset = scan_header.fields["eval_info_mask"][1]
+    loop_offset = scan_header.fields["loop_counters"][1]
+    loop_shape = numpy.zeros(14, dtype=int)
+    scan_position = position
+    while True:
+        fin.seek(scan_position)
+        header_bytes = fin.read(loop_offset + 28)
+        temp, = struct.unpack_from("<I", header_bytes)
+        eval_info_mask, = struct.unpack_from("<Q", header_bytes, mask_offset)
+        if eval_info_mask & ACQ_END_MASK:
+            break
+        if not eval_info_mask & AUXILIARY_SCAN_MASK:
+            loop_counters = struct.unpack_from("<14H", header_bytes, loop_offset)
+            loop_shape = numpy.maximum(loop_shape, numpy.add(loop_counters, 1))
+        scan_position += temp & (2 ** 26 - 1)
+    fin.seek(position)
+    return loop_shape
+
+
+def _read(fin, size, wait=0):
+    """
+    Reads exactly size bytes from fin. If the file ends early, keeps trying
+    for up to wait seconds in case the file is still being written, e.g.
+    while it is being copied from the scanner.
+    """
+    data = fin.read(size)
+    if len(data) < size:
+        deadline = time.monotonic() + wait
+        while len(data) < size:
+            if time.monotonic() >= deadline:
+                raise EOFError("TWIX file ended before the end of the acquisition")
+            time.sleep(0.1)
+            data += fin.read(size - len(data))
+    return data
+
+
+def _read_twix_vb_header(fin, builder, wait=0):
 
     # first four bytes are the size of the header
-    header_size = struct.unpack("I", fin.read(4))[0]
+    header_size = struct.unpack("I", _read(fin, 4, wait))[0]
 
     # read the rest of the header minus the four bytes we already read
-    header = fin.read(header_size - 4)
+    header = _read(fin, header_size - 4, wait)
     # for some reason the last 24 bytes of the header contain some junk that is not a string
     header = header[:-24].decode('latin-1')
     builder.set_header_string(header)
 
+
+def _twix_vb_scans(fin, builder, wait=0):
+    """
+    Generator over the MRS data scans of a VB file, starting from the current
+    position of fin (the end of the header). Yields the loop counters, the
+    data of all the channels and the SCAN_INFO parameters of each scan.
+    """
     # the way that vb files are set up we just keep reading scans until the acq_end flag is set
 
     while True:
@@ -328,7 +887,7 @@ def load_twix_vb(fin, builder):
         start_position = fin.tell()
 
         # the first four bytes contain composite information
-        temp = struct.unpack("I", fin.read(4))[0]
+        temp = struct.unpack("I", _read(fin, 4, wait))[0]
 
         # 25 LSBs contain DMA length (size of this scan)
         DMA_length = temp & (2 ** 26 - 1)
@@ -337,11 +896,11 @@ def load_twix_vb(fin, builder):
         pack_flag = (temp >> 25) & 1
         PCI_rx = temp >> 26
 
-        meas_uid, scan_counter, time_stamp, pmu_time_stamp = struct.unpack("IIII", fin.read(16))
+        meas_uid, scan_counter, time_stamp, pmu_time_stamp = struct.unpack("IIII", _read(fin, 16, wait))
 
         # next long int is actually a lot of bit flags
         # a lot of them don't seem to be relevant for spectroscopy
-        eval_info_mask = struct.unpack("Q", fin.read(8))[0]
+        eval_info_mask = struct.unpack("Q", _read(fin, 8, wait))[0]
         acq_end = eval_info_mask & 1
         rt_feedback = eval_info_mask >> 1 & 1
         hp_feedback = eval_info_mask >> 2 & 1
@@ -361,11 +920,25 @@ def load_twix_vb(fin, builder):
 
         # if any of these flags are set then we should ignore the scan data
         if rt_feedback or hp_feedback or phase_correction or noise_adj_scan or sync_data:
+            if builder.auxiliary and not sync_data:
+                num_samples, num_channels = struct.unpack("HH", _read(fin, 4, wait))
+                channel_stride = 128 + num_samples * 8
+                fin.seek(start_position + 124)
+                raw_data = _read(fin, num_channels * channel_stride - 124, wait)
+                builder.add_auxiliary_scan(_auxiliary_scan_type(eval_info_mask),
+                                           _decode_channel_data(raw_data,
+                                                                num_channels,
+                                                                num_samples,
+                                                                4,
+                                                                channel_stride,
+                                                                0,
+                                                                num_samples,
+                                                                builder.dtype))
             fin.seek(start_position + DMA_length)
             continue
 
         # now come the actual parameters of the scan
-        num_samples, num_channels = struct.unpack("HH", fin.read(4))
+        num_samples, num_channels = struct.unpack("HH", _read(fin, 4, wait))
         builder.set_num_channels(num_channels)
 
         # the loop counters are a set of 14 shorts which are used as indices
@@ -374,13 +947,13 @@ def load_twix_vb(fin, builder):
         # encoding steps
         # we have no prior knowledge about which counters might loop in a given
         # scan so we have to read in all scans and then sort out the data shape
-        loop_counters = struct.unpack("14H", fin.read(28))
+        loop_counters = struct.unpack("14H", _read(fin, 28, wait))
 
-        cut_off_data, kspace_centre_column, coil_select, readout_offcentre = struct.unpack("IHHI", fin.read(12))
-        time_since_rf, kspace_centre_line_num, kspace_centre_partition_num = struct.unpack("IHH", fin.read(8))
+        cut_off_data, kspace_centre_column, coil_select, readout_offcentre = struct.unpack("IHHI", _read(fin, 12, wait))
+        time_since_rf, kspace_centre_line_num, kspace_centre_partition_num = struct.unpack("IHH", _read(fin, 8, wait))
 
-        ice_program_params = struct.unpack("4H", fin.read(8))
-        free_params = struct.unpack("4H", fin.read(8))
+        ice_program_params = struct.unpack("4H", _read(fin, 8, wait))
+        free_params = struct.unpack("4H", _read(fin, 8, wait))
 
         # there are some dummy points before the data starts
         num_dummy_points = free_params[0]
@@ -389,50 +962,60 @@ def load_twix_vb(fin, builder):
         np = int(2 ** numpy.floor(numpy.log2(num_samples - num_dummy_points)))
         builder.set_np(np)
 
-        slice_position = struct.unpack("7f", fin.read(28))
-
-        # construct a numpy ndarray to hold the data from all the channels in this scan
-        scan_data = numpy.zeros((num_channels, np), dtype='complex')
-
-        # loop over all the channels and extract data
-        for channel_index in range(num_channels):
-            channel_id, ptab_pos_neg = struct.unpack("Hh", fin.read(4))
-            raw_data = struct.unpack("<{}f".format(num_samples * 2), fin.read(num_samples * 4 * 2))
-            # turn the raw data into complex pairs
-            data_iter = iter(raw_data)
-            complex_iter = (complex(r, -i) for r, i in zip(data_iter, data_iter))
-            scan_data[channel_index, :] = numpy.fromiter(complex_iter, "complex64", num_samples)[num_dummy_points:(num_dummy_points + np)]
-
-            # the vb format repeats all the header data for each channel in
-            # turn, obviously this is redundant so we read all but the channel
-            # index from the next header here
-            fin.read(124)
-
-        # pass the data from this scan to the builder
-        builder.add_scan(loop_counters, scan_data)
+        slice_position = struct.unpack("7f", _read(fin, 28, wait))
+
+        # the vb format repeats all the header data for each channel in turn,
+        # so each channel block consists of the 4 bytes of channel_id and
+        # ptab_pos_neg, the samples themselves and then 124 bytes of the next
+        # channel header. read every channel in one go, the trailing header of
+        # the final channel is not needed
+        channel_stride = 128 + num_samples * 8
+        raw_data = _read(fin, num_channels * channel_stride - 124, wait)
+        scan_data = _decode_channel_data(raw_data,
+                                         num_channels,
+                                         num_samples,
+                                         4,
+                                         channel_stride,
+                                         num_dummy_points,
+                                         np,
+                                         builder.dtype)
+
+        # pass the data from this scan to the consumer
+        scan_info = (scan_counter, time_stamp, pmu_time_stamp, eval_info_mask, loop_counters, slice_position,
+                     ice_program_params + (0,) * 20)
+        yield loop_counters, scan_data, scan_info
 
         # go to the next scan and the top of the loop
         fin.seek(start_position + DMA_length)
 
 
-def load_twix_vd(fin, builder):
-    twix_id, num_measurements = struct.unpack("II", fin.read(8))
-    # vd file can contain multiple measurements, but we only want the MRS
+def _read_twix_vd_header(fin, builder, measurement_index=None, wait=0):
+    twix_id, num_measurements = struct.unpack("II", _read(fin, 8, wait))
+    # vd file can contain multiple measurements, unless told otherwise we
     # assume that the MRS is the last measurement
-    measurement_index = num_measurements - 1
+    if measurement_index is None:
+        measurement_index = num_measurements - 1
 
     # measurement headers are each 152 bytes at start of file
     fin.seek(8 + 152 * measurement_index)
-    meas_id, file_id, offset, length, patient_name, protocol_name = struct.unpack("IIQQ64s64s", fin.read(152))
+    meas_id, file_id, offset, length, patient_name, protocol_name = struct.unpack("IIQQ64s64s", _read(fin, 152, wait))
     # offset points to where the actual data is in the file
     fin.seek(offset)
 
     # start with the header
-    header_size = struct.unpack("I", fin.read(4))[0]
-    header = fin.read(header_size - 4)
+    header_size = struct.unpack("I", _read(fin, 4, wait))[0]
+    header = _read(fin, header_size - 4, wait)
     header = header.decode('latin-1')
     builder.set_header_string(header)
 
+
+def _twix_vd_scans(fin, builder, wait=0):
+    """
+    Generator over the MRS data scans of a VD file, starting from the current
+    position of fin (the end of the measurement header). Yields the loop
+    counters, the data of all the channels and the SCAN_INFO parameters of
+    each scan.
+    """
     # read each scan until we hit the acq_end flag
     while True:
 
@@ -442,15 +1025,15 @@ def load_twix_vd(fin, builder):
 
         # the first four bytes contain some composite information,
         # read in an int and do bit shift magic to get the values
-        temp = struct.unpack("I", fin.read(4))[0]
+        temp = struct.unpack("I", _read(fin, 4, wait))[0]
         DMA_length = temp & (2 ** 26 - 1)
         pack_flag = (temp >> 25) & 1
         PCI_rx = temp >> 26
-        meas_uid, scan_counter, time_stamp, pmu_time_stamp = struct.unpack("IIII", fin.read(16))
-        system_type, ptab_pos_delay, ptab_pos_x, ptab_pos_y, ptab_pos_z, reserved = struct.unpack("HHIIII", fin.read(20))
+        meas_uid, scan_counter, time_stamp, pmu_time_stamp = struct.unpack("IIII", _read(fin, 16, wait))
+        system_type, ptab_pos_delay, ptab_pos_x, ptab_pos_y, ptab_pos_z, reserved = struct.unpack("HHIIII", _read(fin, 20, wait))
 
         # more composite information
-        eval_info_mask = struct.unpack("Q", fin.read(8))[0]
+        eval_info_mask = struct.unpack("Q", _read(fin, 8, wait))[0]
         acq_end = eval_info_mask & 1
         rt_feedback = eval_info_mask >> 1 & 1
         hp_feedback = eval_info_mask >> 2 & 1
@@ -471,86 +1054,500 @@ def load_twix_vd(fin, builder):
 
         # there are some data frames that contain auxilliary data, we ignore those for now
         if rt_feedback or hp_feedback or phase_correction or noise_adj_scan or sync_data:
+            if builder.auxiliary and not sync_data:
+                num_samples, num_channels = struct.unpack("HH", _read(fin, 4, wait))
+                channel_stride = 32 + num_samples * 8
+                fin.seek(initial_position + VD_SCAN_HEADER.itemsize)
+                raw_data = _read(fin, num_channels * channel_stride, wait)
+                builder.add_auxiliary_scan(_auxiliary_scan_type(eval_info_mask),
+                                           _decode_channel_data(raw_data,
+                                                                num_channels,
+                                                                num_samples,
+                                                                32,
+                                                                channel_stride,
+                                                                0,
+                                                                num_samples,
+                                                                builder.dtype))
             fin.seek(initial_position + DMA_length)
             continue
 
-        num_samples, num_channels = struct.unpack("HH", fin.read(4))
+        num_samples, num_channels = struct.unpack("HH", _read(fin, 4, wait))
         builder.set_num_channels(num_channels)
-        loop_counters = struct.unpack("14H", fin.read(28))
-        cut_off_data, kspace_centre_column, coil_select, readout_offcentre = struct.unpack("IHHI", fin.read(12))
-        time_since_rf, kspace_centre_line_num, kspace_centre_partition_num = struct.unpack("IHH", fin.read(8))
-        slice_position = struct.unpack("7f", fin.read(28))
-        ice_program_params = struct.unpack("24H", fin.read(48))
-        reserved_params = struct.unpack("4H", fin.read(8))
+        loop_counters = struct.unpack("14H", _read(fin, 28, wait))
+        cut_off_data, kspace_centre_column, coil_select, readout_offcentre = struct.unpack("IHHI", _read(fin, 12, wait))
+        time_since_rf, kspace_centre_line_num, kspace_centre_partition_num = struct.unpack("IHH", _read(fin, 8, wait))
+        slice_position = struct.unpack("7f", _read(fin, 28, wait))
+        ice_program_params = struct.unpack("24H", _read(fin, 48, wait))
+        reserved_params = struct.unpack("4H", _read(fin, 8, wait))
         fid_start_offset = ice_program_params[4]
         num_dummy_points = reserved_params[0]
         fid_start = fid_start_offset + num_dummy_points
         np = int(2 ** numpy.floor(numpy.log2(num_samples - fid_start)))
         builder.set_np(np)
-        application_counter, application_mask, crc = struct.unpack("HHI", fin.read(8))
+        application_counter, application_mask, crc = struct.unpack("HHI", _read(fin, 8, wait))
+
+        # each channel consists of a 32 byte header followed by the data
+        # itself, num_samples * 4 (bytes per float) * 2 (two floats per complex)
+        channel_stride = 32 + num_samples * 8
+        raw_data = _read(fin, num_channels * channel_stride, wait)
+        scan_data = _decode_channel_data(raw_data,
+                                         num_channels,
+                                         num_samples,
+                                         32,
+                                         channel_stride,
+                                         fid_start,
+                                         np,
+                                         builder.dtype)
+
+        scan_info = (scan_counter, time_stamp, pmu_time_stamp, eval_info_mask, loop_counters, slice_position,
+                     ice_program_params)
+        yield loop_counters, scan_data, scan_info
 
-        # read the data for each channel in turn
-        scan_data = numpy.zeros((num_channels, np), dtype='complex')
-        for channel_index in range(num_channels):
+        # move the file pointer to the start of the next scan
+        fin.seek(initial_position + DMA_length)
 
-            # start with the header
-            dma_length, meas_uid, scan_counter, sequence_time, channel_id = struct.unpack("III4xI4xH6x", fin.read(32))
 
-            # now the data itself, which consists of num_samples * 4 (bytes per float) * 2 (two floats per complex)
-            raw_data = struct.unpack("<{}f".format(num_samples * 2), fin.read(num_samples * 4 * 2))
+def load_twix_vb(fin, builder):
+    _read_twix_vb_header(fin, builder)
 
-            # we need to massage the list of floats into a numpy array of complex numbers
-            data_iter = iter(raw_data)
-            complex_iter = (complex(r, -i) for r, i in zip(data_iter, data_iter))
-            scan_data[channel_index, :] = numpy.fromiter(complex_iter, "complex64", num_samples)[fid_start:(fid_start + np)]
+    if builder.preallocate:
+        builder.set_loop_shape(_scan_loop_shape(fin, fin.tell(), VB_SCAN_HEADER))
 
-        builder.add_scan(loop_counters, scan_data)
+    for loop_counters, scan_data, scan_info in _twix_vb_scans(fin, builder):
+        builder.add_scan(loop_counters, scan_data, scan_info)
 
-        # move the file pointer to the start of the next scan
-        fin.seek(initial_position + DMA_length)
 
-def load_twix(source_file, buffering=io.DEFAULT_BUFFER_SIZE):
+def load_twix_vd(fin, builder, measurement_index=None):
+    _read_twix_vd_header(fin, builder, measurement_index)
+
+    if builder.preallocate:
+        builder.set_loop_shape(_scan_loop_shape(fin, fin.tell(), VD_SCAN_HEADER))
+
+    for loop_counters, scan_data, scan_info in _twix_vd_scans(fin, builder):
+        builder.add_scan(loop_counters, scan_data, scan_info)
+
+
+def _read_scan_headers(buffer, offsets, scan_header):
+    # gather all the header bytes in one operation and reinterpret them
+    header_bytes = buffer[offsets[:, numpy.newaxis] + numpy.arange(scan_header.itemsize)]
+    return numpy.ascontiguousarray(header_bytes).view(scan_header)[:, 0]
+
+
+def _scan_info_from_headers(headers):
+    scan_info = numpy.zeros(len(headers), dtype=SCAN_INFO)
+    for name in ("scan_counter", "time_stamp", "pmu_time_stamp", "eval_info_mask", "loop_counters",
+                 "slice_position"):
+        scan_info[name] = headers[name]
+    num_params = headers.dtype["ice_program_params"].shape[0]
+    scan_info["ice_program_params"][:, :num_params] = headers["ice_program_params"]
+    return scan_info
+
+
+def _index_scans(buffer, position, scan_header):
     """
-    Load TWIX data. 
+    Finds the start of every scan up to the acq_end scan, by jumping from one
+    DMA_length to the next, and reads their headers into a scan table.
+
+    Parameters
+    ----------
+    buffer : numpy.ndarray
+        The bytes of the file, as a uint8 array (typically a numpy.memmap).
+    position : int
+        The position in the buffer of the first scan.
+    scan_header : numpy.dtype
+        The dtype of the scan headers, VB_SCAN_HEADER or VD_SCAN_HEADER.
+
+    Returns
+    -------
+    numpy.ndarray
+        Structured array of SCAN_TABLE with one entry for each scan.
+    """
+    mask_offset = scan_header.fields["eval_info_mask"][1]
+    offsets = []
+    while True:
+        temp, = struct.unpack_from("<I", buffer, position)
+        eval_info_mask, = struct.unpack_from("<Q", buffer, position + mask_offset)
+        if eval_info_mask & ACQ_END_MASK:
+            break
+        offsets.append(position)
+        position += temp & (2 ** 26 - 1)
+    offsets = numpy.array(offsets, dtype=numpy.int64)
+    headers = _read_scan_headers(buffer, offsets, scan_header)
+
+    table = numpy.zeros(len(headers), dtype=SCAN_TABLE)
+    table["offset"] = offsets
+    for name in ("eval_info_mask", "scan_counter", "time_stamp", "num_samples", "num_channels", "loop_counters"):
+        table[name] = headers[name]
+    if scan_header == VD_SCAN_HEADER:
+        table["fid_start"] = headers["ice_program_params"][:, 4] + headers["reserved_params"][:, 0]
+    else:
+        table["fid_start"] = headers["free_params"][:, 0]
+    return table
+
+
+def _locate_measurement(buffer, measurement_index=None):
+    """
+    Finds a measurement in a TWIX file.
+
+    Parameters
+    ----------
+    buffer : numpy.ndarray
+        The bytes of the file, as a uint8 array.
+    measurement_index : int, optional
+        The index of the measurement in a VD file, by default the last one.
+        VB files only contain a single measurement.
+
+    Returns
+    -------
+    header_string : str
+        The text header of the measurement.
+    scans_start : int
+        The position of the first scan.
+    scan_header : numpy.dtype
+        The dtype of the scan headers, VB_SCAN_HEADER or VD_SCAN_HEADER.
+    """
+    first_uint, second_uint = struct.unpack_from("<II", buffer, 0)
+    if first_uint == 0 and second_uint <= 64:
+        # assume that the MRS is the last measurement, as in load_twix_vd
+        if measurement_index is None:
+            measurement_index = second_uint - 1
+        offset, = struct.unpack_from("<Q", buffer, 8 + 152 * measurement_index + 8)
+        header_size, = struct.unpack_from("<I", buffer, offset)
+        header_string = bytes(buffer[offset + 4:offset + header_size]).decode('latin-1')
+        return header_string, offset + header_size, VD_SCAN_HEADER
+    else:
+        header_string = bytes(buffer[4:first_uint - 24]).decode('latin-1')
+        return header_string, first_uint, VB_SCAN_HEADER
+
+
+def _scan_table_cache_filename(filename, cache):
+    # by default the sidecar file goes next to the TWIX file, in a separate
+    # cache folder it is also named after the full path of the TWIX file so
+    # that files with the same name in different folders do not collide
+    if cache is True:
+        return os.fspath(filename) + ".scans.npz"
+    path_hash = hashlib.sha1(os.path.abspath(filename).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(os.fspath(cache), "{}.{}.scans.npz".format(os.path.basename(filename), path_hash))
+
+
+def _read_scan_table(filename, buffer, scans_start, scan_header, cache):
+    # the cached tables are only valid for the exact same file contents, which
+    # we identify by the size and modification time of the file. each
+    # measurement has its own table, named after the position of its scans
+    cache_key = None
+    cached_tables = {}
+    table_name = "table_{}".format(scans_start)
+    if cache is not False and cache is not None and isinstance(filename, (str, os.PathLike)):
+        cache_filename = _scan_table_cache_filename(filename, cache)
+        file_stat = os.stat(filename)
+        cache_key = numpy.array([file_stat.st_size, file_stat.st_mtime_ns], dtype=numpy.int64)
+        try:
+            with numpy.load(cache_filename) as cached:
+                if numpy.array_equal(cached["key"], cache_key):
+                    cached_tables = {name: cached[name] for name in cached.files if name.startswith("table_")}
+        except Exception:
+            # a missing, partly written or otherwise unreadable sidecar is
+            # just a cache miss
+            cached_tables = {}
+        if table_name in cached_tables and cached_tables[table_name].dtype == SCAN_TABLE:
+            return cached_tables[table_name]
+
+    table = _index_scans(buffer, scans_start, scan_header)
+
+    if cache_key is not None:
+        cached_tables[table_name] = table
+        # write to a temporary file first, so that a partly written sidecar
+        # is never read by another load
+        temp_filename = "{}.{}.tmp".format(cache_filename, os.getpid())
+        try:
+            with open(temp_filename, "wb") as fout:
+                numpy.savez(fout, key=cache_key, **cached_tables)
+            os.replace(temp_filename, cache_filename)
+        except OSError:
+            # the cache is only an optimisation, not being able to write it
+            # (e.g. to a read-only folder) should not stop the file loading
+            try:
+                os.remove(temp_filename)
+            except OSError:
+                pass
+    return table
+
+
+def scan_table(source_file, cache=False, measurement=None):
+    """
+    Returns a table of all the scans in a TWIX file, without reading any of
+    the scan data.
+
+    The table is a numpy structured array with one entry for each scan, whose
+    fields are the offset of the scan in the file, the eval_info_mask flags,
+    scan_counter, time_stamp, num_samples, num_channels, the 14 loop_counters
+    and the fid_start (the index of the first point of the FID after any
+    dummy points). For example, the number of averages acquired is given by
+    table["loop_counters"][:, 1].max() + 1.
 
     Parameters
     ----------
     source_file : str or file-like
         File path of TWIX file
+    cache : bool or str, optional
+        If True, the table is saved in a sidecar file next to the TWIX file,
+        or if a folder is given, in a file in that folder. The saved table is
+        reused while the size and modification time of the TWIX file remain
+        the same, otherwise it is replaced. The default is False, which never
+        reads or writes a sidecar file.
+    measurement : int, optional
+        The index of the measurement in a VD file, by default the last one.
 
     Returns
     -------
-    suspect.MRSData
+    numpy.ndarray
+        Structured array of SCAN_TABLE.
+    """
+    buffer = numpy.memmap(source_file, dtype=numpy.uint8, mode="r")
+    _, scans_start, scan_header = _locate_measurement(buffer, measurement)
+    return _read_scan_table(source_file, buffer, scans_start, scan_header, cache)
+
+
+def _load_twix_lazy(source_file, cache=False, measurement_index=None, dtype=None, auxiliary=False):
+    buffer = numpy.memmap(source_file, dtype=numpy.uint8, mode="r")
+    builder = TwixBuilder(dtype, auxiliary=auxiliary)
 
+    header_string, scans_start, scan_header = _locate_measurement(buffer, measurement_index)
+    builder.set_header_string(header_string)
+    table = _read_scan_table(source_file, buffer, scans_start, scan_header, cache)
+    if scan_header == VD_SCAN_HEADER:
+        sample_offset = VD_SCAN_HEADER.itemsize + VD_CHANNEL_HEADER_SIZE
+        channel_header_size = VD_CHANNEL_HEADER_SIZE
+    else:
+        sample_offset = VB_CHANNEL_HEADER_SIZE
+        channel_header_size = VB_CHANNEL_HEADER_SIZE
+
+    if builder.auxiliary:
+        # the auxiliary scans are small so they are decoded straight away
+        for scan in table[(table["eval_info_mask"] & AUXILIARY_SCAN_MASK) != 0]:
+            scan_type = _auxiliary_scan_type(scan["eval_info_mask"])
+            if scan_type is None:
+                continue
+            num_samples = int(scan["num_samples"])
+            samples = _channel_samples(buffer,
+                                       int(scan["num_channels"]),
+                                       num_samples,
+                                       int(scan["offset"]) + sample_offset,
+                                       channel_header_size + num_samples * 8)
+            builder.add_auxiliary_scan(scan_type, numpy.conjugate(samples).astype(builder.dtype))
+        builder.auxiliary_scans = {scan_type: numpy.stack(scans)
+                                   for scan_type, scans in builder.auxiliary_scans.items()}
+
+    # ignore the scans containing auxiliary data
+    table = table[(table["eval_info_mask"] & AUXILIARY_SCAN_MASK) == 0]
+    if len(table) == 0:
+        return None
+    num_samples = table["num_samples"].astype(numpy.int64)
+    fid_starts = table["fid_start"].astype(numpy.int64)
+
+    for num_channels in numpy.unique(table["num_channels"]):
+        builder.set_num_channels(int(num_channels))
+    for available_points in numpy.unique(num_samples - fid_starts):
+        builder.set_np(int(2 ** numpy.floor(numpy.log2(available_points))))
+
+    # map each loop counter position to the index of the scan acquired there,
+    # later scans overwrite earlier ones at the same position as in TwixBuilder
+    loop_counters = table["loop_counters"].astype(numpy.int64)
+    lookup = numpy.full(tuple(1 + numpy.max(loop_counters, axis=0)), -1, dtype=numpy.int64)
+    lookup[tuple(loop_counters.T)] = numpy.arange(len(table))
+
+    offsets = table["offset"].astype(numpy.int64)
+    builder.scan_info = _scan_info_from_headers(_read_scan_headers(buffer, offsets, scan_header))
+
+    return LazyTwixData(builder,
+                        buffer,
+                        offsets + sample_offset,
+                        num_samples,
+                        fid_starts,
+                        lookup,
+                        channel_header_size)
+
+
+def _measurement_indices(num_measurements, measurement):
     """
-    @contextmanager
-    def open_if_filepath(file_or_path, mode='r', **kwargs):
-        """Context manager to open a file if argument is string"""
-        if isinstance(file_or_path, (str, os.PathLike)):
-            f = open(file_or_path, mode, **kwargs)
-            try:
-                yield f
-            finally:
-                f.close()
-        else:
-            yield file_or_path
+    Converts the measurement argument of load_twix into a list of
+    measurement indices.
+    """
+    if measurement is None:
+        return [num_measurements - 1]
+    if isinstance(measurement, str):
+        if measurement == "all":
+            return list(range(num_measurements))
+        raise ValueError("Unrecognised measurement selection {}".format(measurement))
+    if isinstance(measurement, (int, numpy.integer)):
+        measurement = [measurement]
+    return [range(num_measurements)[index] for index in measurement]
+
+
+@contextmanager
+def _open_if_filepath(file_or_path, mode='r', **kwargs):
+    """Context manager to open a file if argument is string"""
+    if isinstance(file_or_path, (str, os.PathLike)):
+        f = open(file_or_path, mode, **kwargs)
+        try:
+            yield f
+        finally:
+            f.close()
+    else:
+        yield file_or_path
+
+
+def load_twix(source_file, buffering=io.DEFAULT_BUFFER_SIZE, lazy=False, cache=False, measurement=None,
+              dtype=None, auxiliary=False):
+    """
+    Load TWIX data. 
+
+    Parameters
+    ----------
+    source_file : str or file-like
+        File path of TWIX file
+    lazy : bool, optional
+        If True, only the scan headers are read and a LazyTwixData object is
+        returned, which decodes the data from a memory map of the file when
+        it is indexed. The source_file must then be a path or a file object
+        backed by a real file.
+    cache : bool or str, optional
+        Only used with lazy=True. If True, or a folder, the scan table is
+        cached in a sidecar file as described in scan_table. The default is
+        False, so loading never writes any files.
+    measurement : int, sequence of int or "all", optional
+        Which of the measurements in a VD file to load. By default only the
+        last measurement is loaded, which normally contains the MRS data. A
+        single index returns the data for that measurement, while a sequence
+        of indices or "all" returns a list with the data for each of the
+        requested measurements, read in a single pass through the file.
+        Measurements with no MRS data scans (e.g. only noise adjustment) are
+        returned as None in the list. VB files contain a single measurement,
+        with index 0.
+    dtype : numpy.dtype, optional
+        The dtype of the loaded data, by default the one set with
+        suspect.set_default_dtype, or complex128 if none has been set. The
+        raw data is stored in single precision, so complex64 loses no
+        information and halves the memory required.
+    auxiliary : bool, optional
+        If True, the noise adjustment, phase correction and feedback scans
+        which are normally skipped are also decoded in the same pass, and
+        returned in metadata["auxiliary_scans"]. This is a dict mapping the
+        names in AUXILIARY_SCAN_TYPES to arrays of shape (scans, channels,
+        samples), holding all the samples of the scans of that type which
+        were found, e.g. metadata["auxiliary_scans"]["noise_adj"] can be
+        passed as the noise to processing.channel_combination.whiten.
+
+    Returns
+    -------
+    suspect.MRSData or LazyTwixData, or a list of them
 
-    with open_if_filepath(source_file, 'rb') as fin:
+    """
+    with _open_if_filepath(source_file, 'rb') as fin:
         # we can tell the type of file from the first two uints in the header
         first_uint, second_uint = struct.unpack("II", fin.read(8))
+        is_vd = first_uint == 0 and second_uint <= 64
+        measurement_indices = _measurement_indices(second_uint if is_vd else 1, measurement)
 
-        # reset the file pointer before giving to specific function
-        fin.seek(0)
+        # load each measurement once, in the order they are stored in the file
+        measurements = {}
+        for measurement_index in sorted(set(measurement_indices)):
+            if lazy:
+                measurements[measurement_index] = _load_twix_lazy(source_file, cache, measurement_index, dtype,
+                                                                   auxiliary)
+                continue
+
+            # reset the file pointer before giving to specific function
+            fin.seek(0)
+
+            # create a TwixBuilder object for the actual loader function to use
+            builder = TwixBuilder(dtype, auxiliary=auxiliary)
+
+            if is_vd:
+                load_twix_vd(fin, builder, measurement_index)
+            else:
+                load_twix_vb(fin, builder)
+
+            measurements[measurement_index] = builder.build_mrsdata() if builder.num_scans else None
+
+    if measurement is None or isinstance(measurement, (int, numpy.integer)):
+        if measurements[measurement_indices[0]] is None:
+            raise ValueError("No MRS data scans found in measurement {} of TWIX file {}".format(
+                measurement_indices[0], source_file))
+        return measurements[measurement_indices[0]]
+    return [measurements[measurement_index] for measurement_index in measurement_indices]
 
-        # create a TwixBuilder object for the actual loader function to use
-        builder = TwixBuilder()
 
+def iter_scans(source_file, batch_size=None, measurement=None, dtype=None, wait=0):
+    """
+    Iterate over the MRS data scans of a TWIX file one at a time, in the
+    order they were acquired, without holding the whole dataset in memory.
+
+    Parameters
+    ----------
+    source_file : str or file-like
+        File path of TWIX file
+    batch_size : int, optional
+        If given, scans are yielded in blocks of up to batch_size scans
+        rather than individually, the last block holding whatever remains.
+    measurement : int, optional
+        Index of the measurement to read from a VD file, by default the last.
+    dtype : numpy.dtype, optional
+        The dtype of the channel data, by default the one set with
+        suspect.set_default_dtype, or complex128 if none has been set.
+    wait : float, optional
+        Number of seconds to wait for more data if the file ends before the
+        end of the acquisition, for reading a file which is still being
+        transferred from the scanner. By default an EOFError is raised
+        immediately.
+
+    Yields
+    ------
+    loop_counters : tuple of int or numpy.ndarray
+        The 14 loop counters of the scan, or an array of shape (n, 14) when
+        batching.
+    channel_data : suspect.MRSData
+        The FIDs of each channel, shape (channels, np), or (n, channels, np)
+        when batching.
+    time_stamps : tuple of int or numpy.ndarray
+        The time stamp and PMU time stamp of the scan, in units of 2.5ms, or
+        an array of shape (n, 2) when batching.
+
+    """
+    with _open_if_filepath(source_file, 'rb') as fin:
+        first_uint, second_uint = struct.unpack("II", _read(fin, 8, wait))
+        fin.seek(0)
+
+        # the builder only holds the header parameters and checks that the
+        # scans are consistent, the data is never accumulated
+        builder = TwixBuilder(dtype, preallocate=False)
         if first_uint == 0 and second_uint <= 64:
-            load_twix_vd(fin, builder)
+            _read_twix_vd_header(fin, builder, measurement, wait)
+            scans = _twix_vd_scans(fin, builder, wait)
         else:
-            load_twix_vb(fin, builder)
+            _read_twix_vb_header(fin, builder, wait)
+            scans = _twix_vb_scans(fin, builder, wait)
+
+        if batch_size is None:
+            for loop_counters, scan_data, scan_info in scans:
+                yield loop_counters, builder.wrap_data(scan_data), scan_info[1:3]
+            return
+
+        batch = []
+        for scan in scans:
+            batch.append(scan)
+            if len(batch) == batch_size:
+                yield _stack_scans(builder, batch)
+                batch = []
+        if batch:
+            yield _stack_scans(builder, batch)
 
-    return builder.build_mrsdata()
+
+def _stack_scans(builder, scans):
+    loop_counters, scan_data, scan_info = zip(*scans)
+    return (numpy.array(loop_counters, dtype=numpy.uint16),
+            builder.wrap_data(numpy.stack(scan_data)),
+            numpy.array([info[1:3] for info in scan_info], dtype=numpy.uint32))
 
 
 def anonymize_twix_header(header_string):
@@ -632,76 +1629,118 @@ def anonymize_twix_header(header_string):
     return header_string
 
 
+def _anonymize_header_bytes(header):
+    # the header is anonymized in place in the file, so the anonymized
+    # version must have exactly the same length as the original
+    header_string = header[:-24].decode('latin-1')
+    anonymized_header = anonymize_twix_header(header_string).encode('latin-1')
+    if len(anonymized_header) != len(header) - 24:
+        raise ValueError("Anonymizing the TWIX header changed its length from {} to {}".format(
+            len(header) - 24, len(anonymized_header)))
+    # for some reason the last 24 bytes of the header contain some stuff that
+    # is not a string, I don't know what it is
+    return anonymized_header + header[-24:]
+
+
+def _anonymization_patches(fin):
+    """
+    Finds all the parts of a TWIX file which have to be changed to anonymize
+    it, without reading any of the scan data.
+
+    Parameters
+    ----------
+    fin : file-like
+        The TWIX file, opened for reading in binary mode.
+
+    Returns
+    -------
+    list of (int, bytes)
+        The position in the file and the anonymized bytes to write there.
+    """
+    fin.seek(0)
+    # we can tell the type of file from the first two uints in the header
+    first_uint, second_uint = struct.unpack("II", fin.read(8))
+    patches = []
+    if first_uint == 0 and second_uint <= 64:
+        for i in range(second_uint):
+            # each measurement has an entry in the table at the start of the
+            # file, which includes the patient name 24 bytes in
+            fin.seek(8 + 152 * i)
+            meas_id, file_id, offset, length, patient_name, protocol_name = struct.unpack("IIQQ64s64s", fin.read(152))
+            patches.append((8 + 152 * i + 24, ("x" * 64).encode("latin-1")))
+
+            fin.seek(offset)
+            header_size = struct.unpack("I", fin.read(4))[0]
+            patches.append((offset + 4, _anonymize_header_bytes(fin.read(header_size - 4))))
+    else:
+        # first four bytes are the size of the header
+        fin.seek(4)
+        patches.append((4, _anonymize_header_bytes(fin.read(first_uint - 4))))
+    return patches
+
+
+def _apply_patches(fout, patches):
+    for position, patch in patches:
+        fout.seek(position)
+        fout.write(patch)
+
+
+def _anonymize_twix_stream(fin, fout):
+    patches = _anonymization_patches(fin)
+    # the scan data is copied across in fixed size chunks so that large files
+    # are never held in memory
+    fin.seek(0)
+    shutil.copyfileobj(fin, fout, 1024 * 1024)
+    _apply_patches(fout, patches)
+
+
 def anonymize_twix_vd(fin, fout):
-    twix_id, num_measurements = struct.unpack("II", fin.read(8))
-
-    fout.write(struct.pack("II", twix_id, num_measurements))
-
-    for i in range(num_measurements):
-        fin.seek(8 + 152 * i)
-
-        print(fin.tell())
-        meas_id, file_id, offset, length, patient_name, protocol_name = struct.unpack("IIQQ64s64s", fin.read(152))
-        print(patient_name)
-        anon_patient_name = ("x" * 64).encode("latin-1")
-        print(anon_patient_name)
-        print(offset)
-        print(length)
-        print(offset + length)
-        fout.seek(8 + 152 * i)
-        fout.write(struct.pack("IIQQ64s64s", meas_id, file_id, offset, length, anon_patient_name, protocol_name))
-
-        fin.seek(offset)
-        # read the header and anonymize it
-        header_size = struct.unpack("I", fin.read(4))[0]
-        print("header_size: {}".format(header_size))
-        header = fin.read(header_size - 4)
-        header_string = header[:-24].decode('latin-1')
-
-        anonymized_header = anonymize_twix_header(header_string)
-        print("fout position")
-        print(fout.tell())
-        fout.seek(offset)
-        print(fout.tell())
-        fout.write(struct.pack("I", header_size))
-        fout.write(anonymized_header.encode("latin1"))
-        fout.write(header[-24:])
-
-        fout.write(fin.read(length - header_size))
+    _anonymize_twix_stream(fin, fout)
 
 
 def anonymize_twix_vb(fin, fout):
-    # first four bytes are the size of the header
-    header_size = struct.unpack("I", fin.read(4))[0]
+    _anonymize_twix_stream(fin, fout)
 
-    # read the rest of the header minus the four bytes we already read
-    header = fin.read(header_size - 4)
-    # for some reason the last 24 bytes of the header contain some stuff that
-    # is not a string, I don't know what it is
-    header_string = header[:-24].decode('latin-1')
 
-    anonymized_header = anonymize_twix_header(header_string)
-
-    fout.write(struct.pack("I", header_size))
-    fout.write(anonymized_header.encode('latin-1'))
-    fout.write(header[-24:])
-    fout.write(fin.read())
+def anonymize_twix(filename, anonymized_filename=None, inplace=False):
+    """
+    Anonymize a TWIX file, using anonymize_twix_header on the header of each
+    measurement.
 
+    Only the headers are rewritten. The file is copied with
+    shutil.copyfile, which uses the operating system's fast copy where
+    possible, and the headers are then patched in the copy. The original
+    file is only modified if inplace is True.
 
-def anonymize_twix(filename, anonymized_filename):
+    Parameters
+    ----------
+    filename : str
+        The TWIX file to anonymize.
+    anonymized_filename : str, optional
+        The path to write the anonymized file to. Required unless inplace is
+        True.
+    inplace : bool, optional
+        If True, the headers are patched in the original file instead of a
+        copy, and no anonymized_filename may be given.
+    """
+    if inplace:
+        if anonymized_filename is not None:
+            raise ValueError("anonymized_filename cannot be given when anonymizing in place")
+    elif anonymized_filename is None:
+        raise ValueError("anonymized_filename is required, unless inplace=True")
+
+    # read all the headers before writing anything, so that a file which
+    # cannot be anonymized is left untouched
     with open(filename, 'rb') as fin:
+        patches = _anonymization_patches(fin)
 
-        # we can tell the type of file from the first two uints in the header
-        first_uint, second_uint = struct.unpack("II", fin.read(8))
-
-        # reset the file pointer before giving to specific function
-        fin.seek(0)
+    if inplace:
+        anonymized_filename = filename
+    else:
+        shutil.copyfile(filename, anonymized_filename)
 
-        with open(anonymized_filename, 'wb') as fout:
-            if first_uint == 0 and second_uint <= 64:
-                anonymize_twix_vd(fin, fout)
-            else:
-                anonymize_twix_vb(fin, fout)
+    with open(anonymized_filename, 'r+b') as fout:
+        _apply_patches(fout, patches)
 
 
 def get_header(filename):
@@ -1,7 +1,43 @@
 import suspect.base
+from suspect import _axes, _dtype
 
+import collections
 import numpy
 
+# the acquisition parameters of an MRSBase are kept in a single immutable
+# record, which is shared by reference between an array and all the views
+# and results derived from it, so that numpy operations only have to pass
+# on one attribute. setting a parameter replaces the record of that array.
+_AcquisitionParameters = collections.namedtuple("_AcquisitionParameters",
+                                                ["dt", "f0", "te", "tr", "ppm0",
+                                                 "voxel_dimensions", "transform", "metadata"])
+
+_DEFAULT_PARAMETERS = _AcquisitionParameters(None, None, 30, -1, None, (10, 10, 10), None, None)
+
+
+def _per_spectrum(value):
+    """
+    Converts a scalar or array of shifts into a form which broadcasts against
+    data of shape (..., np), with one shift for each spectrum in the leading
+    dimensions, by adding a trailing axis to arrays.
+    """
+    value = numpy.asarray(value)
+    if value.ndim == 0:
+        return value[()]
+    return value[..., numpy.newaxis]
+
+
+def _phase_factor(phase):
+    """
+    Calculates exp(phase), in the default dtype if one is set, so that
+    multiplying by it does not promote the data. The phase itself is always
+    calculated in double precision.
+    """
+    factor = numpy.exp(phase)
+    if _dtype._default_dtype is not None:
+        factor = numpy.asarray(factor, dtype=_dtype._default_dtype)
+    return factor
+
 
 class MRSBase(suspect.base.ImageBase):
     """
@@ -10,33 +46,124 @@ class MRSBase(suspect.base.ImageBase):
 
     """
     def __new__(cls, input_array, dt, f0, te=30, tr=-1, ppm0=4.7, voxel_dimensions=(10, 10, 10), transform=None, metadata=None):
-        obj = super(MRSBase, cls).__new__(cls, input_array, transform)
+        obj = _dtype._apply_default_dtype(super(MRSBase, cls).__new__(cls, input_array, transform))
         # add the new attributes to the created instance
-        obj._dt = dt
-        obj._f0 = f0
-        obj._te = te
-        obj._tr = tr
-        obj.ppm0 = ppm0
-        obj.voxel_dimensions = voxel_dimensions
-        obj.metadata = metadata
+        obj._parameters = _AcquisitionParameters(dt, f0, te, tr, ppm0, voxel_dimensions, obj.transform, metadata)
         return obj
 
     def __array_finalize__(self, obj):
-        # if this instance is being created by slicing from another MRSBase, copy the parameters across
-        self._dt = getattr(obj, 'dt', None)
-        self._f0 = getattr(obj, 'f0', None)
-        self._te = getattr(obj, 'te', 30)
-        self._tr = getattr(obj, 'tr', -1)
-        self.ppm0 = getattr(obj, 'ppm0', None)
-        self.transform = getattr(obj, 'transform', None)
-        self.metadata = getattr(obj, 'metadata', None)
-        self.voxel_dimensions = getattr(obj, 'voxel_dimensions', (10, 10, 10))
-
-    def __array_wrap__(self, obj):
+        # if this instance is being created by slicing from another MRSBase, share its parameters
+        self._parameters = getattr(obj, '_parameters', _DEFAULT_PARAMETERS)
+        # the FFT cache is never shared, even with a view of the same data
+        self._fft_cache = None
+
+    def __array_wrap__(self, obj, context=None, return_scalar=False):
         if len(obj.shape) == 0:
             return obj[()]
         else:
-            return numpy.ndarray.__array_wrap__(self, obj)
+            return numpy.ndarray.__array_wrap__(self, _dtype._apply_default_dtype(obj), context)
+
+    def __setitem__(self, key, value):
+        super(MRSBase, self).__setitem__(key, value)
+        self._clear_fft_cache()
+
+    def __iadd__(self, other):
+        self._clear_fft_cache()
+        return super(MRSBase, self).__iadd__(other)
+
+    def __isub__(self, other):
+        self._clear_fft_cache()
+        return super(MRSBase, self).__isub__(other)
+
+    def __imul__(self, other):
+        self._clear_fft_cache()
+        return super(MRSBase, self).__imul__(other)
+
+    def __itruediv__(self, other):
+        self._clear_fft_cache()
+        return super(MRSBase, self).__itruediv__(other)
+
+    def __ipow__(self, other):
+        self._clear_fft_cache()
+        return super(MRSBase, self).__ipow__(other)
+
+    def fill(self, value):
+        super(MRSBase, self).fill(value)
+        self._clear_fft_cache()
+
+    def use_fft_cache(self, enabled=True):
+        """Turns caching of the Fourier transform of this object on or off.
+
+        With the cache on, the first call to spectrum() (or fid() for an
+        MRSSpectrum) computes the transform as usual, and later calls return
+        the same result, which is made read-only, until the data is changed.
+        The cached result also knows its own inverse transform, so e.g.
+        data.spectrum().fid() is data itself.
+
+        The cache is cleared by item assignment, in-place arithmetic and
+        fill(), on this object or on any MRSBase view of it. Changes made in
+        other ways, e.g. through a plain ndarray view or a ufunc with out=,
+        are not detected.
+
+        Only an object which is not itself a view of another MRSBase can
+        cache its transform, as writes through the object it is a view of,
+        or through other views of that, could not be detected. To cache the
+        transform of a slice, use a copy of it instead.
+
+        Parameters
+        ----------
+        enabled : bool
+            Whether to cache the transform.
+
+        Returns
+        -------
+        MRSBase
+            This object, so the call can be chained.
+
+        Raises
+        ------
+        ValueError
+            If enabled is True and this object is a view of another MRSBase.
+        """
+        if enabled and self._is_mrsbase_view():
+            raise ValueError("Cannot cache the transform of a view of another MRSBase, use a copy instead")
+        self._clear_fft_cache()
+        self._fft_cache = {} if enabled else None
+        return self
+
+    def _is_mrsbase_view(self):
+        array = self.base
+        while isinstance(array, numpy.ndarray):
+            if isinstance(array, MRSBase):
+                return True
+            array = array.base
+        return False
+
+    def _clear_fft_cache(self):
+        # a write to a view also changes the data of the arrays it is a view
+        # of, so their caches have to be cleared as well
+        array = self
+        while isinstance(array, numpy.ndarray):
+            cache = getattr(array, "_fft_cache", None)
+            if cache:
+                for transformed in cache.values():
+                    # the transform now belongs to out of date data, so it
+                    # must not link back to this array
+                    if transformed._fft_cache:
+                        transformed._fft_cache.clear()
+                cache.clear()
+            array = array.base
+
+    def _cached_transform(self, domain, inverse_domain, transform):
+        cache = self._fft_cache
+        if cache is None:
+            return transform()
+        if domain not in cache:
+            result = transform()
+            result.flags.writeable = False
+            result._fft_cache = {inverse_domain: self}
+            cache[domain] = result
+        return cache[domain]
 
     def __str__(self):
         return "<MRSBase instance f0={0}MHz TE={1}ms dt={2}ms>".format(self.f0, self.te, self.dt * 1e3)
@@ -57,15 +184,8 @@ class MRSBase(suspect.base.ImageBase):
             New MRSBase instance with data from new_array and parameters from self.
 
         """
-        cast_array = new_array.view(type(self))
-        cast_array._dt = self.dt
-        cast_array._f0 = self.f0
-        cast_array._te = self.te
-        cast_array._tr = self.tr
-        cast_array.ppm0 = self.ppm0
-        cast_array.voxel_dimensions = self.voxel_dimensions
-        cast_array.transform = self.transform
-        cast_array.metadata = self.metadata
+        cast_array = _dtype._apply_default_dtype(numpy.asarray(new_array)).view(type(self))
+        cast_array._parameters = self._parameters
         return cast_array
 
     @property
@@ -73,7 +193,51 @@ class MRSBase(suspect.base.ImageBase):
         """The dwell time in s for the acquisition.
 
         """
-        return self._dt
+        return self._parameters.dt
+
+    @property
+    def ppm0(self):
+        """The chemical shift in PPM of the centre of the spectrum.
+
+        """
+        return self._parameters.ppm0
+
+    @ppm0.setter
+    def ppm0(self, ppm0):
+        self._parameters = self._parameters._replace(ppm0=ppm0)
+
+    @property
+    def voxel_dimensions(self):
+        """The size of the voxel in mm, used when there is no transform.
+
+        """
+        return self._parameters.voxel_dimensions
+
+    @voxel_dimensions.setter
+    def voxel_dimensions(self, voxel_dimensions):
+        self._parameters = self._parameters._replace(voxel_dimensions=voxel_dimensions)
+
+    @property
+    def transform(self):
+        """The affine transform from voxel coordinates to scanner coordinates.
+
+        """
+        return self._parameters.transform
+
+    @transform.setter
+    def transform(self, transform):
+        self._parameters = self._parameters._replace(transform=transform)
+
+    @property
+    def metadata(self):
+        """Dictionary of any other information about the acquisition.
+
+        """
+        return self._parameters.metadata
+
+    @metadata.setter
+    def metadata(self, metadata):
+        self._parameters = self._parameters._replace(metadata=metadata)
 
     @property
     def np(self):
@@ -103,21 +267,21 @@ class MRSBase(suspect.base.ImageBase):
         """The echo time of the sequence in ms.
 
         """
-        return self._te
+        return self._parameters.te
 
     @property
     def tr(self):
         """The repetition time of the sequence in ms.
 
         """
-        return self._tr
+        return self._parameters.tr
 
     @property
     def f0(self):
         """The scanner frequency in MHz. Also referred to by LCModel as Hz per PPM.
 
         """
-        return self._f0
+        return self._parameters.f0
 
     def hertz_to_ppm(self, frequency):
         """Converts a frequency in Hertz to the corresponding PPM for this dataset.
@@ -157,10 +321,11 @@ class MRSBase(suspect.base.ImageBase):
         Returns
         -------
         aranged ndarray
-            An array of the sample times in seconds for each point in the FID.
+            A read-only array of the sample times in seconds for each point in
+            the FID, shared with all data with the same np and dt.
 
         """
-        return numpy.arange(0.0, self.dt * self.np, self.dt)
+        return _axes.time_axis(self.np, self.dt)
 
     def frequency_axis(self):
         """
@@ -168,10 +333,11 @@ class MRSBase(suspect.base.ImageBase):
         Returns
         -------
         ndarray
-            An array of frequencies in Hertz ranging from -sw/2 to sw/2.
+            A read-only array of frequencies in Hertz ranging from -sw/2 to
+            sw/2, shared with all data with the same np and sw.
 
         """
-        return numpy.linspace(-self.sw / 2, self.sw / 2, self.np, endpoint=False)
+        return _axes.frequency_axis(self.np, self.sw)
 
     def frequency_axis_ppm(self):
         """
@@ -179,12 +345,11 @@ class MRSBase(suspect.base.ImageBase):
         Returns
         -------
         ndarray
-            An array of frequencies in PPM.
+            A read-only array of frequencies in PPM, shared with all data with
+            the same np, sw, f0 and ppm0.
 
         """
-        return numpy.linspace(self.hertz_to_ppm(-self.sw / 2.0),
-                              self.hertz_to_ppm(self.sw / 2.0),
-                              self.np, endpoint=False)
+        return _axes.frequency_axis_ppm(self.np, self.sw, self.f0, self.ppm0)
 
     def voxel_volume(self):
         """
@@ -273,8 +438,9 @@ class MRSData(MRSBase):
             The Fourier-transformed and shifted data, represented as a spectrum
 
         """
-        spectrum = self.inherit(numpy.fft.fftshift(numpy.fft.fft(self, axis=-1), axes=-1)).view(MRSSpectrum)
-        return spectrum
+        def transform():
+            return self.inherit(numpy.fft.fftshift(numpy.fft.fft(self, axis=-1), axes=-1)).view(MRSSpectrum)
+        return self._cached_transform("spectrum", "fid", transform)
 
     def adjust_phase(self, zero_phase, first_phase=0., fixed_frequency=0.):
         """
@@ -284,11 +450,11 @@ class MRSData(MRSBase):
 
         Parameters
         ----------
-        zero_phase: float
+        zero_phase: float or array_like
             The zero order phase shift in radians
-        first_phase: float
+        first_phase: float or array_like
             The first order phase shift in radians per Hertz
-        fixed_frequency: float
+        fixed_frequency: float or array_like
             The frequency at which the first order phase shift is zero
 
         Returns
@@ -300,7 +466,10 @@ class MRSData(MRSBase):
         --------
         suspect.adjust_phase : equivalent function
         """
-        # easiest to do this in the spectral domain
+        # a zero order phase shift is the same in both domains
+        if not numpy.any(first_phase):
+            return self * _phase_factor(1j * _per_spectrum(zero_phase))
+        # otherwise it is easiest to do this in the spectral domain
         spectrum = self.spectrum()
         return spectrum.adjust_phase(zero_phase, first_phase, fixed_frequency).fid()
 
@@ -312,7 +481,7 @@ class MRSData(MRSBase):
 
         Parameters
         ----------
-        frequency_shift: float
+        frequency_shift: float or array_like
             The amount to shift the frequency, in Hertz.
 
         Returns
@@ -324,7 +493,7 @@ class MRSData(MRSBase):
         --------
         suspect.adjust_frequency : equivalent function
         """
-        correction = numpy.exp(2j * numpy.pi * (frequency_shift * self.time_axis()))
+        correction = _phase_factor(2j * numpy.pi * (_per_spectrum(frequency_shift) * self.time_axis()))
         return self.inherit(numpy.multiply(self, correction))
 
 
@@ -351,8 +520,9 @@ class MRSSpectrum(MRSBase):
         MRSData
             The inverse-Fourier-shifted and inverse-Fourier-transformed data, represented as a FID
         """
-        fid = self.inherit(numpy.fft.ifft(numpy.fft.ifftshift(self, axes=-1), axis=-1)).view(MRSData)
-        return fid
+        def transform():
+            return self.inherit(numpy.fft.ifft(numpy.fft.ifftshift(self, axes=-1), axis=-1)).view(MRSData)
+        return self._cached_transform("fid", "spectrum", transform)
 
     def adjust_phase(self, zero_phase, first_phase=0., fixed_frequency=0.):
         """
@@ -362,11 +532,11 @@ class MRSSpectrum(MRSBase):
 
         Parameters
         ----------
-        zero_phase: float
+        zero_phase: float or array_like
             The zero order phase shift in radians
-        first_phase: float
+        first_phase: float or array_like
             The first order phase shift in radians per Hertz
-        fixed_frequency: float
+        fixed_frequency: float or array_like
             The frequency at which the first order phase shift is zero
 
         Returns
@@ -378,12 +548,10 @@ class MRSSpectrum(MRSBase):
         --------
         suspect.adjust_phase : equivalent function
         """
-        phase_ramp = numpy.linspace(-self.sw / 2,
-                                    self.sw / 2,
-                                    self.np,
-                                    endpoint=False)
-        phase_shift = zero_phase + first_phase * (fixed_frequency + phase_ramp)
-        phased_spectrum = self * numpy.exp(1j * phase_shift)
+        phase_ramp = self.frequency_axis()
+        phase_shift = (_per_spectrum(zero_phase)
+                       + _per_spectrum(first_phase) * (_per_spectrum(fixed_frequency) + phase_ramp))
+        phased_spectrum = self * _phase_factor(1j * phase_shift)
         return phased_spectrum
 
     def adjust_frequency(self, frequency_shift):
@@ -394,7 +562,7 @@ class MRSSpectrum(MRSBase):
 
         Parameters
         ----------
-        frequency_shift: float
+        frequency_shift: float or array_like
             The amount to shift the frequency, in Hertz.
 
         Returns
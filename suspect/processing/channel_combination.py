@@ -1,5 +1,7 @@
 import numpy
 
+from suspect._dtype import _apply_default_dtype
+
 
 def svd_weighting(data, axis=-2):
 
@@ -32,7 +34,12 @@ def whiten(data, noise=100):
     data : MRSData
         The data to be whitened.
     noise : arraylike, int
-        
+        Either the number of points at the end of each FID to use as noise,
+        or an array of noise samples with channels as the first index. Arrays
+        with more than two dimensions, such as the noise adjustment scans
+        from suspect.io.load_twix(..., auxiliary=True), should have channels
+        as the second to last index like the data itself.
+
     Returns
     -------
     MRSData
@@ -46,13 +53,18 @@ def whiten(data, noise=100):
         # remove all zeros from the noise (probably uncollected data)
         data_noise = data_noise[:, data_noise[0] != 0]
     else:
-        data_noise = noise
+        data_noise = numpy.asarray(noise)
+        if data_noise.ndim > 2:
+            data_noise = numpy.moveaxis(data_noise, -2, 0).reshape((data_noise.shape[-2], -1))
 
     # calculate the noise covariance
     cov = numpy.cov(data_noise)
     # do an eigenvalue decomposition and form the scaling matrix
     u, d, v = numpy.linalg.svd(cov)
     w = numpy.dot(u, numpy.diag(numpy.sqrt(1 / d)))
+    # the transform is calculated in double precision, but if a default dtype
+    # is set it is applied in that precision
+    w = _apply_default_dtype(w)
     # apply the transform to the data
     return data.inherit(w.T.conj() @ data)
 
@@ -66,20 +66,28 @@ def spectral_registration(data, target, initial_guess=(0.0, 0.0), frequency_rang
     # be a numpy.array of the same size as the data in which case we simply use
     # that array as the weightings for the comparison
     if type(frequency_range) is tuple:
-        spectral_weights = np.logical_and(frequency_range[0] < data.frequency_axis(),
-                                          frequency_range[1] > data.frequency_axis())
+        frequency_axis = data.frequency_axis()
+        spectral_weights = np.logical_and(frequency_range[0] < frequency_axis,
+                                          frequency_range[1] > frequency_axis)
     elif type(frequency_range) is slice:
         spectral_weights = np.zeros_like(target, np.bool_)
         spectral_weights[frequency_range] = 1
     else:
         spectral_weights = frequency_range
 
+    # the residual function is called many times by the optimizer, so it works
+    # on plain ndarrays to avoid the overhead of the MRSData subclass
+    data_array = np.asarray(data)
+    target_array = np.asarray(target)
+    time_axis = data.time_axis()
+
     # define a residual function for the optimizer to use
     def residual(input_vector):
-        transformed_data = data.adjust_frequency(-input_vector[0]).adjust_phase(-input_vector[1])
-        residual_data = transformed_data - target
+        # equivalent to data.adjust_frequency(-f).adjust_phase(-phi) - target
+        transformed_data = data_array * np.exp(-2j * np.pi * input_vector[0] * time_axis - 1j * input_vector[1])
+        residual_data = transformed_data - target_array
         if frequency_range is not None:
-            spectrum = residual_data.spectrum()
+            spectrum = np.fft.fftshift(np.fft.fft(residual_data))
             weighted_spectrum = spectrum * spectral_weights
             # remove zero-elements
             weighted_spectrum = weighted_spectrum[weighted_spectrum != 0]
@@ -146,8 +154,9 @@ def rats(data, target, initial_guess=(0.0, 0.0), frequency_range=None, baseline_
     """
 
     if type(frequency_range) is tuple:
-        included_frequencies = np.logical_and(frequency_range[0] < data.frequency_axis(),
-                                              frequency_range[1] > data.frequency_axis())
+        frequency_axis = data.frequency_axis()
+        included_frequencies = np.logical_and(frequency_range[0] < frequency_axis,
+                                              frequency_range[1] > frequency_axis)
     elif type(frequency_range) is slice:
         included_frequencies = np.zeros_like(target, np.bool)
         included_frequencies[frequency_range] = 1
@@ -257,12 +266,16 @@ def correct_frequency_and_phase(data, target, method='sr', axis=-1, **kwargs):
     else:
         raise ValueError("Unknown correction method {0}".format(method))
 
-    # define a closure function to calculate shifts and perform the alignment
-    def correct(moving_data: suspect.MRSBase):
-        frequency_shift, phase_shift = func(moving_data, target, **kwargs)
-        return moving_data.adjust_frequency(-frequency_shift).adjust_phase(-phase_shift)
-
     if len(data.shape) == 1:
-        return correct(data)
-    else:
-        return np.apply_along_axis(correct, axis, data)
+        frequency_shift, phase_shift = func(data, target, **kwargs)
+        return data.adjust_frequency(-frequency_shift).adjust_phase(-phase_shift)
+
+    # the shifts have to be estimated one spectrum at a time, but they can
+    # then all be applied at once
+    moving_data = np.moveaxis(data, axis, -1)
+    frequency_shifts = np.zeros(moving_data.shape[:-1])
+    phase_shifts = np.zeros(moving_data.shape[:-1])
+    for index in np.ndindex(*moving_data.shape[:-1]):
+        frequency_shifts[index], phase_shifts[index] = func(moving_data[index], target, **kwargs)
+    corrected_data = moving_data.adjust_frequency(-frequency_shifts).adjust_phase(-phase_shifts)
+    return np.moveaxis(corrected_data, -1, axis)
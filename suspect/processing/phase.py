@@ -35,13 +35,20 @@ def mag_real(data, *args, range_hz=None, range_ppm=None):
     else:
         frequency_slice = slice(0, data.np)
 
+    # the residual function works on plain ndarrays, to avoid the overhead
+    # of the MRSSpectrum subclass on every call
+    phase_ramp = data.frequency_axis()
+
     def single_spectrum_version(spectrum):
+        spectrum = np.asarray(spectrum)
+        magnitude = np.abs(spectrum)
+
         def residual(pars):
             par_vals = pars.valuesdict()
-            phased_data = spectrum.adjust_phase(par_vals['phi0'],
-                                                par_vals['phi1'])
+            # equivalent to spectrum.adjust_phase(phi0, phi1)
+            phased_data = spectrum * np.exp(1j * (par_vals['phi0'] + par_vals['phi1'] * phase_ramp))
 
-            diff = np.real(phased_data) - np.abs(spectrum)
+            diff = np.real(phased_data) - magnitude
 
             return diff[frequency_slice]
 
@@ -80,6 +87,9 @@ def ernst(data):
     phi1 : float
         The estimated first order phase correction
     """
+    # adjust_phase works on the spectrum, which only has to be computed once
+    data = data.copy().use_fft_cache()
+
     def residual(pars):
         par_vals = pars.valuesdict()
         phased_data = data.adjust_phase(par_vals['phi0'],
@@ -1,24 +1,63 @@
 import argparse
+import concurrent.futures
 import os
 
 import suspect
 
 
+def _anonymize_file(filename, output_filename, inplace):
+    try:
+        suspect.io.twix.anonymize_twix(filename, output_filename, inplace)
+    except Exception as e:
+        return "anonymize_twix: cannot anonymize '{0}': {1}".format(filename, e)
+
+
 def anonymize_twix():
 
-    # start with a simple parser which looks for the single positional argument, the path to the graph file
+    # start with a simple parser which looks for the path to the file or folder to anonymize
     parser = argparse.ArgumentParser()
 
-    parser.add_argument("filename")
-    parser.add_argument("output_filename")
+    parser.add_argument("filename",
+                        help="TWIX file, or folder of .dat files, to anonymize")
+    parser.add_argument("output_filename", nargs="?",
+                        help="file or folder to write the anonymized data to")
+    parser.add_argument("--in-place", action="store_true",
+                        help="anonymize the original files instead of writing copies, "
+                             "in which case no output_filename is given")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of files to anonymize in parallel, by default the number of CPUs")
 
     args = parser.parse_args()
-
-    if not os.path.isfile(args.filename):
+    if args.in_place and args.output_filename is not None:
+        parser.error("output_filename cannot be given with --in-place")
+    elif not args.in_place and args.output_filename is None:
+        parser.error("output_filename is required, unless --in-place is given")
+
+    if os.path.isdir(args.filename):
+        filenames = sorted(os.path.join(args.filename, name) for name in os.listdir(args.filename)
+                           if name.lower().endswith(".dat"))
+        if args.output_filename is None:
+            output_filenames = [None] * len(filenames)
+        else:
+            os.makedirs(args.output_filename, exist_ok=True)
+            output_filenames = [os.path.join(args.output_filename, os.path.basename(filename))
+                                for filename in filenames]
+    elif os.path.isfile(args.filename):
+        filenames = [args.filename]
+        output_filenames = [args.output_filename]
+    else:
         print("anonymize_twix: cannot anonymize '{0}': No such file".format(args.filename))
         exit(-1)
 
-    try:
-        suspect.io.twix.anonymize_twix(args.filename, args.output_filename)
-    except Exception as e:
-        print("anonymize_twix: cannot anonymize '{0}': {1}".format(args.filename, e))
+    if len(filenames) == 1:
+        errors = [_anonymize_file(filenames[0], output_filenames[0], args.in_place)]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+            errors = list(executor.map(_anonymize_file, filenames, output_filenames,
+                                       [args.in_place] * len(filenames)))
+
+    for error in errors:
+        if error is not None:
+            print(error)
+    if any(errors):
+        exit(-1)
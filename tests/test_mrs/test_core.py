@@ -36,3 +36,77 @@ def test_slice_ppm():
     assert a_slice == slice(377, 623)
     reversed_slice = spectrum.slice_ppm(3.7, 5.7)
     assert a_slice == slice(377, 623)
+
+
+def test_adjust_phase_array():
+    data = suspect.MRSData(numpy.random.rand(3, 4, 64) + 1j * numpy.random.rand(3, 4, 64), 1e-3, 123)
+    zero_phases = numpy.random.rand(3, 4)
+    first_phases = numpy.random.rand(4) * 1e-3
+    phased_data = suspect.adjust_phase(data, zero_phases, first_phases, fixed_frequency=10)
+    assert isinstance(phased_data, suspect.MRSData)
+    assert phased_data.shape == (3, 4, 64)
+    for i in range(3):
+        for j in range(4):
+            numpy.testing.assert_allclose(phased_data[i, j],
+                                          data[i, j].adjust_phase(zero_phases[i, j], first_phases[j], 10))
+    # zero order phasing skips the transform, but gives the same result
+    numpy.testing.assert_allclose(data.adjust_phase(zero_phases),
+                                  data.spectrum().adjust_phase(zero_phases).fid())
+    numpy.testing.assert_allclose(data.spectrum().adjust_phase(zero_phases),
+                                  data.adjust_phase(zero_phases).spectrum())
+
+
+def test_adjust_frequency_array():
+    data = suspect.MRSData(numpy.random.rand(5, 64) + 1j * numpy.random.rand(5, 64), 1e-3, 123)
+    frequency_shifts = numpy.linspace(-20, 20, 5)
+    shifted_data = suspect.adjust_frequency(data, frequency_shifts)
+    assert isinstance(shifted_data, suspect.MRSData)
+    for i in range(5):
+        numpy.testing.assert_allclose(shifted_data[i], data[i].adjust_frequency(frequency_shifts[i]))
+    shifted_spectrum = suspect.adjust_frequency(data.spectrum(), frequency_shifts)
+    numpy.testing.assert_allclose(shifted_spectrum, shifted_data.spectrum(), atol=1e-12)
+
+
+@pytest.fixture
+def single_precision():
+    previous_dtype = suspect.set_default_dtype("complex64")
+    yield
+    suspect.set_default_dtype(previous_dtype)
+
+
+def test_default_dtype(single_precision):
+    assert suspect.get_default_dtype() == numpy.complex64
+    with pytest.raises(ValueError):
+        suspect.set_default_dtype("float32")
+
+    rng = numpy.random.default_rng(0)
+    raw_data = rng.standard_normal((8, 4, 256)) + 1j * rng.standard_normal((8, 4, 256))
+    data = suspect.MRSData(raw_data, 5e-4, 123)
+    assert data.dtype == numpy.complex64
+    numpy.testing.assert_allclose(data, raw_data, rtol=1e-6)
+
+    # the processing stays in single precision all the way through
+    assert data.spectrum().dtype == numpy.complex64
+    assert data.spectrum().fid().dtype == numpy.complex64
+    assert data.adjust_frequency(numpy.arange(4)).dtype == numpy.complex64
+    assert data.adjust_phase(0.5).dtype == numpy.complex64
+    assert data.adjust_phase(0.5, 1e-3).dtype == numpy.complex64
+    assert (data * 2.0j).dtype == numpy.complex64
+    assert data.inherit(raw_data).dtype == numpy.complex64
+    whitened_data = suspect.processing.channel_combination.whiten(data)
+    assert whitened_data.dtype == numpy.complex64
+    combined_data = suspect.processing.channel_combination.combine_channels(whitened_data)
+    assert combined_data.dtype == numpy.complex64
+    corrected_data = suspect.processing.frequency_correction.correct_frequency_and_phase(combined_data,
+                                                                                         combined_data[0])
+    assert corrected_data.dtype == numpy.complex64
+    # but real valued results are unaffected
+    assert numpy.abs(data).dtype == numpy.float32
+    assert data.time_axis().dtype == numpy.float64
+
+    # and the results match double precision processing
+    suspect.set_default_dtype(None)
+    double_data = suspect.MRSData(raw_data, 5e-4, 123)
+    numpy.testing.assert_allclose(data.adjust_frequency(numpy.arange(4)).adjust_phase(0.5, 1e-3),
+                                  double_data.adjust_frequency(numpy.arange(4)).adjust_phase(0.5, 1e-3),
+                                  atol=1e-5)
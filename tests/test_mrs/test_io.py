@@ -5,8 +5,9 @@ import unittest.mock
 import builtins
 from unittest.mock import patch
 import os
+import warnings
 
-from suspect.io._common import complex_array_from_iter
+from suspect.io._common import complex_array_from_iter, complex_array_from_buffer
 
 import numpy
 
@@ -25,6 +26,25 @@ def test_shaped_complex_from_iter():
     assert array.shape == (2, 2)
 
 
+def test_complex_from_buffer():
+    values = numpy.array([1.0, 0.0, 0.0, 1.0, 2.0, -3.0], dtype="<f4")
+    array = complex_array_from_buffer(values.tobytes())
+    numpy.testing.assert_array_equal(array, [1, 1j, 2 - 3j])
+    # native floats of the right size are viewed without copying
+    array = complex_array_from_buffer(values)
+    assert array.dtype == numpy.complex64
+    assert numpy.shares_memory(array, values)
+    # other types are converted with the chirality applied
+    array = complex_array_from_buffer(values.astype(">f8").tobytes(), ">f8", chirality=-1)
+    numpy.testing.assert_array_equal(array, [1, -1j, 2 + 3j])
+    array = complex_array_from_buffer(numpy.array([1, 2, 3, 4], "<i4").tobytes(), "<i4", length=1,
+                                      complex_dtype=numpy.complex128)
+    assert array.dtype == numpy.complex128
+    numpy.testing.assert_array_equal(array, [1 + 2j])
+    array = complex_array_from_buffer(numpy.arange(8, dtype=numpy.float32), shape=(1, 2, 2))
+    assert array.shape == (2, 2)
+
+
 def test_write_dpt():
     data = suspect.MRSData(numpy.zeros(1), 1e-3, 123.456)
     mock = unittest.mock.mock_open()
@@ -94,6 +114,53 @@ def test_lcmodel_read_basis():
     assert basis["BASIS1"]["BADELT"] == 0.000207357807
     assert basis["BASIS1"]["NDATAB"] == 4944
     assert "NAA" in basis["SPECTRA"]
+    assert basis["SPECTRA"]["NAA"]["data"].shape == (4944,)
+    assert basis["SPECTRA"]["NAA"]["data"].dtype == numpy.complex64
+
+
+def _assert_identical(value, expected):
+    # compares nested namelists exactly, including the types of the values
+    assert type(value) is type(expected)
+    if isinstance(expected, dict):
+        assert list(value) == list(expected)
+        for key in expected:
+            _assert_identical(value[key], expected[key])
+    elif isinstance(expected, (list, tuple)):
+        assert len(value) == len(expected)
+        for item, expected_item in zip(value, expected):
+            _assert_identical(item, expected_item)
+    elif isinstance(expected, numpy.ndarray):
+        assert value.dtype == expected.dtype
+        numpy.testing.assert_array_equal(value, expected)
+    else:
+        assert value == expected
+
+
+def test_lcmodel_read_basis_cache(tmp_path):
+    # a small basis set with list and logical values as well
+    with open(tmp_path / "small.basis", "w") as fout:
+        fout.write(""" $SEQPAR
+ FWHMBA = 0.05, HZPPPM = 123.2, ECHOT = 30.0, SEQ = 'PRESS'
+ $END
+ $BASIS1
+ IDBASI = 'test', FMTBAS = '(6E13.5)', BADELT = 0.0002, NDATAB = 3
+ $END
+ $BASIS
+ ID = 'a', METABO = 'NAA', CONC = 1.0, TRAMP = 1.0, VOLUME = 1.0, ISHIFT = 0
+ PPMAPP = 1.5 -2 3.25, USED = T, NAMES = 'x' 'y'
+ $END
+  1.0 2.0 -3.0 4.5e-3 5.0 6.0
+""")
+    for filename in ["tests/test_data/lcmodel/press_30ms_3T.basis", str(tmp_path / "small.basis")]:
+        basis = suspect.io.lcmodel.read_basis(filename)
+        cache_dir = str(tmp_path / "basis_cache")
+        for i in range(2):
+            # the first read writes the cache, the second loads it
+            cached_basis = suspect.io.lcmodel.read_basis(filename, cache_dir=cache_dir)
+            _assert_identical(cached_basis, basis)
+    assert len(os.listdir(cache_dir)) == 2
+    assert basis["SPECTRA"]["NAA"]["PPMAPP"] == [1.5, -2, 3.25]
+    assert basis["SPECTRA"]["NAA"]["USED"] is True
 
 
 def test_lcmodel_write_basis():
@@ -126,4 +193,80 @@ def test_felix_save_mat():
         suspect.io.felix.save_mat("test.mat", data)
         #print(mock.mock_calls)
         # handle = mock()
-        # print(handle.write.call_args())
\ No newline at end of file
+        # print(handle.write.call_args())
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_load_many(tmp_path, workers):
+    bad_file = tmp_path / "bad.txt"
+    bad_file.write_text("not an MRS file")
+    paths = ["tests/test_data/siemens/SVS_30.rda",
+             str(bad_file),
+             "tests/test_data/siemens/SVS_30.IMA",
+             "tests/test_data/siemens/SVS_XA60.dcm"]
+    results = suspect.io.load_many(paths, workers=workers)
+    assert len(results) == 4
+    assert isinstance(results[1], ValueError)
+    expected = [suspect.io.load_rda(paths[0]),
+                suspect.io.load_siemens_dicom(paths[2]),
+                suspect.io.load_siemens_dicom(paths[3])]
+    for data, expected_data in zip([results[0], results[2], results[3]], expected):
+        assert isinstance(data, suspect.MRSData)
+        numpy.testing.assert_array_equal(data, expected_data)
+        assert data.dt == expected_data.dt
+        assert data.f0 == expected_data.f0
+        assert data.te == expected_data.te
+        numpy.testing.assert_array_equal(data.transform, expected_data.transform)
+
+
+def _vax_bytes(values):
+    # a VAX float has the same bits as the IEEE float of 4 times the value,
+    # with the two 16 bit words swapped
+    ieee_bits = numpy.asarray(values, dtype="<f4") * numpy.float32(4)
+    return ieee_bits.view("<u2").reshape(-1, 2)[:, ::-1].tobytes()
+
+
+def test_vax_to_ieee():
+    values = numpy.array([0, 1, -1, 0.5, -2.5, 1e-30, 123456.789, 1e30], dtype=numpy.float32)
+    floats = suspect.io.philips._vax_to_ieee_single_float(_vax_bytes(values))
+    assert floats.dtype == numpy.float32
+    numpy.testing.assert_array_equal(floats, values)
+    # VAX 1.0 as stored in the file
+    numpy.testing.assert_array_equal(suspect.io.philips._vax_to_ieee_single_float(b"\x80\x40\x00\x00"), [1.0])
+
+
+def test_load_sdat(tmp_path):
+    data = numpy.arange(2 * 3 * 16, dtype=numpy.float32).reshape(3, 32)
+    with open(tmp_path / "test.SDAT", "wb") as fout:
+        fout.write(_vax_bytes(data))
+    with open(tmp_path / "test.SPAR", "w") as fout:
+        fout.write("! comment\n"
+                   "samples : 16\nrows : 3\nsample_frequency : 2000\n"
+                   "synthesizer_frequency : 127769903\necho_time : 30.0\nrepetition_time : 2000\n"
+                   "lr_size : 20.0\nap_size : 20.0\ncc_size : 20.0\n"
+                   "lr_off_center : 1.0\nap_off_center : 2.0\ncc_off_center : 3.0\n"
+                   "lr_angulation : 0.0\nap_angulation : 0.0\ncc_angulation : 0.0\n")
+    sdat = suspect.io.load_sdat(str(tmp_path / "test.SDAT"))
+    assert sdat.shape == (3, 16)
+    assert sdat.dt == 5e-4
+    assert sdat.te == 30
+    numpy.testing.assert_array_equal(sdat, data[:, ::2] - 1j * data[:, 1::2])
+
+
+def test_bulk_writers(tmp_path):
+    data = suspect.MRSData(numpy.arange(2 * 3 * 64).reshape(2, 3, 64) * (1 - 0.5j), 1e-3, 123.456, te=30)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        suspect.io.lcmodel.save_raw(str(tmp_path / "test.RAW"), data)
+    raw_values = numpy.loadtxt(str(tmp_path / "test.RAW"), skiprows=8)
+    numpy.testing.assert_allclose(raw_values[:, 0] + 1j * raw_values[:, 1], data.reshape(-1), rtol=1e-6)
+
+    suspect.io.tarquin.save_dpt(str(tmp_path / "test.dpt"), data[0, 0])
+    dpt_values = numpy.loadtxt(str(tmp_path / "test.dpt"), skiprows=9)
+    numpy.testing.assert_allclose(dpt_values[:, 0] + 1j * dpt_values[:, 1], data[0, 0], rtol=1e-8)
+
+    suspect.io.felix.save_mat(str(tmp_path / "test.mat"), data[0])
+    mat_bytes = (tmp_path / "test.mat").read_bytes()
+    fids = numpy.frombuffer(mat_bytes[1032:], dtype=[("words", "<u4"), ("points", "<c8", (64,))])
+    assert numpy.all(fids["words"] == 128)
+    numpy.testing.assert_array_equal(fids["points"], data[0])
@@ -1,5 +1,6 @@
 import suspect
 import numpy
+import os
 
 
 def test_load_dicom_volume():
@@ -14,3 +15,40 @@ def test_load_dicom():
     data = suspect.io.load_dicom(test_dcm)
     assert data.shape == (2, 1024)
 
+
+def test_load_dicom_lazy():
+    test_dcm = "tests/test_data/dicom/No_Name/Mrs_Dti_Qa/MRSshortTELN_401/IM-0001-0002.dcm"
+    data = suspect.io.load_dicom(test_dcm)
+    lazy_data = suspect.io.load_dicom(test_dcm, lazy=True)
+    assert not lazy_data.is_loaded
+    assert lazy_data.shape == (2, 1024)
+    assert lazy_data.dt == data.dt
+    assert lazy_data.f0 == data.f0
+    assert lazy_data.te == data.te
+    numpy.testing.assert_array_equal(lazy_data.load(), data)
+    assert lazy_data.is_loaded
+    assert isinstance(lazy_data.load(), suspect.MRSData)
+
+
+def test_index_dicom_folder(monkeypatch):
+    folder = "tests/test_data/siemens/mri"
+    # by default the headers are read in this process
+    with monkeypatch.context() as m:
+        m.setattr("concurrent.futures.ProcessPoolExecutor", None)
+        index = suspect.image.index_dicom_folder(folder, ".IMA", use_cache=False)
+    assert len(index) == 30
+    assert len({header["SeriesInstanceUID"] for header in index.values()}) == 1
+    assert index["T1.0001.IMA"]["Rows"] == 1024
+    # the parallel header pass and the cached index give the same result
+    assert suspect.image.index_dicom_folder(folder, ".IMA", workers=2) == index
+    assert suspect.image.index_dicom_folder(folder, ".IMA") == index
+
+    data = suspect.image.load_dicom_volume("tests/test_data/siemens/mri/T1.0001.IMA", workers=1)
+    assert data.shape == (30, 1024, 960)
+
+    # only the most recently used folders are kept in the cache
+    cache = suspect.image._image._series_index_cache
+    for i in range(suspect.image._image._SERIES_INDEX_CACHE_SIZE + 2):
+        suspect.image.index_dicom_folder(folder, ".{}".format(i))
+    assert len(cache) == suspect.image._image._SERIES_INDEX_CACHE_SIZE
+    assert (os.path.abspath(folder), ".IMA") not in cache
@@ -1,6 +1,9 @@
 import suspect.io.tarquin
 import unittest.mock as mock
 import pytest
+import numpy
+import os
+import sys
 
 
 def test_load_fit_file():
@@ -17,3 +20,66 @@ def test_tarquin_error():
         mock_run.return_value.returncode = 0
         with pytest.raises(FileNotFoundError):
             suspect.io.tarquin.process("test_data")
+
+
+# stands in for the tarquin executable: logs the input file it was given and
+# writes out the saved Tarquin results, unless the data has an echo time of 0
+STUB_TARQUIN = """#!{python}
+import argparse, shutil, sys
+parser = argparse.ArgumentParser()
+for option in ["input", "format", "output_txt", "output_fit", "log"]:
+    parser.add_argument("--" + option)
+args, _ = parser.parse_known_args()
+with open(args.input) as fin:
+    if "Echo_time\\t0.0" in fin.read():
+        sys.exit("bad input data")
+with open(args.log, "a") as fout:
+    fout.write(args.input + "\\n")
+shutil.copyfile("{test_data}/tarquin_results.txt", args.output_txt)
+shutil.copyfile("{test_data}/tarquin_megapress_fit.txt", args.output_fit)
+"""
+
+
+@pytest.fixture
+def stub_tarquin(tmp_path):
+    stub_path = tmp_path / "tarquin"
+    stub_path.write_text(STUB_TARQUIN.format(python=sys.executable,
+                                             test_data=os.path.abspath("tests/test_data/tarquin")))
+    stub_path.chmod(0o755)
+    return str(stub_path)
+
+
+def test_tarquin_process_many(stub_tarquin, tmp_path):
+    log_filename = str(tmp_path / "log.txt")
+    data = [suspect.MRSData(numpy.ones(2048, "complex"), 5e-4, 123, te=te) for te in [30, 0, 30, 30]]
+    results = dict(suspect.io.tarquin.process_many(data,
+                                                   options={"log": log_filename},
+                                                   workers=2,
+                                                   tarquin_path=stub_tarquin))
+    assert sorted(results) == [0, 1, 2, 3]
+    assert "bad input data" in str(results[1])
+    for i in [0, 2, 3]:
+        assert results[i]["metabolite_fits"]["Ala"]["concentration"] == "0.0002145"
+        assert results[i]["plots"]["fit"].shape == (2048,)
+
+    # each fit ran in its own temporary directory, which has been removed
+    with open(log_filename) as fin:
+        input_filenames = fin.read().split()
+    assert len(input_filenames) == 3
+    assert len({os.path.dirname(filename) for filename in input_filenames}) == 3
+    assert not any(os.path.exists(filename) for filename in input_filenames)
+
+    # bad arguments are reported straight away, not when iterating
+    with pytest.raises(ValueError):
+        suspect.io.tarquin.process_many(data, wrefs=data[:2], tarquin_path=stub_tarquin)
+    with pytest.raises(ValueError):
+        suspect.io.tarquin.process_many(data, workers=0, tarquin_path=stub_tarquin)
+
+
+def test_fitting_tarquin_process(stub_tarquin, tmp_path):
+    data = suspect.MRSData(numpy.ones(2048, "complex"), 5e-4, 123, te=30)
+    options = {"log": str(tmp_path / "log.txt")}
+    result = suspect.fitting.tarquin.process(data, aq_factor=0.7, options=options, tarquin_path=stub_tarquin)
+    assert "Ala" in result["metabolite_fits"]
+    # the options passed in are left unchanged
+    assert options == {"log": str(tmp_path / "log.txt")}
@@ -53,3 +53,89 @@ def test_centre():
     data = suspect.MRSData(numpy.ones(1024, 'complex'), 5e-4, 123, transform=transform)
     numpy.testing.assert_equal(data.centre, position)
     numpy.testing.assert_equal(data.position, position)
+
+
+def test_fft_cache():
+    data = suspect.MRSData(numpy.random.rand(4, 128) + 1j, 5e-4, 123)
+    # without the cache, every call does a new transform
+    assert data.spectrum() is not data.spectrum()
+
+    data.use_fft_cache()
+    spectrum = data.spectrum()
+    assert data.spectrum() is spectrum
+    assert spectrum.fid() is data
+    assert not spectrum.flags.writeable
+    numpy.testing.assert_allclose(spectrum, numpy.fft.fftshift(numpy.fft.fft(data, axis=-1), axes=-1))
+
+    # writing to the data, or to a view of it, invalidates the cache
+    data[0, 0] = 0
+    new_spectrum = data.spectrum()
+    assert new_spectrum is not spectrum
+    numpy.testing.assert_allclose(new_spectrum, numpy.fft.fftshift(numpy.fft.fft(data, axis=-1), axes=-1))
+    assert spectrum.fid() is not data
+    data[1][:] = 0
+    assert data.spectrum() is not new_spectrum
+    numpy.testing.assert_allclose(data.spectrum()[1], 0)
+    data *= 2
+    numpy.testing.assert_allclose(data.spectrum(), numpy.fft.fftshift(numpy.fft.fft(data, axis=-1), axes=-1))
+
+    # slices and processing results do not share the cache
+    assert data[0]._fft_cache is None
+    assert (data + 1)._fft_cache is None
+    data.use_fft_cache(False)
+    assert data.spectrum() is not data.spectrum()
+
+
+def test_fft_cache_views():
+    data = suspect.MRSData(numpy.random.rand(4, 128) + 1j, 5e-4, 123).use_fft_cache()
+    view = data[0]
+    # a view cannot cache its own transform, as writes through the data or
+    # through other views of it would leave the cache out of date
+    with pytest.raises(ValueError):
+        view.use_fft_cache()
+    with pytest.raises(ValueError):
+        data.view().use_fft_cache()
+    sibling = data[:2]
+    data.spectrum()
+    data[0, 0] = 5
+    numpy.testing.assert_allclose(view.spectrum(), numpy.fft.fftshift(numpy.fft.fft(view)))
+    sibling[0, 1] = 7
+    numpy.testing.assert_allclose(view.spectrum(), numpy.fft.fftshift(numpy.fft.fft(view)))
+    numpy.testing.assert_allclose(data.spectrum(), numpy.fft.fftshift(numpy.fft.fft(data, axis=-1), axes=-1))
+
+    # but a copy of the view can
+    copied_view = view.copy().use_fft_cache()
+    assert copied_view.spectrum() is copied_view.spectrum()
+
+
+def test_shared_parameters():
+    data = suspect.MRSData(numpy.ones((4, 128), "complex"), 5e-4, 123, te=20, tr=1500, metadata={"a": 1})
+    # slices and results share the parameters of the data they came from
+    for derived in [data[0], data * 2, numpy.abs(data), data.inherit(numpy.zeros(128))]:
+        assert derived._parameters is data._parameters
+        assert derived.dt == 5e-4
+        assert derived.te == 20
+        assert derived.metadata == {"a": 1}
+    # but setting a parameter only changes that array
+    view = data[1]
+    view.ppm0 = 3.0
+    view.transform = numpy.eye(4)
+    assert view.ppm0 == 3.0
+    assert data.ppm0 == 4.7
+    assert data.transform is None
+    assert data[0].ppm0 == 4.7
+
+
+def test_cached_axes():
+    data = suspect.MRSData(numpy.ones(1024, "complex"), 5e-4, 123, ppm0=4.7)
+    other_data = suspect.MRSData(numpy.zeros((2, 1024), "complex"), 5e-4, 123, ppm0=4.7)
+    for axis_name in ["time_axis", "frequency_axis", "frequency_axis_ppm"]:
+        axis = getattr(data, axis_name)()
+        assert getattr(other_data, axis_name)() is axis
+        assert not axis.flags.writeable
+    numpy.testing.assert_allclose(data.time_axis(), numpy.arange(1024) * 5e-4)
+    numpy.testing.assert_allclose(data.frequency_axis(), numpy.linspace(-1000, 1000, 1024, endpoint=False))
+    numpy.testing.assert_allclose(data.frequency_axis_ppm(),
+                                  4.7 - numpy.linspace(-1000, 1000, 1024, endpoint=False) / 123)
+    # different parameters give a different axis
+    assert suspect.MRSData(numpy.ones(1024), 5e-4, 123, ppm0=3.0).frequency_axis_ppm()[512] == 3.0
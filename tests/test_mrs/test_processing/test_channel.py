@@ -20,3 +20,9 @@ def test_whiten():
     white_noise = suspect.processing.channel_combination.whiten(noise, 2048)
     cov_post = np.cov(white_noise)
     np.testing.assert_almost_equal(cov_post, np.eye(32))
+
+    # noise as a series of multi-channel scans, with channels on axis -2
+    noise_scans = np.moveaxis(np.asarray(noise).reshape((32, 4, 512)), 1, 0)
+    white_noise = suspect.processing.channel_combination.whiten(noise, noise_scans)
+    cov_post = np.cov(white_noise)
+    np.testing.assert_almost_equal(cov_post, np.eye(32))
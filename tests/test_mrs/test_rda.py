@@ -31,3 +31,15 @@ def test_svs_file():
 #    assert data.dt == 8.33e-4
 #    assert data.te == 97
 
+
+def test_svs_file_double_precision():
+    data = suspect.io.load_rda("tests/test_data/siemens/SVS_30.rda")
+    assert data.dtype == numpy.complex64
+    double_data = suspect.io.load_rda("tests/test_data/siemens/SVS_30.rda", dtype=numpy.complex128)
+    assert double_data.dtype == numpy.complex128
+    numpy.testing.assert_array_equal(double_data.astype(numpy.complex64), data)
+    mapped_data = suspect.io.load_rda("tests/test_data/siemens/SVS_30.rda", dtype=numpy.complex128, mmap=True)
+    numpy.testing.assert_array_equal(mapped_data, double_data)
+    assert mapped_data.te == 30
+    # the memory map is copy-on-write, so the data can be changed locally
+    mapped_data[0] = 0
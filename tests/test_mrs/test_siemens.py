@@ -1,6 +1,8 @@
 import pytest
 import numpy.testing
 import numpy
+import pydicom
+import warnings
 
 import suspect.io.siemens
 
@@ -12,6 +14,28 @@ def test_svs_30():
     assert data.tr == 2000
 
 
+def test_read_csa_header_tags():
+    dataset = pydicom.dcmread("tests/test_data/siemens/SVS_30.IMA")
+    header_index = suspect.io.siemens._private_block(dataset, 0x0029, "SIEMENS CSA HEADER")
+    csa_header_bytes = dataset[0x0029, 0x0100 * header_index + 0x0010].value
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        csa_header = suspect.io.siemens.read_csa_header(csa_header_bytes)
+    selected = suspect.io.siemens.read_csa_header(csa_header_bytes, ["EchoTime", "VoiPosition"])
+    assert selected == {"EchoTime": csa_header["EchoTime"], "VoiPosition": csa_header["VoiPosition"]}
+    assert selected["EchoTime"] == 30
+    assert len(selected["VoiPosition"]) == 3
+
+
+@pytest.mark.parametrize("filename", ["SVS_30.IMA", "SVS_XA60.dcm"])
+def test_loaded_data_is_writable(filename):
+    data = suspect.io.siemens.load_siemens_dicom("tests/test_data/siemens/" + filename)
+    original_data = data.copy()
+    data *= 2
+    data[0] = 0
+    numpy.testing.assert_array_equal(data[1:], 2 * original_data[1:])
+
+
 def test_svs_xa60():
     # Not .ima, but might be best to leave it here for Siemens spectro DICOM
     data = suspect.io.siemens.load_siemens_dicom("tests/test_data/siemens/SVS_XA60.dcm")
@@ -26,3 +50,16 @@ def test_svs_xa60():
 #     assert data.te == 30
 
 
+@pytest.mark.parametrize("filename", ["SVS_30.IMA", "SVS_XA60.dcm"])
+def test_load_siemens_dicom_lazy(filename):
+    filename = "tests/test_data/siemens/" + filename
+    data = suspect.io.load_siemens_dicom(filename)
+    lazy_data = suspect.io.load_siemens_dicom(filename, lazy=True)
+    assert not lazy_data.is_loaded
+    assert lazy_data.shape == data.shape
+    assert lazy_data.dt == data.dt
+    assert lazy_data.te == data.te
+    numpy.testing.assert_equal(lazy_data.transform, data.transform)
+    numpy.testing.assert_array_equal(lazy_data, data)
+    assert lazy_data.is_loaded
+    numpy.testing.assert_equal(lazy_data.load().position, data.position)
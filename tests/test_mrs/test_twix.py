@@ -1,9 +1,157 @@
 import pytest
 import numpy
+import struct
+import os
 
 import suspect.io.twix
 
 
+_HEADER = """<ParamString."PatientID">  { "1234567"  }
+<ParamString."PatientName">  { "Doe^John"  }
+<ParamString."PatientBirthDay">  { "19800101"  }
+<ParamString."FrameOfReference">  { "1.3.12.2.1107.5.2.43.66001.1.20200101120000000.0.0.0"  }
+<ParamString."tBaselineString">  { "N4_VE11C_LATEST_20160120"  }
+<ParamString."Manufacturer">  { "Siemens"  }
+<ParamString."ManufacturersModelName">  { "Prisma"  }
+<ParamString."tSequenceFileName">  { "%SiemensSeq%\\svs_se"  }
+<ParamDouble."VoI_InPlaneRotAngle">  { <Precision> 16  0.0  }
+<ParamDouble."VoI_Normal_Sag">  { <Precision> 16  0.0  }
+<ParamDouble."VoI_Normal_Cor">  { <Precision> 16  0.0  }
+<ParamDouble."VoI_Normal_Tra">  { <Precision> 16  1.0  }
+### ASCCONV BEGIN ###
+tProtocolName = "svs_se_30"
+sTXSPEC.asNucleusInfo[0].lFrequency = 123261716
+sRXSPEC.alDwellTime[0] = 250000
+alTR[0] = 2000000
+alTE[0] = 30000
+sSpecPara.sVoI.dReadoutFOV = 20
+sSpecPara.sVoI.dPhaseFOV = 20
+sSpecPara.sVoI.dThickness = 20
+sSpecPara.sVoI.sPosition.dSag = 4.5
+sSpecPara.sVoI.sPosition.dCor = -2.5
+sSpecPara.sVoI.sPosition.dTra = 6.5
+### ASCCONV END ###
+"""
+
+
+def _scan_params(scan):
+    # fill in default values for the scan parameters used by the writers
+    params = {"loop_counters": (0,) * 14,
+              "eval_info_mask": 0,
+              "scan_counter": 0,
+              "time_stamp": 0,
+              "pmu_time_stamp": 0,
+              "num_dummy_points": 0}
+    params.update(scan)
+    return params
+
+
+def _channel_bytes(channel_data):
+    # siemens store the data as the complex conjugate of our convention
+    samples = numpy.empty(channel_data.shape + (2,), dtype="<f4")
+    samples[..., 0] = channel_data.real
+    samples[..., 1] = -channel_data.imag
+    return samples.tobytes()
+
+
+def _write_twix_vb(filename, scans, header=_HEADER):
+    """Writes a minimal TWIX VB file containing the supplied scans.
+
+    Each scan is a dict with a "data" entry, an array of shape
+    (num_channels, num_samples), and optionally any of the entries filled
+    in by _scan_params.
+    """
+    header_bytes = header.encode("latin-1") + b"\0" * 24
+    with open(filename, "wb") as fout:
+        fout.write(struct.pack("I", len(header_bytes) + 4))
+        fout.write(header_bytes)
+        for scan in scans + [{"data": numpy.zeros((1, 0)), "eval_info_mask": 1}]:
+            params = _scan_params(scan)
+            num_channels, num_samples = params["data"].shape
+            dma_length = num_channels * (128 + num_samples * 8)
+            mdh = b"".join([
+                struct.pack("IIIII", dma_length, 1, params["scan_counter"],
+                            params["time_stamp"], params["pmu_time_stamp"]),
+                struct.pack("Q", params["eval_info_mask"]),
+                struct.pack("HH", num_samples, num_channels),
+                struct.pack("14H", *params["loop_counters"]),
+                struct.pack("IHHI", 0, 0, 0, 0),
+                struct.pack("IHH", 0, 0, 0),
+                struct.pack("4H", 0, 0, 0, 0),
+                struct.pack("4H", params["num_dummy_points"], 0, 0, 0),
+                struct.pack("7f", *range(7)),
+            ])
+            for channel_index, channel_data in enumerate(params["data"]):
+                fout.write(mdh)
+                fout.write(struct.pack("Hh", channel_index, 0))
+                fout.write(_channel_bytes(channel_data))
+            if num_channels == 0:
+                fout.write(mdh)
+                fout.write(struct.pack("Hh", 0, 0))
+
+
+def _write_twix_vd(filename, measurements):
+    """Writes a minimal TWIX VD file containing the supplied measurements.
+
+    Each measurement is a tuple of (header_string, scans), with the scans
+    in the same format as for _write_twix_vb.
+    """
+    with open(filename, "wb") as fout:
+        fout.write(struct.pack("II", 0, len(measurements)))
+        offset = 8 + 152 * 64
+        entries = []
+        for header, scans in measurements:
+            fout.seek(offset)
+            header_bytes = header.encode("latin-1") + b"\0" * 24
+            fout.write(struct.pack("I", len(header_bytes) + 4))
+            fout.write(header_bytes)
+            for scan in scans + [{"data": numpy.zeros((0, 0)), "eval_info_mask": 1}]:
+                params = _scan_params(scan)
+                num_channels, num_samples = params["data"].shape
+                dma_length = 192 + num_channels * (32 + num_samples * 8)
+                fout.write(b"".join([
+                    struct.pack("IIIII", dma_length, 1, params["scan_counter"],
+                                params["time_stamp"], params["pmu_time_stamp"]),
+                    struct.pack("HHIIII", 0, 0, 0, 0, 0, 0),
+                    struct.pack("Q", params["eval_info_mask"]),
+                    struct.pack("HH", num_samples, num_channels),
+                    struct.pack("14H", *params["loop_counters"]),
+                    struct.pack("IHHI", 0, 0, 0, 0),
+                    struct.pack("IHH", 0, 0, 0),
+                    struct.pack("7f", *range(7)),
+                    struct.pack("24H", *([0] * 24)),
+                    struct.pack("4H", params["num_dummy_points"], 0, 0, 0),
+                    struct.pack("HHI", 0, 0, 0),
+                ]))
+                for channel_index, channel_data in enumerate(params["data"]):
+                    fout.write(struct.pack("III4xI4xH6x", 32 + num_samples * 8, 1,
+                                           params["scan_counter"], 0, channel_index))
+                    fout.write(_channel_bytes(channel_data))
+            length = fout.tell() - offset
+            entries.append((offset, length))
+            offset += length
+        fout.seek(8)
+        for i, (offset, length) in enumerate(entries):
+            fout.write(struct.pack("IIQQ64s64s", i, 0, offset, length, b"", b""))
+
+
+def _random_scans(num_averages, num_channels, num_samples, num_dummy_points=0):
+    # generate scans looping over the averages counter (index 1)
+    rng = numpy.random.default_rng(0)
+    data = rng.standard_normal((num_averages, num_channels, num_samples, 2))
+    data = (data[..., 0] + 1j * data[..., 1]).astype(numpy.complex64)
+    scans = []
+    for i in range(num_averages):
+        loop_counters = [0] * 14
+        loop_counters[1] = i
+        scans.append({"data": data[i],
+                      "loop_counters": loop_counters,
+                      "scan_counter": i + 1,
+                      "time_stamp": 1000 + 4 * i,
+                      "num_dummy_points": num_dummy_points})
+    return data, scans
+
+
 def test_twix_nofile():
     with pytest.raises(FileNotFoundError):
         suspect.io.twix.load_twix("")
@@ -43,6 +191,406 @@ def test_veriofile():
     with open("tests/test_data/siemens/twix_vd.dat", "rb") as f:
         data_from_binary_stream = suspect.io.load_twix(f)
         assert numpy.all(data == data_from_binary_stream)
+
+
+def test_synthetic_vb(tmp_path):
+    expected, scans = _random_scans(4, 3, 80, num_dummy_points=4)
+    _write_twix_vb(tmp_path / "vb.dat", scans)
+    data = suspect.io.load_twix(tmp_path / "vb.dat")
+    assert data.shape == (4, 3, 64)
+    assert data.dt == 2.5e-4
+    assert data.te == 30.0
+    assert data.tr == 2000
+    numpy.testing.assert_almost_equal(data.f0, 123.261716)
+    numpy.testing.assert_allclose(data.transform[:3, 3], [4.5, -2.5, 6.5])
+    numpy.testing.assert_array_equal(data, expected[:, :, 4:68])
+
+
+def test_synthetic_vd(tmp_path):
+    expected, scans = _random_scans(4, 3, 80, num_dummy_points=4)
+    _write_twix_vd(tmp_path / "vd.dat", [(_HEADER, scans)])
+    data = suspect.io.load_twix(tmp_path / "vd.dat")
+    assert data.shape == (4, 3, 64)
+    numpy.testing.assert_array_equal(data, expected[:, :, 4:68])
+
+
+@pytest.mark.parametrize("writer", ["vb", "vd"])
+def test_lazy_load(tmp_path, writer):
+    expected, scans = _random_scans(6, 4, 80, num_dummy_points=4)
+    # an auxiliary noise scan, which should be ignored
+    scans.insert(2, {"data": numpy.ones((4, 80)), "eval_info_mask": 1 << 25})
+    if writer == "vb":
+        _write_twix_vb(tmp_path / "twix.dat", scans)
+    else:
+        _write_twix_vd(tmp_path / "twix.dat", [(_HEADER, scans)])
+    eager = suspect.io.load_twix(tmp_path / "twix.dat")
+    lazy = suspect.io.load_twix(tmp_path / "twix.dat", lazy=True)
+    assert isinstance(lazy, suspect.io.twix.LazyTwixData)
+    assert lazy.shape == eager.shape == (6, 4, 64)
+    assert lazy.np == 64
+    assert lazy.dt == eager.dt
+    numpy.testing.assert_array_equal(lazy.load(), eager)
+    numpy.testing.assert_array_equal(numpy.asarray(lazy), eager)
+
+    subset = lazy[1:5:2, 2]
+    assert isinstance(subset, suspect.MRSData)
+    assert subset.f0 == eager.f0
+    numpy.testing.assert_array_equal(subset, eager[1:5:2, 2])
+    numpy.testing.assert_array_equal(lazy[-1, ..., 10:20], eager[-1, ..., 10:20])
+    assert lazy[0, 0, 3] == eager[0, 0, 3]
+    with pytest.raises(IndexError):
+        lazy[0, 0, 0, 0]
+    with pytest.raises(TypeError):
+        lazy[[0, 1]]
+
+
+def test_scan_table(tmp_path, monkeypatch):
+    _, scans = _random_scans(5, 2, 64)
+    scans.insert(0, {"data": numpy.ones((2, 64)), "eval_info_mask": 1 << 25})
+    filename = tmp_path / "twix.dat"
+    _write_twix_vd(filename, [(_HEADER, scans)])
+    # by default nothing is written next to the data
+    table = suspect.io.twix.scan_table(filename)
+    suspect.io.load_twix(filename, lazy=True)
+    assert os.listdir(tmp_path) == ["twix.dat"]
+    assert len(table) == 6
+    assert table["eval_info_mask"][0] == 1 << 25
+    numpy.testing.assert_array_equal(table["loop_counters"][1:, 1], numpy.arange(5))
+    numpy.testing.assert_array_equal(table["num_channels"], 2)
+    numpy.testing.assert_array_equal(table["time_stamp"][1:], 1000 + 4 * numpy.arange(5))
+    numpy.testing.assert_array_equal(suspect.io.twix.scan_table(filename, cache=True), table)
+    assert (tmp_path / "twix.dat.scans.npz").exists()
+
+    # the second time the table should come from the cache
+    def fail(*args):
+        raise AssertionError("scans should not be indexed again")
+    with monkeypatch.context() as m:
+        m.setattr(suspect.io.twix, "_index_scans", fail)
+        numpy.testing.assert_array_equal(suspect.io.twix.scan_table(filename, cache=True), table)
+        assert suspect.io.load_twix(filename, lazy=True, cache=True).shape == (5, 2, 64)
+
+    # changing the file invalidates the cache
+    _, scans = _random_scans(3, 2, 64)
+    _write_twix_vd(filename, [(_HEADER, scans)])
+    assert len(suspect.io.twix.scan_table(filename, cache=True)) == 3
+
+    # a damaged sidecar is treated as a cache miss and replaced
+    for damaged_bytes in [b"", b"PK\x03\x04 truncated"]:
+        with open(tmp_path / "twix.dat.scans.npz", "wb") as fout:
+            fout.write(damaged_bytes)
+        assert len(suspect.io.twix.scan_table(filename, cache=True)) == 3
+        assert suspect.io.load_twix(filename, lazy=True, cache=True).shape == (3, 2, 64)
+        with monkeypatch.context() as m:
+            m.setattr(suspect.io.twix, "_index_scans", fail)
+            assert len(suspect.io.twix.scan_table(filename, cache=True)) == 3
+    assert sorted(os.listdir(tmp_path)) == ["twix.dat", "twix.dat.scans.npz"]
+
+    # the cache can also be kept in a separate folder
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    _write_twix_vb(data_dir / "vb.dat", scans)
+    assert len(suspect.io.twix.scan_table(data_dir / "vb.dat", cache=str(cache_dir))) == 3
+    assert os.listdir(data_dir) == ["vb.dat"]
+    assert len(os.listdir(cache_dir)) == 1
+    with monkeypatch.context() as m:
+        m.setattr(suspect.io.twix, "_index_scans", fail)
+        assert len(suspect.io.twix.scan_table(data_dir / "vb.dat", cache=str(cache_dir))) == 3
+
+
+def test_twix_header():
+    header_string = _HEADER + """<ParamMap."sVoI">  {
+  <ParamMap."sNormal">  {
+    <ParamDouble."dSag">{ }
+    <ParamDouble."dTra">{ 0.5 }
+  }
+}
+"""
+    header = suspect.io.twix.TwixHeader(header_string)
+    assert header.ascconv["alTE[0]"] == ["30000"]
+    assert header.ascconv_number("sSpecPara.sVoI.sPosition.dCor") == -2.5
+    assert header.xprotocol_string("PatientName") == "Doe^John"
+    assert header.xprotocol_values("VoI_Normal_Tra") == ["1.0"]
+    assert header.xprotocol_number("VoI_Normal_Tra") == 1.0
+    assert header.map_value("sVoI", "sNormal", "dTra") == "0.5"
+    assert header.map_value("sVoI", "sNormal", "dSag") == ""
+    assert header.map_value("sVoI", "sPosition", "dSag") is None
+
+    params = suspect.io.twix.parse_twix_header(header_string)
+    assert params["protocol_name"] == "svs_se_30"
+    assert params["patient_id"] == "1234567"
+    assert params["software_version"] == '"N4_VE11C_LATEST_20160120"'
+    assert params["te"] == 30.0
+    numpy.testing.assert_almost_equal(params["f0"], 123.261716)
+    assert params["header"].xprotocol_string("Manufacturer") == "Siemens"
+
+
+def test_twix_header_param_types():
+    # the same name can be used by parameters of different types, only the
+    # type we expect should be used for each value
+    header_string = _HEADER.replace("sTXSPEC.asNucleusInfo[0].lFrequency = 123261716\n", "") + """
+<ParamLong."Frequency">  { 123261716  }
+<ParamString."Frequency">  { "297000000"  }
+<ParamLong."PatientName">  { 12  }
+<ParamString."VoI_Normal_Tra">  { "0.0"  }
+<ParamMap."sVoI">  {
+  <ParamMap."sPosition">  {
+    <ParamLong."dSag">{ 7 }
+    <ParamDouble."dSag">{ 1.5 }
+  }
+}
+"""
+    header = suspect.io.twix.TwixHeader(header_string)
+    assert header.xprotocol_values("Frequency") == ["123261716", '"297000000"']
+    assert header.xprotocol_values("Frequency", "ParamLong") == ["123261716"]
+    assert header.xprotocol_string("PatientName") == "Doe^John"
+    assert header.map_value("sVoI", "sPosition", "dSag") == "1.5"
+
+    params = suspect.io.twix.parse_twix_header(header_string)
+    numpy.testing.assert_almost_equal(params["f0"], 123.261716)
+    assert params["patient_name"] == "Doe\\^John"
+    numpy.testing.assert_array_equal(params["transform"], suspect.io.twix.parse_twix_header(_HEADER)["transform"])
+
+
+def test_multiple_measurements(tmp_path):
+    water, water_scans = _random_scans(2, 3, 64)
+    metabolite, metabolite_scans = _random_scans(6, 3, 64)
+    noise_scans = [{"data": numpy.ones((3, 64)), "eval_info_mask": 1 << 25}]
+    filename = tmp_path / "twix.dat"
+    _write_twix_vd(filename, [(_HEADER, noise_scans),
+                              (_HEADER.replace("alTE[0] = 30000", "alTE[0] = 20000"), water_scans),
+                              (_HEADER, metabolite_scans)])
+
+    # by default only the last measurement is loaded
+    data = suspect.io.load_twix(filename)
+    numpy.testing.assert_array_equal(data, metabolite)
+
+    water_data = suspect.io.load_twix(filename, measurement=1)
+    assert water_data.te == 20.0
+    numpy.testing.assert_array_equal(water_data, water)
+
+    noise_data, water_data, data = suspect.io.load_twix(filename, measurement="all")
+    assert noise_data is None
+    assert water_data.te == 20.0
+    assert data.te == 30.0
+    numpy.testing.assert_array_equal(data, metabolite)
+
+    data, water_data = suspect.io.load_twix(filename, measurement=[-1, 1])
+    numpy.testing.assert_array_equal(data, metabolite)
+    numpy.testing.assert_array_equal(water_data, water)
+
+    data, water_data = suspect.io.load_twix(filename, measurement=[2, 1], lazy=True)
+    numpy.testing.assert_array_equal(data.load(), metabolite)
+    numpy.testing.assert_array_equal(water_data[1], water[1])
+    assert len(suspect.io.twix.scan_table(filename, measurement=0)) == 1
+
+    with pytest.raises(ValueError):
+        suspect.io.load_twix(filename, measurement=0)
+    with pytest.raises(IndexError):
+        suspect.io.load_twix(filename, measurement=3)
+
+
+@pytest.mark.parametrize("preallocate", [True, False])
+def test_builder_placement(tmp_path, preallocate):
+    expected, scans = _random_scans(4, 2, 64)
+    # acquire the averages out of order, with one missing
+    scans = [scans[3], scans[0], scans[2]]
+    expected[1] = 0
+    _write_twix_vb(tmp_path / "vb.dat", scans)
+    builder = suspect.io.twix.TwixBuilder(dtype=numpy.complex64, preallocate=preallocate)
+    with open(tmp_path / "vb.dat", "rb") as fin:
+        suspect.io.twix.load_twix_vb(fin, builder)
+    assert (builder.loop_shape is not None) == preallocate
+    data = builder.build_mrsdata()
+    assert data.dtype == numpy.complex64
+    numpy.testing.assert_array_equal(data, expected)
+
+
+def test_load_single_precision(tmp_path):
+    expected, scans = _random_scans(3, 2, 64)
+    _write_twix_vd(tmp_path / "vd.dat", [(_HEADER, scans)])
+    data = suspect.io.load_twix(tmp_path / "vd.dat", dtype=numpy.complex64)
+    assert data.dtype == numpy.complex64
+    numpy.testing.assert_array_equal(data, expected)
+    lazy = suspect.io.load_twix(tmp_path / "vd.dat", dtype=numpy.complex64, lazy=True)
+    assert lazy.dtype == lazy[0].dtype == numpy.complex64
+
+
+def test_load_default_dtype(tmp_path):
+    expected, scans = _random_scans(3, 2, 64)
+    _write_twix_vd(tmp_path / "vd.dat", [(_HEADER, scans)])
+    previous_dtype = suspect.set_default_dtype(numpy.complex64)
+    try:
+        data = suspect.io.load_twix(tmp_path / "vd.dat")
+        assert data.dtype == numpy.complex64
+        numpy.testing.assert_array_equal(data, expected)
+        assert suspect.io.load_twix(tmp_path / "vd.dat", lazy=True)[0].dtype == numpy.complex64
+        _, channel_data, _ = next(suspect.io.twix.iter_scans(tmp_path / "vd.dat"))
+        assert channel_data.dtype == numpy.complex64
+    finally:
+        suspect.set_default_dtype(previous_dtype)
+    assert suspect.io.load_twix(tmp_path / "vd.dat").dtype == numpy.complex128
+
+
+@pytest.mark.parametrize("writer", ["vb", "vd"])
+def test_scan_info(tmp_path, writer):
+    expected, scans = _random_scans(4, 2, 64)
+    for i, scan in enumerate(scans):
+        scan["pmu_time_stamp"] = 500 + i
+    scans.insert(1, {"data": numpy.ones((2, 64)), "eval_info_mask": 1 << 25})
+    if writer == "vb":
+        _write_twix_vb(tmp_path / "twix.dat", scans)
+    else:
+        _write_twix_vd(tmp_path / "twix.dat", [(_HEADER, scans)])
+    data = suspect.io.load_twix(tmp_path / "twix.dat")
+    scan_info = data.metadata["scan_info"]
+    assert scan_info.dtype == suspect.io.twix.SCAN_INFO
+    numpy.testing.assert_array_equal(scan_info["scan_counter"], [1, 2, 3, 4])
+    numpy.testing.assert_array_equal(scan_info["time_stamp"], [1000, 1004, 1008, 1012])
+    numpy.testing.assert_array_equal(scan_info["pmu_time_stamp"], [500, 501, 502, 503])
+    numpy.testing.assert_array_equal(scan_info["loop_counters"][:, 1], [0, 1, 2, 3])
+    numpy.testing.assert_array_equal(scan_info["slice_position"][0], numpy.arange(7))
+    # slicing the data keeps the scan information
+    assert data[1:].metadata["scan_info"] is scan_info
+
+    lazy = suspect.io.load_twix(tmp_path / "twix.dat", lazy=True)
+    numpy.testing.assert_array_equal(lazy.load().metadata["scan_info"], scan_info)
+
+
+@pytest.mark.parametrize("writer", ["vb", "vd"])
+@pytest.mark.parametrize("lazy", [False, True])
+def test_auxiliary_scans(tmp_path, writer, lazy):
+    expected, scans = _random_scans(3, 2, 64)
+    rng = numpy.random.default_rng(1)
+    noise = (rng.standard_normal((2, 2, 96)) + 1j * rng.standard_normal((2, 2, 96))).astype(numpy.complex64)
+    scans = [{"data": noise[0], "eval_info_mask": 1 << 25},
+             {"data": noise[1], "eval_info_mask": 1 << 25},
+             {"data": numpy.ones((2, 64)), "eval_info_mask": 1 << 21}] + scans
+    if writer == "vb":
+        _write_twix_vb(tmp_path / "twix.dat", scans)
+    else:
+        _write_twix_vd(tmp_path / "twix.dat", [(_HEADER, scans)])
+    data = suspect.io.load_twix(tmp_path / "twix.dat", lazy=lazy, auxiliary=True)
+    if lazy:
+        data = data.load()
+    numpy.testing.assert_array_equal(data, expected)
+    auxiliary_scans = data.metadata["auxiliary_scans"]
+    assert sorted(auxiliary_scans) == ["noise_adj", "phase_correction"]
+    numpy.testing.assert_array_equal(auxiliary_scans["noise_adj"], noise)
+    assert auxiliary_scans["phase_correction"].shape == (1, 2, 64)
+
+    # by default the auxiliary scans are skipped
+    data = suspect.io.load_twix(tmp_path / "twix.dat", lazy=lazy)
+    assert "auxiliary_scans" not in (data.load() if lazy else data).metadata
+
+
+@pytest.mark.parametrize("writer", ["vb", "vd"])
+def test_iter_scans(tmp_path, writer):
+    expected, scans = _random_scans(5, 2, 72, num_dummy_points=4)
+    scans.insert(1, {"data": numpy.ones((2, 72)), "eval_info_mask": 1 << 25})
+    if writer == "vb":
+        _write_twix_vb(tmp_path / "twix.dat", scans)
+    else:
+        _write_twix_vd(tmp_path / "twix.dat", [(_HEADER, scans)])
+    records = list(suspect.io.twix.iter_scans(tmp_path / "twix.dat"))
+    assert len(records) == 5
+    for i, (loop_counters, channel_data, time_stamps) in enumerate(records):
+        assert loop_counters[1] == i
+        assert time_stamps == (1000 + 4 * i, 0)
+        assert isinstance(channel_data, suspect.MRSData)
+        assert channel_data.dt == 2.5e-4
+        numpy.testing.assert_array_equal(channel_data, expected[i, :, 4:68])
+
+    batches = list(suspect.io.twix.iter_scans(tmp_path / "twix.dat", batch_size=2))
+    assert [len(batch[0]) for batch in batches] == [2, 2, 1]
+    loop_counters, channel_data, time_stamps = batches[1]
+    assert loop_counters.shape == (2, 14)
+    numpy.testing.assert_array_equal(loop_counters[:, 1], [2, 3])
+    numpy.testing.assert_array_equal(time_stamps[:, 0], [1008, 1012])
+    numpy.testing.assert_array_equal(channel_data, expected[2:4, :, 4:68])
+
+
+def test_iter_scans_truncated(tmp_path):
+    expected, scans = _random_scans(3, 2, 64)
+    _write_twix_vb(tmp_path / "vb.dat", scans)
+    with open(tmp_path / "vb.dat", "rb") as fin:
+        contents = fin.read()
+    with open(tmp_path / "vb.dat", "wb") as fout:
+        fout.write(contents[:-1000])
+    scan_iterator = suspect.io.twix.iter_scans(tmp_path / "vb.dat")
+    next(scan_iterator)
+    with pytest.raises(EOFError):
+        list(scan_iterator)
+
+
+@pytest.mark.parametrize("writer", ["vb", "vd"])
+def test_anonymize_twix(tmp_path, writer):
+    expected, scans = _random_scans(3, 2, 64)
+    if writer == "vb":
+        _write_twix_vb(tmp_path / "twix.dat", scans)
+    else:
+        _write_twix_vd(tmp_path / "twix.dat", [(_HEADER, scans), (_HEADER, scans)])
+    with open(tmp_path / "twix.dat", "rb") as fin:
+        original_bytes = fin.read()
+
+    suspect.io.twix.anonymize_twix(tmp_path / "twix.dat", tmp_path / "anon.dat")
+    # the original file is untouched
+    with open(tmp_path / "twix.dat", "rb") as fin:
+        assert fin.read() == original_bytes
+    with open(tmp_path / "anon.dat", "rb") as fin:
+        anonymized_bytes = fin.read()
+    assert len(anonymized_bytes) == len(original_bytes)
+    assert b"Doe^John" not in anonymized_bytes
+    assert b"1234567" not in anonymized_bytes
+    assert b"19800101" not in anonymized_bytes
+
+    headers = suspect.io.twix.get_header(tmp_path / "anon.dat")
+    for header in ([headers] if writer == "vb" else headers):
+        assert '<ParamString."PatientName">  { "xxxxxxxx"  }' in header
+    data = suspect.io.load_twix(tmp_path / "anon.dat")
+    numpy.testing.assert_array_equal(data, expected)
+    assert data.metadata["patient_name"] == "xxxxxxxx"
+
+    # the original is never modified unless in place is asked for explicitly
+    with pytest.raises(ValueError):
+        suspect.io.twix.anonymize_twix(tmp_path / "twix.dat")
+    with pytest.raises(ValueError):
+        suspect.io.twix.anonymize_twix(tmp_path / "twix.dat", tmp_path / "anon2.dat", inplace=True)
+    with open(tmp_path / "twix.dat", "rb") as fin:
+        assert fin.read() == original_bytes
+
+    # anonymizing in place gives the same result
+    suspect.io.twix.anonymize_twix(tmp_path / "twix.dat", inplace=True)
+    with open(tmp_path / "twix.dat", "rb") as fin:
+        assert fin.read() == anonymized_bytes
+
+
+def test_anonymize_twix_script(tmp_path, monkeypatch):
+    expected, scans = _random_scans(2, 2, 64)
+    (tmp_path / "raw").mkdir()
+    for name in ["a.dat", "b.dat"]:
+        _write_twix_vb(tmp_path / "raw" / name, scans)
+    monkeypatch.setattr("sys.argv", ["anonymize_twix", str(tmp_path / "raw"), str(tmp_path / "anon"), "-j", "2"])
+    import suspect.scripts.anonymize
+    suspect.scripts.anonymize.anonymize_twix()
+    for name in ["a.dat", "b.dat"]:
+        data = suspect.io.load_twix(tmp_path / "anon" / name)
+        assert data.metadata["patient_id"] == "xxxxxxx"
+        numpy.testing.assert_array_equal(data, expected)
+
+    # without an output the source files are left alone, unless --in-place
+    with open(tmp_path / "raw" / "a.dat", "rb") as fin:
+        original_bytes = fin.read()
+    monkeypatch.setattr("sys.argv", ["anonymize_twix", str(tmp_path / "raw" / "a.dat")])
+    with pytest.raises(SystemExit):
+        suspect.scripts.anonymize.anonymize_twix()
+    with open(tmp_path / "raw" / "a.dat", "rb") as fin:
+        assert fin.read() == original_bytes
+    monkeypatch.setattr("sys.argv", ["anonymize_twix", str(tmp_path / "raw" / "a.dat"), "--in-place"])
+    suspect.scripts.anonymize.anonymize_twix()
+    assert suspect.io.load_twix(tmp_path / "raw" / "a.dat").metadata["patient_id"] == "xxxxxxx"
+
 #def test_skyra():
 #    data = suspect.io.load_twix("tests/test_data/twix_vd_csi.dat")
 #    assert data.np == 2048